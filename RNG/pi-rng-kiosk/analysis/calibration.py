@@ -0,0 +1,740 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import math
+import multiprocessing as mp
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import yaml
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import special, stats
+
+from . import tests as live
+from .combine import bh_adjust
+from .detector import Detector, DetectorConfig
+from .model import DetectorState
+
+# Bits processed per block; bounds memory for the prefix-count and FFT stages.
+_BLOCK_BITS = 1 << 22
+_FFT_BATCH_BITS = 1 << 21
+_JOB_TICKS = 20_000
+_JOB_TRIALS = 10
+
+
+@dataclass(slots=True, frozen=True)
+class ThresholdSet:
+    gdi_z: float
+    sustained_z: float
+    sustained_ticks: int
+    fdr_q: float
+
+    def detector_config(self) -> DetectorConfig:
+        return DetectorConfig(
+            gdi_threshold=self.gdi_z,
+            sustained_threshold=self.sustained_z,
+            sustained_ticks=self.sustained_ticks,
+            fdr_q_threshold=self.fdr_q,
+        )
+
+
+@dataclass(slots=True, frozen=True)
+class BiasModel:
+    """Post-onset bit model: ``p1`` (P(1) = 0.5 + s), ``corr`` (P(repeat) = 0.5 + s), or
+    ``flip`` (every 1/s-th bit flipped, as ``--inject-bias`` does)."""
+
+    kind: str
+    strength: float
+
+    @classmethod
+    def parse(cls, spec: str) -> "BiasModel":
+        kind, _, value = spec.partition(":")
+        if kind not in ("p1", "corr", "flip") or not value:
+            raise ValueError(f"unknown bias model {spec!r}; use p1:S, corr:S or flip:S")
+        return cls(kind=kind, strength=float(value))
+
+    @property
+    def label(self) -> str:
+        return f"{self.kind}:{self.strength:g}"
+
+    def generate(self, generator: np.random.Generator, count: int) -> np.ndarray:
+        if self.kind == "p1":
+            return (generator.random(count) < 0.5 + self.strength).astype(np.uint8)
+        if self.kind == "corr":
+            changes = (generator.random(count) < 0.5 - self.strength).astype(np.uint8)
+            return np.bitwise_xor.accumulate(changes)
+        bits = unbiased_bits(generator, count)
+        flip_every = int(1 / self.strength) if self.strength > 0 else 0
+        if flip_every:
+            bits[flip_every - 1 :: flip_every] ^= 1
+        return bits
+
+
+@dataclass(slots=True)
+class CalibrationRow:
+    thresholds: ThresholdSet
+    hours: float
+    false_alarms: int = 0
+    delays_s: Dict[str, List[Optional[float]]] = field(default_factory=dict)
+
+    @property
+    def false_alarms_per_hour(self) -> float:
+        return self.false_alarms / self.hours if self.hours else float("nan")
+
+    @property
+    def false_alarms_per_hour_upper(self) -> float:
+        # One-sided 95 % Poisson upper bound, so zero observed alarms still gives a budget.
+        if not self.hours:
+            return float("nan")
+        return stats.chi2.ppf(0.95, 2 * (self.false_alarms + 1)) / 2 / self.hours
+
+    def detection_rate(self, label: str) -> float:
+        delays = self.delays_s.get(label) or []
+        return sum(delay is not None for delay in delays) / len(delays) if delays else float("nan")
+
+    def delay_percentile(self, label: str, fraction: float) -> float:
+        # Misses count as infinitely late, so percentiles past the detection rate are inf.
+        delays = self.delays_s.get(label) or []
+        if not delays:
+            return float("nan")
+        values = np.array([math.inf if delay is None else delay for delay in delays])
+        return float(np.quantile(values, fraction, method="higher"))
+
+
+def unbiased_bits(generator: np.random.Generator, count: int) -> np.ndarray:
+    packed = generator.bytes((count + 7) // 8)
+    return np.unpackbits(np.frombuffer(packed, dtype=np.uint8), bitorder="little")[:count]
+
+
+def tick_statistics(
+    bits: np.ndarray,
+    ends: np.ndarray,
+    windows: Sequence[int],
+    scan_min_bits: int = live.SCAN_MIN_BITS,
+    byte_lag: Optional[int] = None,
+) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """Z-scores and p-values of every live test for the windows ending at each of ``ends``.
+
+    Matches ``analysis.tests.run_all_tests`` tick for tick. Every test is evaluated for all
+    ticks at once: the original six from prefix counts sampled at the window edges, the
+    block tests from the same ±1 walk or from each tick's bits reshaped into blocks,
+    linear complexity by running Berlekamp–Massey over every tick's blocks in one batch,
+    and the scan from one subtraction of the walk per length, shared by all ticks. With a
+    ``byte_lag`` the byte tests follow, on bytes packed from the start of ``bits``.
+    """
+    bits = np.asarray(bits, dtype=np.uint8)
+    ends = np.asarray(ends, dtype=np.int64)
+    edges = [ends - offset for offset in (1, 2)] + [ends - w for w in windows]
+    counter = _PrefixCounter(len(bits), np.concatenate(edges))
+    walk = np.concatenate([[0], np.cumsum(2 * bits.astype(np.int32) - 1, dtype=np.int32)])
+    pairs = counter.at((bits[:-1] << 1) | bits[1:], 4)
+    triples = counter.at((bits[:-2] << 2) | (bits[1:-1] << 1) | bits[2:], 8)
+    templates = None
+    if byte_lag is not None:
+        data = np.packbits(bits[: len(bits) // 8 * 8], bitorder="little")
+        byte_ends = ends // 8
+        byte_edges = [byte_ends] + [byte_ends - w // 8 for w in windows]
+        histograms = _PrefixCounter(len(data), np.concatenate(byte_edges)).at(data, 256)
+        centred = 2 * data.astype(np.int64) - 255
+        lagged = {step: _lagged_prefix(centred, step) for step in sorted({1, byte_lag})}
+
+    keys: List[str] = []
+    z_columns: List[np.ndarray] = []
+    p_columns: List[np.ndarray] = []
+    for window in sorted(windows):
+        starts = ends - window
+        n = float(window)
+        columns: Dict[Callable, Tuple[np.ndarray, np.ndarray]] = {}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Ones in the window, recovered from the ±1 walk.
+            count_ones = (walk[ends] - walk[starts] + n) / 2
+            s_obs = 2 * count_ones - n
+            monobit_z = s_obs / math.sqrt(n)
+            columns[live.monobit_test] = (
+                monobit_z,
+                special.erfc(np.abs(monobit_z) / math.sqrt(2)),
+            )
+
+            pair_counts = (pairs(ends - 1) - pairs(starts)).astype(float)
+            pi = count_ones / n
+            # Every 01 or 10 pair starts a new run.
+            runs = 1 + pair_counts[:, 1] + pair_counts[:, 2]
+            expected = 2 * n * pi * (1 - pi)
+            denominator = 2 * math.sqrt(2 * n) * pi * (1 - pi)
+            runs_z = (runs - expected) / denominator
+            runs_p = special.erfc(np.abs(runs - expected) / denominator)
+            frequency_fail = np.abs(pi - 0.5) >= 2 / math.sqrt(n)
+            columns[live.runs_test] = (
+                np.where(frequency_fail, np.inf, runs_z),
+                np.where(frequency_fail, 0.0, runs_p),
+            )
+
+            total = n - 1
+            serial_chi = 4 / total * np.sum(pair_counts**2, axis=1) - total
+            columns[live.serial_two_bit_test] = (
+                (serial_chi - 3) / math.sqrt(6),
+                stats.chi2.sf(serial_chi, df=3),
+            )
+
+            columns[live.approximate_entropy_test] = _approximate_entropy(
+                bits, starts, ends, window, pairs, triples
+            )
+
+            base = walk[starts]
+            highest, lowest = _walk_extrema(walk, starts, ends)
+            max_dev = np.maximum(highest - base, base - lowest)
+            columns[live.cusum_test] = (monobit_z, 1 - stats.norm.cdf(max_dev / math.sqrt(n)))
+
+            if window >= 64:
+                columns[live.light_fft_test] = _light_fft(bits, starts, window)
+
+            frequency = _block_frequency(walk, starts, window)
+            if frequency is not None:
+                columns[live.block_frequency_test] = frequency
+            if window // 8 >= live.TEMPLATE_MIN_BLOCK:
+                if templates is None:
+                    templates = _template_prefix(bits, walk)
+                columns[live.nonoverlapping_template_test] = _template(templates, starts, window)
+            views = sliding_window_view(bits, window)[starts]
+            longest = _longest_run(views, window)
+            if longest is not None:
+                columns[live.longest_run_test] = longest
+            universal = _universal(views, window)
+            if universal is not None:
+                columns[live.maurer_universal_test] = universal
+            if window // live.LINEAR_COMPLEXITY_BLOCK >= 200:
+                columns[live.linear_complexity_test] = _linear_complexity(views, window)
+            if window >= 2 * max(64, scan_min_bits):
+                columns[live.scan_test] = _scan(walk, starts, ends, window, scan_min_bits)
+        for func, name in zip(live.TESTS, live.TEST_NAMES, strict=True):
+            if func not in columns:
+                continue
+            z_score, p_value = columns[func]
+            keys.append(f"{name}@{window}")
+            z_columns.append(np.asarray(z_score, dtype=float))
+            p_columns.append(np.clip(np.asarray(p_value, dtype=float), 1e-12, 1 - 1e-12))
+        if byte_lag is None:
+            continue
+        byte_columns = _byte_tests(histograms, lagged, byte_ends, window // 8, byte_lag)
+        for name, (z_score, p_value) in byte_columns.items():
+            keys.append(f"{name}@{window}")
+            z_columns.append(z_score)
+            p_columns.append(np.clip(p_value, 1e-12, 1 - 1e-12))
+    return keys, np.column_stack(z_columns), np.column_stack(p_columns)
+
+
+def combine_ticks(z_scores: np.ndarray, p_values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise Stouffer GDI and Benjamini–Hochberg q-values, as ``build_combined_stats``."""
+    count = z_scores.shape[1]
+    gdi = z_scores.sum(axis=1) / math.sqrt(count)
+    return gdi, bh_adjust(p_values)
+
+
+def run_calibration(
+    windows: Sequence[int],
+    thresholds: Sequence[ThresholdSet],
+    bias_models: Sequence[BiasModel] = (),
+    hours: float = 1.0,
+    interval_s: float = 0.5,
+    bits_per_tick: int = 131072,
+    trials: int = 50,
+    max_delay_s: float = 120.0,
+    seed: int = 0,
+    processes: int = 1,
+    scan_min_bits: int = live.SCAN_MIN_BITS,
+    byte_lag: Optional[int] = None,
+) -> List[CalibrationRow]:
+    windows = sorted(windows)
+    # Tests only see bits inside a window, so bits between non-overlapping windows never
+    # need to be generated.
+    step = max(1, min(bits_per_tick, windows[-1]))
+    total_ticks = max(1, int(round(hours * 3600 / interval_s)))
+    max_delay_ticks = max(1, int(math.ceil(max_delay_s / interval_s)))
+
+    specs: List[Tuple[str, object]] = []
+    for start in range(0, total_ticks, _JOB_TICKS):
+        specs.append(("null", min(_JOB_TICKS, total_ticks - start)))
+    for model in bias_models:
+        for start in range(0, trials, _JOB_TRIALS):
+            specs.append(("delay", (model, min(_JOB_TRIALS, trials - start), max_delay_ticks)))
+    seeds = np.random.SeedSequence(seed).spawn(len(specs))
+    jobs = [
+        (kind, windows, thresholds, step, params, job_seed, scan_min_bits, byte_lag)
+        for (kind, params), job_seed in zip(specs, seeds, strict=True)
+    ]
+
+    hours_run = total_ticks * interval_s / 3600
+    rows = [CalibrationRow(thresholds=item, hours=hours_run) for item in thresholds]
+    for row in rows:
+        row.delays_s = {model.label: [] for model in bias_models}
+    if processes > 1:
+        with mp.get_context("spawn").Pool(processes) as pool:
+            results = list(pool.imap_unordered(_run_job, jobs))
+    else:
+        results = [_run_job(job) for job in jobs]
+    for kind, label, per_threshold in results:
+        for row, value in zip(rows, per_threshold, strict=True):
+            if kind == "null":
+                row.false_alarms += value
+            else:
+                row.delays_s[label].extend(
+                    None if delay is None else delay * interval_s for delay in value
+                )
+    return rows
+
+
+def format_table(
+    rows: Sequence[CalibrationRow], bias_labels: Sequence[str], budget: float | None = None
+) -> str:
+    header = ["gdi_z", "sus_z", "sus_n", "fdr_q", "FA/h", "FA/h95"]
+    for label in bias_labels:
+        header.extend([f"{label} det%", "med_s", "p95_s"])
+    if budget is not None:
+        header.append("budget")
+    lines = [header]
+    ordered = sorted(
+        rows,
+        key=lambda row: (
+            row.false_alarms_per_hour_upper,
+            *(row.delay_percentile(label, 0.5) for label in bias_labels),
+        ),
+    )
+    for row in ordered:
+        item = row.thresholds
+        cells = [
+            f"{item.gdi_z:g}",
+            f"{item.sustained_z:g}",
+            str(item.sustained_ticks),
+            f"{item.fdr_q:g}",
+            f"{row.false_alarms_per_hour:.3g}",
+            f"{row.false_alarms_per_hour_upper:.3g}",
+        ]
+        for label in bias_labels:
+            cells.extend(
+                [
+                    f"{100 * row.detection_rate(label):.0f}",
+                    f"{row.delay_percentile(label, 0.5):.1f}",
+                    f"{row.delay_percentile(label, 0.95):.1f}",
+                ]
+            )
+        if budget is not None:
+            cells.append("ok" if row.false_alarms_per_hour_upper <= budget else "-")
+        lines.append(cells)
+    widths = [max(len(line[col]) for line in lines) for col in range(len(header))]
+    return "\n".join(
+        "  ".join(cell.rjust(width) for cell, width in zip(line, widths, strict=True))
+        for line in lines
+    )
+
+
+def write_csv(path: Path, rows: Sequence[CalibrationRow], bias_labels: Sequence[str]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        header = [
+            "gdi_z",
+            "sustained_z",
+            "sustained_ticks",
+            "fdr_q",
+            "hours",
+            "false_alarms",
+            "false_alarms_per_hour",
+            "false_alarms_per_hour_95",
+        ]
+        for label in bias_labels:
+            header.extend([f"{label}:detection_rate", f"{label}:median_s", f"{label}:p95_s"])
+        writer.writerow(header)
+        for row in rows:
+            item = row.thresholds
+            values = [
+                item.gdi_z,
+                item.sustained_z,
+                item.sustained_ticks,
+                item.fdr_q,
+                row.hours,
+                row.false_alarms,
+                row.false_alarms_per_hour,
+                row.false_alarms_per_hour_upper,
+            ]
+            for label in bias_labels:
+                values.extend(
+                    [
+                        row.detection_rate(label),
+                        row.delay_percentile(label, 0.5),
+                        row.delay_percentile(label, 0.95),
+                    ]
+                )
+            writer.writerow(values)
+
+
+class _PrefixCounter:
+    """Counts of each symbol in ``codes[:p]`` for a fixed set of positions ``p``."""
+
+    def __init__(self, length: int, positions: np.ndarray) -> None:
+        self._positions = np.unique(np.clip(positions, 0, length))
+        edges = np.concatenate([[0], self._positions, [length]])
+        self._labels = np.repeat(
+            np.arange(len(self._positions) + 1, dtype=np.int64), np.diff(edges)
+        )
+
+    def at(self, codes: np.ndarray, symbols: int):
+        span = min(len(codes), len(self._labels))
+        counts = np.bincount(
+            self._labels[:span] * symbols + codes[:span],
+            minlength=(len(self._positions) + 1) * symbols,
+        ).reshape(-1, symbols)
+        prefix = np.cumsum(counts, axis=0)
+        positions = self._positions
+
+        def lookup(query: np.ndarray) -> np.ndarray:
+            return prefix[np.searchsorted(positions, query)]
+
+        return lookup
+
+
+def _walk_extrema(
+    walk: np.ndarray, starts: np.ndarray, ends: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Max and min of walk[s + 1 : e + 1] per tick. Interleaving the bounds lets reduceat
+    # cover every window in one pass; the odd entries (gaps between windows) are dropped.
+    padded = np.append(walk, walk[-1])
+    bounds = np.empty(2 * len(starts), dtype=np.int64)
+    bounds[0::2] = starts + 1
+    bounds[1::2] = ends + 1
+    return (
+        np.maximum.reduceat(padded, bounds)[0::2],
+        np.minimum.reduceat(padded, bounds)[0::2],
+    )
+
+
+def _approximate_entropy(
+    bits: np.ndarray, starts: np.ndarray, ends: np.ndarray, window: int, pairs, triples
+) -> Tuple[np.ndarray, np.ndarray]:
+    n = float(window)
+    rows = np.arange(len(ends))
+    # Patterns that run off the end of the window wrap to its start, as in the live test.
+    first, second = bits[starts].astype(np.int64), bits[starts + 1].astype(np.int64)
+    last, penultimate = bits[ends - 1].astype(np.int64), bits[ends - 2].astype(np.int64)
+    counts2 = (pairs(ends - 1) - pairs(starts)).astype(float)
+    counts2[rows, 2 * last + first] += 1
+    counts3 = (triples(ends - 2) - triples(starts)).astype(float)
+    counts3[rows, 4 * penultimate + 2 * last + first] += 1
+    counts3[rows, 4 * last + 2 * first + second] += 1
+
+    def phi(counts: np.ndarray) -> np.ndarray:
+        probs = counts / n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            logs = np.where(probs > 0, np.log(probs), 0)
+        return np.sum(probs * logs, axis=1)
+
+    ap_en = phi(counts2) - phi(counts3)
+    chi_sq = 2 * n * (math.log(2) - ap_en)
+    return (chi_sq - 3) / math.sqrt(6), stats.chi2.sf(chi_sq, df=3)
+
+
+def _light_fft(bits: np.ndarray, starts: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    views = sliding_window_view(bits, window)
+    threshold = math.sqrt(math.log(1 / 0.05) * window)
+    counts = np.empty(len(starts))
+    batch = max(1, _FFT_BATCH_BITS // window)
+    for offset in range(0, len(starts), batch):
+        block = 2 * views[starts[offset : offset + batch]].astype(float) - 1
+        magnitudes = np.abs(np.fft.rfft(block, axis=1)[:, : window // 2])
+        counts[offset : offset + batch] = np.sum(magnitudes < threshold, axis=1)
+    expected = 0.95 * (window / 2)
+    deviation = (counts - expected) / math.sqrt(window * 0.95 * 0.05 / 4)
+    return -deviation, stats.norm.sf(np.abs(deviation))
+
+
+def _block_frequency(
+    walk: np.ndarray, starts: np.ndarray, window: int
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    block = max(20, window // 99 + 1)
+    count = window // block
+    if count < 1:
+        return None
+    positions = starts[:, None] + block * np.arange(count + 1)
+    # Ones before each position, recovered from the ±1 walk.
+    ones = (walk[positions].astype(np.int64) + positions) // 2
+    proportions = np.diff(ones, axis=1) / block
+    chi_sq = 4 * block * np.sum((proportions - 0.5) ** 2, axis=1)
+    return (chi_sq - count) / math.sqrt(2 * count), stats.chi2.sf(chi_sq, df=count)
+
+
+def _longest_run(views: np.ndarray, window: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    table = live.longest_run_table(window)
+    if table is None:
+        return None
+    _, block, low, high, probabilities = table
+    count = window // block
+    runs = views[:, : count * block].reshape(len(views), count, block).astype(bool)
+    longest = np.zeros((len(views), count), dtype=np.int64)
+    for _ in range(high):
+        longest += runs.any(axis=2)
+        runs = runs[:, :, :-1] & runs[:, :, 1:]
+    categories = high - low + 1
+    classes = np.clip(longest, low, high) - low + categories * np.arange(len(views))[:, None]
+    observed = np.bincount(classes.ravel(), minlength=len(views) * categories)
+    observed = observed.reshape(len(views), categories)
+    expected = count * np.asarray(probabilities)
+    chi_sq = np.sum((observed - expected) ** 2 / expected, axis=1)
+    dof = len(probabilities) - 1
+    return (chi_sq - dof) / math.sqrt(2 * dof), stats.chi2.sf(chi_sq, df=dof)
+
+
+def _template_prefix(bits: np.ndarray, walk: np.ndarray) -> np.ndarray:
+    """``prefix[i]`` counts the matches of ``000000001`` that start before bit ``i``."""
+    m = 9
+    ones = (walk.astype(np.int64) + np.arange(len(walk))) // 2
+    matches = (ones[m - 1 : -1] == ones[:-m]) & (bits[m - 1 :] == 1)
+    prefix = np.zeros(len(bits) + 1, dtype=np.int64)
+    np.cumsum(matches, out=prefix[1 : len(matches) + 1])
+    prefix[len(matches) + 1 :] = prefix[len(matches)]
+    return prefix
+
+
+def _template(
+    prefix: np.ndarray, starts: np.ndarray, window: int, blocks: int = 8
+) -> Tuple[np.ndarray, np.ndarray]:
+    m = 9
+    block = window // blocks
+    # Matches must start early enough in their block to end inside it.
+    first = starts[:, None] + block * np.arange(blocks)
+    counts = prefix[first + block - m + 1] - prefix[first]
+    mean = (block - m + 1) / 2**m
+    variance = block * (1 / 2**m - (2 * m - 1) / 2 ** (2 * m))
+    chi_sq = np.sum((counts - mean) ** 2, axis=1) / variance
+    return (chi_sq - blocks) / math.sqrt(2 * blocks), stats.chi2.sf(chi_sq, df=blocks)
+
+
+def _linear_complexity(views: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    block = live.LINEAR_COMPLEXITY_BLOCK
+    count = window // block
+    blocks = views[:, : count * block].reshape(len(views) * count, block)
+    lengths = live.berlekamp_massey_lengths(blocks).reshape(len(views), count)
+    return np.array([live.linear_complexity_result(row, block) for row in lengths]).T
+
+
+def _universal(views: np.ndarray, window: int) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    block = live.universal_block(window)
+    if not block:
+        return None
+    init = 10 * 2**block
+    total = window // block
+    tests = total - init
+    rows = len(views)
+    values = np.zeros((rows, total), dtype=np.int64)
+    for offset in range(block):
+        values = (values << 1) | views[:, offset : total * block : block]
+    # Previous occurrence of each value within its own tick: neighbours after a stable sort
+    # by (tick, value).
+    keys = (values + (np.arange(rows, dtype=np.int64) << block)[:, None]).ravel()
+    order = np.argsort(keys, kind="stable")
+    same = keys[order[1:]] == keys[order[:-1]]
+    previous = np.full(rows * total, -1, dtype=np.int64)
+    previous[order[1:][same]] = order[:-1][same] % total
+    distances = np.arange(init, total) - previous.reshape(rows, total)[:, init:]
+    statistic = np.sum(np.log2(distances), axis=1) / tests
+    expected, variance = live.UNIVERSAL_TABLE[block]
+    c = 0.7 - 0.8 / block + (4 + 32 / block) * tests ** (-3 / block) / 15
+    sigma = c * math.sqrt(variance / tests)
+    p_value = special.erfc(np.abs(statistic - expected) / (math.sqrt(2) * sigma))
+    return (expected - statistic) / sigma, p_value
+
+
+def _scan(
+    walk: np.ndarray, starts: np.ndarray, ends: np.ndarray, window: int, min_bits: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    lengths = live.scan_lengths(window, min_bits)
+    if len(starts) * window < len(walk):
+        # Ticks far apart cover little of the walk: scan each tick's own stretch of it.
+        peaks = live.scan_peaks(sliding_window_view(walk, window + 1)[starts], lengths)
+    else:
+        peaks = np.zeros(len(starts))
+        bounds = np.empty(2 * len(starts), dtype=np.int64)
+        bounds[0::2] = starts
+        sums = np.empty(len(walk), dtype=walk.dtype)
+        for length in lengths:
+            # Sums of every stretch of ``length`` bits, shared by all ticks. A tick's
+            # stretches start in [start, end - length]; the odd bounds are gaps, dropped.
+            count = len(walk) - length
+            np.subtract(walk[length:], walk[:-length], out=sums[:count])
+            bounds[1::2] = ends - length + 1
+            highest = np.maximum.reduceat(sums[: count + 1], bounds)[0::2]
+            lowest = np.minimum.reduceat(sums[: count + 1], bounds)[0::2]
+            peaks = np.maximum(peaks, np.maximum(highest, -lowest) / math.sqrt(length))
+    p_value = live.scan_p_value(peaks, window, lengths)
+    return stats.norm.isf(np.maximum(p_value, 1e-12)), p_value
+
+
+def _lagged_prefix(centred: np.ndarray, lag: int) -> np.ndarray:
+    """``prefix[i]`` sums ``y[j] * y[j + lag]`` over the pairs starting before byte ``i``."""
+    prefix = np.zeros(len(centred) + 1, dtype=np.int64)
+    if len(centred) > lag:
+        np.cumsum(centred[:-lag] * centred[lag:], out=prefix[1 : len(centred) - lag + 1])
+        prefix[len(centred) - lag + 1 :] = prefix[len(centred) - lag]
+    return prefix
+
+
+def _byte_tests(
+    histograms, lagged: Dict[int, np.ndarray], byte_ends: np.ndarray, size: int, lag: int
+) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    # The newest ``size`` whole bytes before each end, as RollingByteCounts keeps them.
+    firsts = byte_ends - size
+    columns: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    if size >= 256 * live.MIN_BYTES_PER_BIN:
+        counts = (histograms(byte_ends) - histograms(firsts)).astype(float)
+        expected = size / 256
+        chi_sq = np.sum((counts - expected) ** 2, axis=1) / expected
+        columns["byte_chi2"] = ((chi_sq - 255) / math.sqrt(2 * 255), stats.chi2.sf(chi_sq, df=255))
+    for name, step in (("byte_serial", 1), ("byte_lag", lag)):
+        pairs = size - step
+        if pairs < 256 * live.MIN_BYTES_PER_BIN:
+            continue
+        products = lagged[step][byte_ends - step] - lagged[step][firsts]
+        z_score = products / (live.CENTRED_BYTE_VARIANCE * math.sqrt(pairs))
+        columns[name] = (z_score, special.erfc(np.abs(z_score) / math.sqrt(2)))
+    return columns
+
+
+def _run_detectors(
+    detectors: List[Detector], gdi: np.ndarray, q_values: np.ndarray
+) -> List[List[int]]:
+    """Feed every tick to each detector; returns the tick indices at which alarms began."""
+    onsets: List[List[int]] = []
+    for detector in detectors:
+        alarms = []
+        for index, (value, q_row) in enumerate(zip(gdi.tolist(), q_values, strict=True)):
+            previous = detector.state
+            state, _ = detector.evaluate(value, q_row)
+            if state == DetectorState.EVENT and previous != DetectorState.EVENT:
+                alarms.append(index)
+        onsets.append(alarms)
+    return onsets
+
+
+def _run_job(job: Tuple) -> Tuple[str, str, List]:
+    kind, windows, thresholds, step, params, seed, scan_min_bits, byte_lag = job
+    generator = np.random.default_rng(seed)
+    largest = windows[-1]
+    if kind == "null":
+        detectors = [Detector(item.detector_config()) for item in thresholds]
+        alarms = [0] * len(thresholds)
+        carry = unbiased_bits(generator, largest)
+        remaining = params
+        block_ticks = max(1, _BLOCK_BITS // step)
+        while remaining > 0:
+            ticks = min(block_ticks, remaining)
+            bits = np.concatenate([carry, unbiased_bits(generator, ticks * step)])
+            ends = len(carry) + step * np.arange(1, ticks + 1)
+            _, z_scores, p_values = tick_statistics(bits, ends, windows, scan_min_bits, byte_lag)
+            gdi, q_values = combine_ticks(z_scores, p_values)
+            for index, onsets in enumerate(_run_detectors(detectors, gdi, q_values)):
+                alarms[index] += len(onsets)
+            carry = bits[-largest:]
+            remaining -= ticks
+        return kind, "", alarms
+
+    model, trial_count, max_delay_ticks = params
+    delays: List[List[Optional[int]]] = [[] for _ in thresholds]
+    for _ in range(trial_count):
+        bits = np.concatenate(
+            [unbiased_bits(generator, largest), model.generate(generator, max_delay_ticks * step)]
+        )
+        ends = largest + step * np.arange(1, max_delay_ticks + 1)
+        _, z_scores, p_values = tick_statistics(bits, ends, windows, scan_min_bits, byte_lag)
+        gdi, q_values = combine_ticks(z_scores, p_values)
+        detectors = [Detector(item.detector_config()) for item in thresholds]
+        for index, onsets in enumerate(_run_detectors(detectors, gdi, q_values)):
+            delays[index].append(onsets[0] + 1 if onsets else None)
+    return kind, model.label, delays
+
+
+def _floats(text: str) -> List[float]:
+    return [float(value) for value in text.split(",") if value.strip()]
+
+
+def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Monte Carlo calibration of detector thresholds")
+    parser.add_argument("--config", default="config.yaml", help="Kiosk config for defaults")
+    parser.add_argument("--windows", type=_floats, help="Window sizes (default: config)")
+    parser.add_argument("--hours", type=float, default=10.0, help="Unbiased hours to simulate")
+    parser.add_argument("--interval-ms", type=float, help="Tick interval (default: config)")
+    parser.add_argument(
+        "--bit-rate", type=float, help="Source bits per second (default: pipeline.max_bit_rate)"
+    )
+    parser.add_argument("--gdi-z", type=_floats, help="GDI thresholds to sweep")
+    parser.add_argument("--sustained-z", type=_floats, help="Sustained thresholds to sweep")
+    parser.add_argument("--sustained-ticks", type=_floats, help="Sustained tick counts to sweep")
+    parser.add_argument("--fdr-q", type=_floats, help="FDR q thresholds to sweep")
+    parser.add_argument(
+        "--bias",
+        action="append",
+        default=[],
+        help="Bias model for detection delay, e.g. p1:0.005, corr:0.01, flip:0.01 (repeatable)",
+    )
+    parser.add_argument("--trials", type=int, default=50, help="Trials per bias model")
+    parser.add_argument("--max-delay-s", type=float, default=120.0)
+    parser.add_argument("--budget", type=float, help="Target false alarms per hour")
+    parser.add_argument("--processes", type=int, default=mp.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", type=Path, help="Also write the table to this CSV file")
+    return parser.parse_args(list(argv) if argv is not None else None)
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    args = parse_args(argv)
+    config: Dict = {}
+    if Path(args.config).exists():
+        with open(args.config, encoding="utf-8") as handle:
+            config = yaml.safe_load(handle) or {}
+    windows_cfg = config.get("windows", {})
+    alert_cfg = config.get("alert", {})
+    byte_cfg = config.get("byte_tests", {})
+    sizes = args.windows or windows_cfg.get("sizes", [1024, 10000, 100000])
+    windows = [int(size) for size in sizes]
+    interval_s = (args.interval_ms or windows_cfg.get("analysis_interval_ms", 500)) / 1000
+    bit_rate = args.bit_rate or config.get("pipeline", {}).get("max_bit_rate") or 262144
+    grid = itertools.product(
+        args.gdi_z or sorted({alert_cfg.get("gdi_z", 3.0), 3.0, 3.5, 4.0, 4.5, 5.0}),
+        args.sustained_z or [alert_cfg.get("sustained_z", 2.5)],
+        args.sustained_ticks or [alert_cfg.get("sustained_ticks", 5)],
+        args.fdr_q or sorted({alert_cfg.get("fdr_q", 0.01), 0.001, 0.0001}),
+    )
+    thresholds = [
+        ThresholdSet(gdi_z=gdi, sustained_z=sustained, sustained_ticks=int(ticks), fdr_q=q)
+        for gdi, sustained, ticks, q in grid
+    ]
+    bias_models = [BiasModel.parse(spec) for spec in args.bias]
+    rows = run_calibration(
+        windows,
+        thresholds,
+        bias_models,
+        hours=args.hours,
+        interval_s=interval_s,
+        bits_per_tick=int(bit_rate * interval_s),
+        trials=args.trials,
+        max_delay_s=args.max_delay_s,
+        seed=args.seed,
+        processes=max(1, args.processes),
+        scan_min_bits=int(windows_cfg.get("scan_min_bits", live.SCAN_MIN_BITS)),
+        byte_lag=max(1, int(byte_cfg.get("lag", 4))) if byte_cfg.get("enabled", True) else None,
+    )
+    labels = [model.label for model in bias_models]
+    print(
+        f"windows={windows} interval={interval_s:g}s bits/tick={int(bit_rate * interval_s)} "
+        f"hours={rows[0].hours:g} trials={args.trials}"
+    )
+    print(format_table(rows, labels, args.budget))
+    if args.csv:
+        write_csv(args.csv, rows, labels)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
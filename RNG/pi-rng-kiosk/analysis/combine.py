@@ -1,52 +1,63 @@
 from __future__ import annotations
 
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable
 
 import numpy as np
 from scipy import stats
 
-from .model import CombinedStats, TestResult, WindowSummary
+from .model import CombinedStats, TickResultTable
 
 
 def stouffer_z(scores: Iterable[float]) -> float:
-    values = np.array(list(scores), dtype=float)
+    values = np.fromiter(scores, dtype=float)
     if not len(values):
         return 0.0
     return float(np.sum(values) / np.sqrt(len(values)))
 
 
-def apply_bh(p_values: Dict[str, float]) -> Dict[str, float]:
-    count = len(p_values)
-    if count == 0:
-        return {}
-    sorted_items = sorted(p_values.items(), key=lambda item: item[1])
-    adj = {}
-    min_coeff = 1.0
-    for rank, (key, p_val) in reversed(list(enumerate(sorted_items, start=1))):
-        coeff = (p_val * count) / rank
-        min_coeff = min(min_coeff, coeff)
-        adj[key] = min(1.0, min_coeff)
-    return adj
-
-
-def build_combined_stats(
-    summaries: Dict[int, WindowSummary],
-) -> CombinedStats:
-    all_results: List[TestResult] = []
-    ordered_summaries: List[WindowSummary] = []
-    for window in sorted(summaries):
-        summary = summaries[window]
-        ordered_summaries.append(summary)
-        all_results.extend(summary.tests)
-    if not all_results:
-        return CombinedStats(gdi=0.0, stouffer_z=0.0, q_values={}, window_summaries=ordered_summaries)
-    q_values = apply_bh({result.key: result.p_value for result in all_results})
-    for summary in ordered_summaries:
-        summary.q_values = {result.key: q_values.get(result.key, 1.0) for result in summary.tests}
-    combined_z = stouffer_z([result.z_score for result in all_results])
-    return CombinedStats(
-        gdi=combined_z,
-        stouffer_z=combined_z,
-        q_values=q_values,
-        window_summaries=ordered_summaries,
+def bh_adjust(p_values: np.ndarray) -> np.ndarray:
+    """Benjamini–Hochberg q-values along the last axis, so a 2-D input adjusts each row."""
+    count = p_values.shape[-1]
+    order = np.argsort(p_values, axis=-1, kind="stable")
+    ranked = np.take_along_axis(p_values, order, axis=-1) * count / np.arange(1, count + 1)
+    ranked = np.minimum(np.minimum.accumulate(ranked[..., ::-1], axis=-1)[..., ::-1], 1.0)
+    q_values = np.empty_like(ranked)
+    np.put_along_axis(q_values, order, ranked, axis=-1)
+    return q_values
+
+
+def build_combined_stats(table: TickResultTable) -> CombinedStats:
+    """Fill in the table's q-values and combine its z-scores into the GDI."""
+    valid = table.valid
+    if not valid.any():
+        return CombinedStats(gdi=0.0, stouffer_z=0.0, table=table)
+    table.q[valid] = bh_adjust(table.p[valid])
+    combined_z = stouffer_z(table.z[valid])
+    return CombinedStats(gdi=combined_z, stouffer_z=combined_z, table=table)
+
+
+def combine_device_stats(device_stats: Dict[str, CombinedStats]) -> CombinedStats:
+    # Device-prefixed columns let BH run across every device's tests; the GDI is the
+    # Stouffer combination of the per-device GDIs.
+    names = sorted(device_stats)
+    tables = [device_stats[name].table for name in names]
+    windows = np.unique(np.concatenate([table.windows for table in tables]))
+    merged = TickResultTable.empty(
+        windows,
+        [
+            f"{name}:{test}"
+            for name, table in zip(names, tables, strict=True)
+            for test in table.names
+        ],
     )
+    column = 0
+    for table in tables:
+        rows = np.searchsorted(windows, table.windows)[:, None]
+        columns = np.arange(column, column + len(table.names))
+        merged.z[rows, columns] = table.z
+        merged.p[rows, columns] = table.p
+        merged.valid[rows, columns] = table.valid
+        column += len(table.names)
+    combined = build_combined_stats(merged)
+    combined.gdi = stouffer_z([device_stats[name].gdi for name in names])
+    return combined
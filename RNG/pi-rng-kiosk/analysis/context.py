@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from functools import cached_property
+
+import numpy as np
+
+
+class TickContext:
+    """Intermediates of one tick's longest window, shared by every test and window.
+
+    The shorter windows of a tick are suffixes of the longest one, so a test asks for the
+    newest ``window`` bits and slices the shared arrays instead of rebuilding them. Each
+    intermediate (prefix sums of ones, the ±1 walk and mapping, and the overlapping pair
+    and triple pattern indices) is built on first use and at most once per tick.
+    """
+
+    def __init__(self, bits: np.ndarray) -> None:
+        self.bits = np.array(bits, dtype=np.int8)
+        self.size = len(self.bits)
+
+    def start(self, window: int) -> int:
+        return self.size - window
+
+    def bits_of(self, window: int) -> np.ndarray:
+        return self.bits[self.size - window :]
+
+    @cached_property
+    def prefix(self) -> np.ndarray:
+        """``prefix[i]`` is the number of ones among the first ``i`` bits."""
+        prefix = np.zeros(self.size + 1, dtype=np.int64)
+        np.cumsum(self.bits, out=prefix[1:])
+        return prefix
+
+    @cached_property
+    def walk(self) -> np.ndarray:
+        """``walk[i]`` is the ±1 random walk over the first ``i`` bits."""
+        return 2 * self.prefix - np.arange(self.size + 1)
+
+    @cached_property
+    def mapped(self) -> np.ndarray:
+        return (2 * self.bits - 1).astype(float)
+
+    @cached_property
+    def pairs(self) -> np.ndarray:
+        return self._patterns(self.bits, 2)
+
+    @cached_property
+    def triples(self) -> np.ndarray:
+        return self._patterns(self.bits, 3)
+
+    def ones(self, window: int) -> int:
+        return int(self.prefix[-1] - self.prefix[self.size - window])
+
+    def walk_of(self, window: int) -> np.ndarray:
+        """The cumulative ±1 sums over the window, as ``np.cumsum(2 * bits - 1)``."""
+        start = self.size - window
+        return self.walk[start + 1 :] - self.walk[start]
+
+    def pattern_counts(self, window: int, block: int, cyclic: bool = False) -> np.ndarray:
+        """Counts of each overlapping ``block``-bit pattern in the window, MSB first.
+
+        ``cyclic`` also counts the ``block - 1`` patterns that wrap from the window's end
+        back to its start, as the approximate entropy test does.
+        """
+        start = self.size - window
+        if block == 2:
+            indices = self.pairs[start:]
+        elif block == 3:
+            indices = self.triples[start:]
+        else:
+            indices = self._patterns(self.bits[start:], block)
+        counts = np.bincount(indices, minlength=2**block)
+        if cyclic and block > 1:
+            bits = self.bits[start:]
+            wrapped = np.concatenate([bits[-(block - 1) :], bits[: block - 1]])
+            counts += np.bincount(self._patterns(wrapped, block), minlength=2**block)
+        return counts
+
+    @staticmethod
+    def _patterns(bits: np.ndarray, block: int) -> np.ndarray:
+        count = len(bits) - block + 1
+        if count <= 0:
+            return np.zeros(0, dtype=np.intp)
+        indices = np.zeros(count, dtype=np.intp)
+        for offset in range(block):
+            indices = (indices << 1) | bits[offset : offset + count]
+        return indices
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, Tuple
+from typing import Any, Dict, Tuple
 
+import numpy as np
+
+from .fast import PageCusum, RunningMonobit
 from .model import DetectorState
 
 
@@ -13,6 +16,10 @@ class DetectorConfig:
     sustained_ticks: int = 5
     min_significant_tests: int = 2
     fdr_q_threshold: float = 0.01
+    fast_z: float = 6.0
+    fast_span_bits: int = 65536
+    cusum_bias: float = 0.01
+    cusum_arl_bits: float = 1e12
 
 
 class Detector:
@@ -20,10 +27,68 @@ class Detector:
         self.config = config
         self.state = DetectorState.CALM
         self._sustain_counter = 0
+        self.pending_trigger: str | None = None
+        self._fast = RunningMonobit(config.fast_span_bits)
+        self._cusum = (
+            PageCusum(config.cusum_bias, config.cusum_arl_bits) if config.cusum_bias > 0 else None
+        )
+
+    @property
+    def cusum_level(self) -> float:
+        return self._cusum.level if self._cusum is not None else 0.0
+
+    def export_state(self) -> Dict[str, Any]:
+        return {
+            "state": self.state.value,
+            "sustain_counter": self._sustain_counter,
+            "cusum_up": self._cusum.up if self._cusum is not None else 0.0,
+            "cusum_down": self._cusum.down if self._cusum is not None else 0.0,
+        }
+
+    def restore_state(self, saved: Dict[str, Any]) -> None:
+        self.state = DetectorState(saved["state"])
+        self._sustain_counter = int(saved["sustain_counter"])
+        if self._cusum is not None:
+            self._cusum.up = float(saved["cusum_up"])
+            self._cusum.down = float(saved["cusum_down"])
+
+    def trigger(self, reason: str) -> None:
+        """Force the next evaluation into EVENT, for alarms raised outside the statistics."""
+        self.pending_trigger = reason
+
+    def evaluate_chunk(self, bits: np.ndarray) -> Tuple[DetectorState, str] | None:
+        """Fast tier: raise a provisional event as soon as arriving bits are off balance.
+
+        Runs per chunk between full evaluations, checking the chunk and span monobit and the
+        sequential Page CUSUM; returns None unless it moved into EVENT.
+        """
+        reason = None
+        if self.config.fast_z > 0:
+            chunk_z, span_z = self._fast.update(bits)
+            if abs(chunk_z) >= self.config.fast_z:
+                reason = "fast_chunk"
+            elif abs(span_z) >= self.config.fast_z:
+                reason = "fast_span"
+        if self._cusum is not None:
+            side = self._cusum.update(bits)
+            if side and reason is None:
+                reason = f"page_cusum_{side}"
+        if reason is None or self.state == DetectorState.EVENT:
+            return None
+        self.state = DetectorState.EVENT
+        self._sustain_counter = 0
+        return self.state, reason
 
-    def evaluate(self, gdi: float, q_values: Dict[str, float]) -> Tuple[DetectorState, str]:
+    def evaluate(self, gdi: float, q_values: np.ndarray) -> Tuple[DetectorState, str]:
+        """Full tier: one tick's GDI and q-values (NaN for tests that did not run)."""
         reason = "calm"
-        significant = sum(1 for value in q_values.values() if value <= self.config.fdr_q_threshold)
+        if self.pending_trigger:
+            reason, self.pending_trigger = self.pending_trigger, None
+            self.state = DetectorState.EVENT
+            self._sustain_counter = 0
+            return self.state, reason
+
+        significant = int(np.count_nonzero(q_values <= self.config.fdr_q_threshold))
 
         if gdi >= self.config.gdi_threshold:
             self.state = DetectorState.EVENT
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import math
+from collections import deque
+from typing import Deque, Tuple
+
+import numpy as np
+
+
+class RunningMonobit:
+    """Monobit z-scores over each arriving chunk and over a trailing span of bits.
+
+    The span keeps one (length, ±1 sum) pair per chunk, so an update costs one pass over
+    the new chunk plus O(1) bookkeeping regardless of the span length.
+    """
+
+    def __init__(self, span_bits: int) -> None:
+        self.span_bits = span_bits
+        self._chunks: Deque[Tuple[int, int]] = deque()
+        self._span_length = 0
+        self._span_sum = 0
+
+    def update(self, bits: np.ndarray) -> Tuple[float, float]:
+        length = len(bits)
+        if length == 0:
+            return 0.0, 0.0
+        total = 2 * int(np.count_nonzero(bits)) - length
+        self._chunks.append((length, total))
+        self._span_length += length
+        self._span_sum += total
+        while self._span_length - self._chunks[0][0] >= self.span_bits:
+            old_length, old_total = self._chunks.popleft()
+            self._span_length -= old_length
+            self._span_sum -= old_total
+        return total / math.sqrt(length), self._span_sum / math.sqrt(self._span_length)
+
+
+def page_cusum_threshold(bias: float, arl_bits: float) -> float:
+    """Alarm level h giving an in-control average run length of ``arl_bits`` per side.
+
+    Uses Siegmund's approximation ARL0 ~= (e^h - h - 1) / KL(p0 || p1) for the Bernoulli
+    log-likelihood ratio of p1 = 0.5 + bias against p0 = 0.5.
+    """
+    kl = 0.5 * math.log(0.5 / (0.5 + bias)) + 0.5 * math.log(0.5 / (0.5 - bias))
+    target = arl_bits * kl
+    threshold = math.log(target + 1)
+    for _ in range(20):
+        threshold = math.log(target + threshold + 1)
+    return threshold
+
+
+class PageCusum:
+    """Two-sided Page CUSUM for a persistent bias of at least ``bias`` away from 0.5.
+
+    Each side accumulates the log-likelihood ratio of p = 0.5 ± bias against 0.5, clipped
+    at zero, and alarms at ``threshold``; a side resets after it alarms. A chunk is
+    processed with one cumulative sum per side, via S_n = W_n + max(S_0, -min_k W_k), so
+    the state is two floats regardless of how long the stream runs.
+    """
+
+    def __init__(self, bias: float, arl_bits: float) -> None:
+        self.bias = bias
+        # Both sides share the false-alarm budget, so each gets twice the run length.
+        self.threshold = page_cusum_threshold(bias, 2 * arl_bits)
+        self._one = math.log(1 + 2 * bias)
+        self._zero = math.log(1 - 2 * bias)
+        self.up = 0.0
+        self.down = 0.0
+
+    @property
+    def level(self) -> float:
+        """Larger side as a fraction of the alarm threshold."""
+        return max(self.up, self.down) / self.threshold
+
+    def update(self, bits: np.ndarray) -> str | None:
+        """Feed ``bits``; return "up" or "down" if that side alarmed within them."""
+        if len(bits) == 0:
+            return None
+        ones = np.cumsum(bits, dtype=np.int64)
+        steps = np.arange(1, len(bits) + 1)
+        alarm = None
+        self.up, fired = self._advance(self.up, self._zero * (steps - ones) + self._one * ones)
+        if fired:
+            alarm = "up"
+        self.down, fired = self._advance(self.down, self._one * (steps - ones) + self._zero * ones)
+        if fired and alarm is None:
+            alarm = "down"
+        return alarm
+
+    def _advance(self, start: float, walk: np.ndarray) -> Tuple[float, bool]:
+        fired = False
+        while True:
+            level = walk + np.maximum(start, -np.minimum.accumulate(walk))
+            crossed = np.flatnonzero(level >= self.threshold)
+            if not len(crossed):
+                return float(level[-1]), fired
+            # Reset at the alarm and restart the recursion on the rest of the chunk.
+            fired = True
+            cut = crossed[0] + 1
+            if cut == len(walk):
+                return 0.0, fired
+            walk = walk[cut:] - walk[cut - 1]
+            start = 0.0
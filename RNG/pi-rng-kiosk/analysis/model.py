@@ -2,7 +2,9 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, List, Sequence
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import numpy as np
 
 
 class DetectorState(str, Enum):
@@ -12,34 +14,87 @@ class DetectorState(str, Enum):
 
 
 @dataclass(slots=True)
-class TestResult:
-    name: str
-    window: int
-    p_value: float
-    z_score: float
-    direction: str
+class TickResultTable:
+    """One tick's test results as arrays indexed by (window, test).
 
-    @property
-    def key(self) -> str:
-        return f"{self.name}@{self.window}"
+    ``windows`` (ascending) label the rows and ``names`` the columns. Cells a window is too
+    short to run hold NaN with ``valid`` False, so a tick costs four small arrays however
+    many tests run, and combining, detection and logging work on the arrays directly.
+    """
 
+    windows: np.ndarray
+    names: Tuple[str, ...]
+    z: np.ndarray
+    p: np.ndarray
+    q: np.ndarray
+    valid: np.ndarray
 
-@dataclass(slots=True)
-class WindowSummary:
-    window: int
-    tests: List[TestResult]
-    q_values: Dict[str, float] = field(default_factory=dict)
+    @classmethod
+    def empty(cls, windows: Sequence[int], names: Sequence[str]) -> "TickResultTable":
+        shape = (len(windows), len(names))
+        return cls(
+            windows=np.asarray(windows, dtype=np.int64),
+            names=tuple(names),
+            z=np.full(shape, np.nan),
+            p=np.full(shape, np.nan),
+            q=np.full(shape, np.nan),
+            valid=np.zeros(shape, dtype=bool),
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, int, float, float]]) -> "TickResultTable":
+        """Table from (test, window, z, p) rows, with columns in order of first appearance."""
+        rows = list(rows)
+        names = list(dict.fromkeys(name for name, _, _, _ in rows))
+        windows = sorted({int(window) for _, window, _, _ in rows})
+        table = cls.empty(windows, names)
+        if rows:
+            row = np.searchsorted(table.windows, [int(window) for _, window, _, _ in rows])
+            column = [names.index(name) for name, _, _, _ in rows]
+            table.z[row, column] = [float(z_score) for _, _, z_score, _ in rows]
+            table.p[row, column] = [float(p_value) for _, _, _, p_value in rows]
+            table.valid[row, column] = True
+        return table
 
-    def to_dict(self) -> Dict[str, float]:
-        return {result.name: result.z_score for result in self.tests}
+    def cells(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Row and column indices of the valid cells, windows ascending."""
+        return np.nonzero(self.valid)
+
+    def keys(self) -> List[str]:
+        """``test@window`` labels of the valid cells, in ``cells`` order."""
+        rows, columns = self.cells()
+        return [
+            f"{self.names[column]}@{window}"
+            for window, column in zip(self.windows[rows].tolist(), columns.tolist(), strict=True)
+        ]
+
+    def rows(self) -> Iterator[Tuple[int, str, float, float, float]]:
+        """(window, test, z, p, q) for each valid cell, in ``cells`` order."""
+        rows, columns = self.cells()
+        return zip(
+            self.windows[rows].tolist(),
+            [self.names[column] for column in columns.tolist()],
+            self.z[rows, columns].tolist(),
+            self.p[rows, columns].tolist(),
+            self.q[rows, columns].tolist(),
+            strict=True,
+        )
 
 
 @dataclass(slots=True)
 class CombinedStats:
     gdi: float
     stouffer_z: float
-    q_values: Dict[str, float]
-    window_summaries: Sequence[WindowSummary]
+    table: TickResultTable
+
+
+@dataclass(slots=True)
+class DeviceStatus:
+    name: str
+    timestamp_ms: int
+    gdi: float
+    state: DetectorState
+    reason: str
 
 
 @dataclass(slots=True)
@@ -48,4 +103,19 @@ class AnalysisSnapshot:
     combined: CombinedStats
     detector_state: DetectorState
     detector_reason: str
+    devices: List[DeviceStatus] = field(default_factory=list)
+    # Counts of "0"/"1" and of the serial pairs "00".."11" over the most recent bits.
+    bit_counts: Dict[str, int] = field(default_factory=dict)
+    # (label, reason) of each shadow detector config that entered EVENT on this tick.
+    shadow_events: List[Tuple[str, str]] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class EventCapture:
+    """Raw bits around a detector trigger; the trigger sits at ``bits[pre_bits]``."""
+
+    trigger_ms: int
+    reason: str
+    pre_bits: int
+    bits: np.ndarray
 
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import dataclasses
+import itertools
+import threading
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .detector import DetectorConfig
+from .model import DetectorState
+
+_STATES = (DetectorState.CALM, DetectorState.EVENT, DetectorState.RECOVER)
+_CALM, _EVENT, _RECOVER = range(3)
+_REASONS = (
+    "calm", "gdi_threshold", "fdr_cluster", "sustained_gdi", "watch", "cooldown", "stabilized"
+)
+# The alert keys a shadow entry may set, with the DetectorConfig field each one maps to.
+_SHADOW_KEYS = {
+    "gdi_z": "gdi_threshold",
+    "sustained_z": "sustained_threshold",
+    "sustained_ticks": "sustained_ticks",
+    "fdr_q": "fdr_q_threshold",
+}
+
+
+def shadow_label(config: DetectorConfig) -> str:
+    return (
+        f"gdi={config.gdi_threshold:g} sus={config.sustained_threshold:g}"
+        f"x{config.sustained_ticks} q={config.fdr_q_threshold:g}"
+    )
+
+
+def shadow_configs(
+    live: DetectorConfig, entries: Sequence[Dict[str, Any]]
+) -> List[DetectorConfig]:
+    """Configs from ``alert.shadow`` entries: unset keys keep the live value, and list values
+    expand into every combination."""
+    configs: List[DetectorConfig] = []
+    for entry in entries:
+        keys = [key for key in _SHADOW_KEYS if key in entry]
+        choices = [
+            entry[key] if isinstance(entry[key], (list, tuple)) else [entry[key]] for key in keys
+        ]
+        for values in itertools.product(*choices):
+            overrides = {_SHADOW_KEYS[key]: value for key, value in zip(keys, values, strict=True)}
+            if "sustained_ticks" in overrides:
+                overrides["sustained_ticks"] = int(overrides["sustained_ticks"])
+            for key in ("gdi_threshold", "sustained_threshold", "fdr_q_threshold"):
+                if key in overrides:
+                    overrides[key] = float(overrides[key])
+            configs.append(dataclasses.replace(live, **overrides))
+    return configs
+
+
+class ShadowDetectorBank:
+    """Alternative thresholds judged on the same ticks as the live detector.
+
+    Each config runs ``Detector.evaluate``'s full-tier state machine, vectorized across
+    configs, so dozens cost about as much as one. The first config is always the live one.
+    Shadows never see the fast tier or the health triggers: those fire the same way
+    whatever the thresholds are. Each config counts the events it would have raised, so
+    its alarm rate can be compared with the live row on real data before it is applied.
+    """
+
+    def __init__(self, configs: Sequence[DetectorConfig]) -> None:
+        self._lock = threading.Lock()
+        self.labels: List[str] = []
+        self._configs: List[DetectorConfig] = []
+        size = len(configs)
+        self._gdi = np.zeros(size)
+        self._sustained = np.zeros(size)
+        self._ticks_needed = np.zeros(size, dtype=np.int64)
+        self._min_significant = np.zeros(size, dtype=np.int64)
+        self._fdr_q = np.zeros(size)
+        self._state = np.zeros(size, dtype=np.int8)
+        self._counter = np.zeros(size, dtype=np.int64)
+        self._events = np.zeros(size, dtype=np.int64)
+        self._event_ticks = np.zeros(size, dtype=np.int64)
+        self._ticks = np.zeros(size, dtype=np.int64)
+        self._started = np.zeros(size)
+        self._last_event_ms = np.zeros(size, dtype=np.int64)
+        for index, config in enumerate(configs):
+            self._configs.append(config)
+            self.labels.append("live" if index == 0 else shadow_label(config))
+            self._set(index, config)
+
+    @classmethod
+    def from_config(cls, config: Dict, live: DetectorConfig) -> "ShadowDetectorBank | None":
+        entries = config.get("alert", {}).get("shadow") or []
+        shadows = shadow_configs(live, entries)
+        if not shadows:
+            return None
+        return cls([dataclasses.replace(live)] + shadows)
+
+    def _set(self, index: int, config: DetectorConfig) -> None:
+        self._gdi[index] = config.gdi_threshold
+        self._sustained[index] = config.sustained_threshold
+        self._ticks_needed[index] = config.sustained_ticks
+        self._min_significant[index] = config.min_significant_tests
+        self._fdr_q[index] = config.fdr_q_threshold
+        self._state[index] = _CALM
+        self._counter[index] = 0
+        self._events[index] = 0
+        self._event_ticks[index] = 0
+        self._ticks[index] = 0
+        self._started[index] = time.monotonic()
+        self._last_event_ms[index] = 0
+
+    def set_live(self, config: DetectorConfig) -> None:
+        """Follow new live thresholds; the live row's counts restart with them."""
+        with self._lock:
+            self._configs[0] = dataclasses.replace(config)
+            self._set(0, config)
+
+    def evaluate(
+        self, gdi: float, q_values: np.ndarray, timestamp_ms: int
+    ) -> List[Tuple[str, str]]:
+        """Advance every config by one tick; returns (label, reason) for each new event."""
+        q_values = np.asarray(q_values, dtype=float)
+        ordered = np.sort(q_values[~np.isnan(q_values)])
+        significant = np.searchsorted(ordered, self._fdr_q, side="right")
+        with self._lock:
+            previous = self._state.copy()
+            gdi_hit = gdi >= self._gdi
+            fdr_hit = ~gdi_hit & (significant >= self._min_significant)
+            watch = ~gdi_hit & ~fdr_hit & (gdi >= self._sustained)
+            self._counter = np.where(watch, self._counter + 1, 0)
+            sustained_hit = watch & (self._counter >= self._ticks_needed)
+            self._counter[sustained_hit] = 0
+            event = gdi_hit | fdr_hit | sustained_hit
+            quiet = ~event & ~watch
+            state = np.where(previous == _EVENT, _RECOVER, _CALM)
+            state = np.where(quiet, state, _RECOVER)
+            self._state = np.where(event, _EVENT, state).astype(np.int8)
+            reason = np.select(
+                [gdi_hit, fdr_hit, sustained_hit, watch, quiet & (previous == _EVENT)],
+                [1, 2, 3, 4, 5],
+                default=np.where(previous == _RECOVER, 6, 0),
+            )
+            onsets = event & (previous != _EVENT)
+            self._ticks += 1
+            self._event_ticks += event
+            self._events += onsets
+            self._last_event_ms[onsets] = timestamp_ms
+            return [
+                (self.labels[index], _REASONS[reason[index]]) for index in np.flatnonzero(onsets)
+            ]
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """One row per config, live first, for the diagnostics panel."""
+        now = time.monotonic()
+        with self._lock:
+            rows = []
+            for index, (label, config) in enumerate(zip(self.labels, self._configs, strict=True)):
+                hours = max(now - float(self._started[index]), 1.0) / 3600
+                ticks = int(self._ticks[index])
+                rows.append(
+                    {
+                        "label": label,
+                        "gdi_z": config.gdi_threshold,
+                        "sustained_z": config.sustained_threshold,
+                        "sustained_ticks": config.sustained_ticks,
+                        "fdr_q": config.fdr_q_threshold,
+                        "state": _STATES[self._state[index]].value,
+                        "events": int(self._events[index]),
+                        "events_per_hour": int(self._events[index]) / hours,
+                        "event_share": int(self._event_ticks[index]) / ticks if ticks else 0.0,
+                        "ticks": ticks,
+                        "last_event_ms": int(self._last_event_ms[index]),
+                    }
+                )
+        return rows
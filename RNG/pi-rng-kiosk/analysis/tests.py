@@ -1,93 +1,147 @@
 from __future__ import annotations
 
+import functools
 import math
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
 
 import numpy as np
 from scipy import stats
 
-from .model import TestResult, WindowSummary
+from .bytes import ByteCounts
+from .context import TickContext
+from .model import TickResultTable
 
+if TYPE_CHECKING:
+    from diagnostics.stats import PipelineStats
 
-def run_all_tests(windows: Dict[int, np.ndarray]) -> Dict[int, WindowSummary]:
-    summaries: Dict[int, WindowSummary] = {}
-    for window, bits in windows.items():
-        if len(bits) < window or len(bits) == 0:
+
+# (z_score, p_value) of one test over one window.
+Score = Tuple[float, float]
+
+
+# Shortest scanned length, and the ratio between successive lengths of the scan grid.
+SCAN_MIN_BITS = 1024
+_SCAN_RATIO = 2
+# Siegmund's correction for watching a continuous process only at whole-bit steps:
+# nu(x) ~ exp(-0.583 x).
+_SCAN_LATTICE = 0.583
+# Fair windows simulated once per scan configuration to calibrate its p-values, the
+# shortest length they are scaled down to, and how many of the highest simulated peaks
+# are left to the crossing approximation instead.
+_SCAN_NULL_SAMPLES = 1000
+_SCAN_NULL_MIN_BITS = 256
+_SCAN_NULL_TAIL = 50
+_SCAN_NULL_BATCH_BITS = 1 << 22
+
+
+def run_all_tests(
+    windows: Dict[int, np.ndarray],
+    stats: Optional["PipelineStats"] = None,
+    byte_counts: Optional[Dict[int, ByteCounts]] = None,
+    scan_min_bits: int = SCAN_MIN_BITS,
+) -> TickResultTable:
+    """Score every window; ``byte_counts`` (see ``RollingByteCounts``) adds the byte tests."""
+    ready = sorted(window for window, bits in windows.items() if len(bits) >= window and len(bits))
+    table = TickResultTable.empty(ready, TEST_NAMES + BYTE_TEST_NAMES)
+    contexts = _tick_contexts([windows[window] for window in ready])
+    for row, window in enumerate(ready):
+        context = contexts[row]
+        length = len(windows[window])
+        for column, func in enumerate(TESTS):
+            options = {"min_bits": scan_min_bits} if func is scan_test else {}
+            if stats is None:
+                result = func(context, length, **options)
+            else:
+                with stats.time(f"test.{func.__name__.removesuffix('_test')}@{window}"):
+                    result = func(context, length, **options)
+            if result:
+                table.z[row, column], table.p[row, column] = result
+                table.valid[row, column] = True
+        counts = (byte_counts or {}).get(window)
+        if counts is None:
             continue
-        normalized = np.array(bits, dtype=np.int8)
-        tests: List[TestResult] = []
-        for func in (
-            monobit_test,
-            runs_test,
-            serial_two_bit_test,
-            approximate_entropy_test,
-            cusum_test,
-            light_fft_test,
-        ):
-            result = func(normalized, window)
+        for column, func in enumerate(BYTE_TESTS, start=len(TESTS)):
+            if stats is None:
+                result = func(counts)
+            else:
+                with stats.time(f"test.{func.__name__.removesuffix('_test')}@{window}"):
+                    result = func(counts)
             if result:
-                tests.append(result)
-        summaries[window] = WindowSummary(window=window, tests=tests)
-    return summaries
+                table.z[row, column], table.p[row, column] = result
+                table.valid[row, column] = True
+    return table
 
 
-def monobit_test(bits: np.ndarray, window: int) -> Optional[TestResult]:
-    n = len(bits)
+def _tick_contexts(arrays: List[np.ndarray]) -> List[TickContext]:
+    """One context per array, shared by every array that is a suffix of the longest."""
+    if not arrays:
+        return []
+    longest = max(arrays, key=len)
+    shared = TickContext(longest)
+    contexts = []
+    for bits in arrays:
+        if bits is longest or np.array_equal(bits, longest[len(longest) - len(bits) :]):
+            contexts.append(shared)
+        else:
+            contexts.append(TickContext(bits))
+    return contexts
+
+
+# Every test takes the tick's context and scores its newest ``window`` bits.
+
+
+def monobit_test(context: TickContext, window: int) -> Optional[Score]:
+    n = window
     if n == 0:
         return None
-    s_obs = np.sum(2 * bits - 1)
+    s_obs = 2 * context.ones(window) - n
     s_obs_abs = abs(s_obs)
     test_stat = s_obs_abs / math.sqrt(n)
     p_value = math.erfc(test_stat / math.sqrt(2))
     z_score = s_obs / math.sqrt(n)
-    return _result("monobit", window, p_value, z_score)
+    return _result(p_value, z_score)
 
 
-def runs_test(bits: np.ndarray, window: int) -> Optional[TestResult]:
-    n = len(bits)
+def runs_test(context: TickContext, window: int) -> Optional[Score]:
+    n = window
     if n < 2:
         return None
-    pi = np.mean(bits)
+    pi = context.ones(window) / n
     tau = 2 / math.sqrt(n)
     if abs(pi - 0.5) >= tau:
-        return _result("runs", window, p_value=0.0, z_score=float("inf"))
-    runs = 1 + np.sum(bits[1:] != bits[:-1])
+        return _result(p_value=0.0, z_score=float("inf"))
+    pairs = context.pattern_counts(window, 2)
+    runs = 1 + pairs[1] + pairs[2]
     numerator = abs(runs - (2 * n * pi * (1 - pi)))
     denominator = 2 * math.sqrt(2 * n) * pi * (1 - pi)
     if denominator == 0:
         return None
     p_value = math.erfc(numerator / denominator)
     z_score = (runs - (2 * n * pi * (1 - pi))) / (2 * math.sqrt(2 * n) * pi * (1 - pi))
-    return _result("runs", window, p_value, z_score)
+    return _result(p_value, z_score)
 
 
-def serial_two_bit_test(bits: np.ndarray, window: int) -> Optional[TestResult]:
-    n = len(bits)
+def serial_two_bit_test(context: TickContext, window: int) -> Optional[Score]:
+    n = window
     if n < 2:
         return None
-    pairs = (bits[:-1] << 1) | bits[1:]
-    counts = np.bincount(pairs, minlength=4)
+    counts = context.pattern_counts(window, 2)
     total = n - 1
     chi_sq = (4 / total) * np.sum(counts**2) - total
     p_value = stats.chi2.sf(chi_sq, df=3)
     z_score = (chi_sq - 3) / math.sqrt(6)
-    return _result("serial", window, p_value, z_score)
+    return _result(p_value, z_score)
 
 
-def approximate_entropy_test(bits: np.ndarray, window: int, m: int = 2) -> Optional[TestResult]:
-    n = len(bits)
+def approximate_entropy_test(
+    context: TickContext, window: int, m: int = 2
+) -> Optional[Score]:
+    n = window
     if n < m + 1:
         return None
+
     def _phi(block: int) -> float:
-        padded = np.concatenate([bits, bits[: block - 1]])
-        patterns = np.zeros(2**block, dtype=int)
-        for i in range(n):
-            segment = padded[i : i + block]
-            index = 0
-            for bit in segment:
-                index = (index << 1) | int(bit)
-            patterns[index] += 1
-        probs = patterns / n
+        probs = context.pattern_counts(window, block, cyclic=True) / n
         with np.errstate(divide="ignore", invalid="ignore"):
             logs = np.where(probs > 0, np.log(probs), 0)
         return np.sum(probs * logs)
@@ -97,26 +151,25 @@ def approximate_entropy_test(bits: np.ndarray, window: int, m: int = 2) -> Optio
     chi_sq = 2 * n * (math.log(2) - ap_en)
     p_value = stats.chi2.sf(chi_sq, df=2**m - 1)
     z_score = (chi_sq - (2**m - 1)) / math.sqrt(2 * (2**m - 1))
-    return _result("ap_entropy", window, p_value, z_score)
+    return _result(p_value, z_score)
 
 
-def cusum_test(bits: np.ndarray, window: int) -> Optional[TestResult]:
-    n = len(bits)
+def cusum_test(context: TickContext, window: int) -> Optional[Score]:
+    n = window
     if n == 0:
         return None
-    mapped = 2 * bits - 1
-    cusum = np.cumsum(mapped)
+    cusum = context.walk_of(window)
     max_dev = np.max(np.abs(cusum))
     z_score = cusum[-1] / math.sqrt(n)
     p_value = 1 - stats.norm.cdf(max_dev / math.sqrt(n))
-    return _result("cusum", window, p_value, z_score)
+    return _result(p_value, z_score)
 
 
-def light_fft_test(bits: np.ndarray, window: int) -> Optional[TestResult]:
-    n = len(bits)
+def light_fft_test(context: TickContext, window: int) -> Optional[Score]:
+    n = window
     if n < 64:
         return None
-    mapped = (2 * bits - 1).astype(float)
+    mapped = context.mapped[context.start(window) :]
     spectrum = np.fft.fft(mapped)
     magnitudes = np.abs(spectrum[: n // 2])
     threshold = math.sqrt(math.log(1 / 0.05) * n)
@@ -124,10 +177,417 @@ def light_fft_test(bits: np.ndarray, window: int) -> Optional[TestResult]:
     expected = 0.95 * (n / 2)
     deviation = (count - expected) / math.sqrt(n * 0.95 * 0.05 / 4)
     p_value = stats.norm.sf(abs(deviation))
-    return _result("fft", window, p_value, -deviation)
+    return _result(p_value, -deviation)
+
+
+def block_frequency_test(context: TickContext, window: int) -> Optional[Score]:
+    n = window
+    # NIST: M >= 20, M > 0.01 n and fewer than 100 blocks.
+    block = max(20, n // 99 + 1)
+    count = n // block
+    if count < 1:
+        return None
+    edges = context.prefix[context.start(window) :: block][: count + 1]
+    proportions = np.diff(edges) / block
+    chi_sq = 4 * block * np.sum((proportions - 0.5) ** 2)
+    p_value = stats.chi2.sf(chi_sq, df=count)
+    z_score = (chi_sq - count) / math.sqrt(2 * count)
+    return _result(p_value, z_score)
+
+
+LONGEST_RUN_TABLES = (
+    # (min n, block size M, first category, last category, class probabilities)
+    (6272, 128, 4, 9, (0.1174, 0.2430, 0.2493, 0.1752, 0.1027, 0.1124)),
+    (128, 8, 1, 4, (0.2148, 0.3672, 0.2305, 0.1875)),
+)
+
+
+def longest_run_table(window: int) -> Optional[Tuple]:
+    """The ``LONGEST_RUN_TABLES`` row for ``window``, or None if it is too short."""
+    for row in LONGEST_RUN_TABLES:
+        if window >= row[0]:
+            return row
+    return None
+
+
+def longest_run_test(context: TickContext, window: int) -> Optional[Score]:
+    n = window
+    table = longest_run_table(n)
+    if table is None:
+        return None
+    _, block, low, high, probabilities = table
+    count = n // block
+    runs = context.bits_of(window)[: count * block].reshape(count, block).astype(bool)
+    # After k AND-shifts a row is non-empty only if it holds a run of more than k ones, so
+    # high passes give each block's longest run capped at the last category.
+    longest = np.zeros(count, dtype=np.int64)
+    for _ in range(high):
+        longest += runs.any(axis=1)
+        runs = runs[:, :-1] & runs[:, 1:]
+    observed = np.bincount(np.clip(longest, low, high) - low, minlength=high - low + 1)
+    expected = count * np.asarray(probabilities)
+    chi_sq = np.sum((observed - expected) ** 2 / expected)
+    dof = len(probabilities) - 1
+    p_value = stats.chi2.sf(chi_sq, df=dof)
+    z_score = (chi_sq - dof) / math.sqrt(2 * dof)
+    return _result(p_value, z_score)
+
+
+# Shorter blocks expect too few matches (about 20 at this length) for the chi-square to
+# hold: fair 10 K windows, with 1,250-bit blocks, reach p < 0.001 four times too often.
+TEMPLATE_MIN_BLOCK = 10_000
+
+
+def nonoverlapping_template_test(
+    context: TickContext, window: int, blocks: int = 8
+) -> Optional[Score]:
+    # Template 000000001 cannot overlap itself, so counting every match equals the NIST
+    # scan that skips past each hit, and the match positions vectorize directly.
+    m = 9
+    n = window
+    block = n // blocks
+    if block < TEMPLATE_MIN_BLOCK:
+        return None
+    bits = context.bits_of(window)
+    ones = context.prefix[context.start(window) :]
+    starts = np.arange(blocks * block - m + 1)
+    matches = (ones[starts + m - 1] == ones[starts]) & (bits[starts + m - 1] == 1)
+    padded = np.concatenate([matches, np.zeros(m - 1, dtype=bool)]).reshape(blocks, block)
+    counts = padded[:, : block - m + 1].sum(axis=1)
+    mean = (block - m + 1) / 2**m
+    variance = block * (1 / 2**m - (2 * m - 1) / 2 ** (2 * m))
+    chi_sq = np.sum((counts - mean) ** 2) / variance
+    p_value = stats.chi2.sf(chi_sq, df=blocks)
+    z_score = (chi_sq - blocks) / math.sqrt(2 * blocks)
+    return _result(p_value, z_score)
+
+
+LINEAR_COMPLEXITY_BLOCK = 500
+_LINEAR_COMPLEXITY_PI = np.array([0.010417, 0.03125, 0.125, 0.5, 0.25, 0.0625, 0.020833])
+
+
+def linear_complexity_test(
+    context: TickContext, window: int, block: int = LINEAR_COMPLEXITY_BLOCK
+) -> Optional[Score]:
+    count = window // block
+    if count < 200:
+        return None
+    bits = context.bits_of(window)
+    lengths = berlekamp_massey_lengths(bits[: count * block].reshape(count, block))
+    return linear_complexity_result(lengths, block)
+
+
+def linear_complexity_result(lengths: np.ndarray, block: int) -> Score:
+    count = len(lengths)
+    mean = (
+        block / 2
+        + (9 + (-1) ** (block + 1)) / 36
+        - (block / 3 + 2 / 9) / 2**block
+    )
+    t_values = (-1) ** block * (lengths - mean) + 2 / 9
+    observed = np.bincount(
+        np.digitize(t_values, [-2.5, -1.5, -0.5, 0.5, 1.5, 2.5], right=True), minlength=7
+    )
+    expected = count * _LINEAR_COMPLEXITY_PI
+    chi_sq = np.sum((observed - expected) ** 2 / expected)
+    p_value = stats.chi2.sf(chi_sq, df=6)
+    z_score = (chi_sq - 6) / math.sqrt(12)
+    return _result(p_value, z_score)
+
+
+def berlekamp_massey_lengths(blocks: np.ndarray) -> np.ndarray:
+    """Linear complexity of every row of ``blocks``, running Berlekamp–Massey on all rows
+    at once with the connection polynomials bit-packed into uint64 words."""
+    count, length = blocks.shape
+    words = length // 64 + 1
+    # Word-major, so each step works on whole contiguous rows, and only on the words that
+    # can hold a set bit by then.
+    connection = np.zeros((words, count), dtype=np.uint64)
+    connection[0] = 1
+    # The previous connection polynomial, kept pre-multiplied by x^(n - m).
+    shifted = np.zeros((words, count), dtype=np.uint64)
+    shifted[0] = 2
+    # Bit i of history holds s[n - i].
+    history = np.zeros((words, count), dtype=np.uint64)
+    lengths = np.zeros(count, dtype=np.int64)
+    column = np.ascontiguousarray(blocks.T, dtype=np.uint64)
+    for n in range(length):
+        active = min(words, (n + 2) // 64 + 1)
+        _shift_left(history[:active])
+        history[0] |= column[n]
+        discrepancy = _parity(connection[:active] & history[:active])
+        grow = discrepancy & (2 * lengths <= n)
+        # All-ones columns where the discrepancy is 1, so the update needs no fancy indexing.
+        mask = np.uint64(0) - discrepancy.astype(np.uint64)
+        previous = connection[:active].copy()
+        connection[:active] ^= shifted[:active] & mask
+        lengths = np.where(grow, n + 1 - lengths, lengths)
+        np.copyto(shifted[:active], previous, where=grow)
+        _shift_left(shifted[:active])
+    return lengths
+
+
+def _shift_left(words: np.ndarray) -> None:
+    carry = words[:-1] >> np.uint64(63)
+    words <<= np.uint64(1)
+    words[1:] |= carry
+
+
+def _parity(words: np.ndarray) -> np.ndarray:
+    folded = np.bitwise_xor.reduce(words, axis=0)
+    for shift in (32, 16, 8, 4, 2, 1):
+        folded ^= folded >> np.uint64(shift)
+    return (folded & np.uint64(1)).astype(bool)
+
+
+# NIST expected value and variance of the universal statistic for L = 1..16.
+UNIVERSAL_TABLE = {
+    1: (0.7326495, 0.690),
+    2: (1.5374383, 1.338),
+    3: (2.4016068, 1.901),
+    4: (3.3112247, 2.358),
+    5: (4.2534266, 2.705),
+    6: (5.2177052, 2.954),
+    7: (6.1962507, 3.125),
+    8: (7.1836656, 3.238),
+    9: (8.1764248, 3.311),
+    10: (9.1723243, 3.356),
+    11: (10.170032, 3.384),
+    12: (11.168765, 3.401),
+    13: (12.168070, 3.410),
+    14: (13.167693, 3.416),
+    15: (14.167488, 3.419),
+    16: (15.167379, 3.421),
+}
+
+
+def universal_block(window: int) -> int:
+    """Maurer block length ``L`` for ``window``, or 0 if the window is too short."""
+    # NIST's table: the largest L that leaves Q = 10 * 2^L initialisation blocks and
+    # K >= 1000 * 2^L test blocks, from L = 6 at n = 387,840. The variance correction is
+    # not calibrated for shorter blocks, where fair bits fail far too often.
+    for candidate in range(16, 5, -1):
+        if window // candidate - 10 * 2**candidate >= 1000 * 2**candidate:
+            return candidate
+    return 0
+
+
+def maurer_universal_test(context: TickContext, window: int) -> Optional[Score]:
+    n = window
+    block = universal_block(n)
+    if not block:
+        return None
+    init = 10 * 2**block
+    total = n // block
+    tests = total - init
+    weights = 1 << np.arange(block - 1, -1, -1, dtype=np.int64)
+    bits = context.bits_of(window)
+    values = bits[: total * block].reshape(total, block).astype(np.int64) @ weights
+    # Previous occurrence of each block's value: neighbours after a stable sort by value.
+    order = np.argsort(values, kind="stable")
+    previous = np.full(total, -1, dtype=np.int64)
+    same = values[order[1:]] == values[order[:-1]]
+    previous[order[1:][same]] = order[:-1][same]
+    indices = np.arange(init, total)
+    distances = indices - previous[init:]
+    statistic = np.sum(np.log2(distances)) / tests
+    expected, variance = UNIVERSAL_TABLE[block]
+    c = 0.7 - 0.8 / block + (4 + 32 / block) * tests ** (-3 / block) / 15
+    sigma = c * math.sqrt(variance / tests)
+    p_value = math.erfc(abs(statistic - expected) / (math.sqrt(2) * sigma))
+    z_score = (expected - statistic) / sigma
+    return _result(p_value, z_score)
+
+
+def scan_lengths(window: int, min_bits: int = SCAN_MIN_BITS) -> List[int]:
+    """The scanned lengths: ``min_bits`` doubling up to, and always including, ``window``."""
+    lengths = []
+    length = max(64, min_bits)
+    while length < window:
+        lengths.append(length)
+        length *= _SCAN_RATIO
+    return lengths + [window]
+
+
+def _scans(window: int, min_bits: int) -> bool:
+    return window >= 2 * max(64, min_bits)
+
+
+def prepare_scan(windows: Iterable[int], min_bits: int = SCAN_MIN_BITS) -> None:
+    """Simulate the scan's null for each window ahead of the ticks that need it.
+
+    The first tick to see a window would otherwise spend a fraction of a second on it.
+    """
+    for window in windows:
+        if _scans(window, min_bits):
+            _scan_null(window, scan_lengths(window, min_bits)[0])
+
+
+def scan_test(
+    context: TickContext, window: int, min_bits: int = SCAN_MIN_BITS
+) -> Optional[Score]:
+    """Largest standardized excess of ones or zeros over any stretch of the window, at every
+    position and each grid length, with a p-value adjusted for all of them (see
+    ``scan_p_value``). The z-score is the normal quantile of the p-value.
+    """
+    if not _scans(window, min_bits):
+        return None
+    lengths = scan_lengths(window, min_bits)
+    peak = scan_peaks(context.walk[None, context.start(window) :], lengths)[0]
+    p_value = float(scan_p_value(peak, window, lengths))
+    return _result(p_value, stats.norm.isf(max(p_value, 1e-12)))
+
+
+def scan_peaks(walks: np.ndarray, lengths: List[int]) -> np.ndarray:
+    """Scan statistic of each row of ``walks``, the ±1 walks over windows (one longer)."""
+    peaks = np.zeros(len(walks))
+    for length in lengths:
+        sums = walks[:, length:] - walks[:, :-length]
+        extreme = np.maximum(sums.max(axis=1), -sums.min(axis=1))
+        peaks = np.maximum(peaks, extreme / math.sqrt(length))
+    return peaks
+
+
+def scan_p_value(peak: np.ndarray | float, window: int, lengths: List[int]) -> np.ndarray:
+    """P-value of a scan ``peak`` over ``lengths`` in ``window`` bits, element-wise.
+
+    Up to the tail it is the share of simulated fair windows that score higher (see
+    ``_scan_null``). Beyond them it follows the crossing rate of ``_scan_crossings``,
+    scaled to meet the simulated share where they hand over.
+    """
+    rates, survival, factor = _scan_null(window, lengths[0])
+    with np.errstate(divide="ignore"):
+        rate = np.log(_scan_crossings(np.asarray(peak, dtype=float), window, lengths))
+    return np.where(
+        rate < rates[0], -np.expm1(-factor * np.exp(rate)), np.interp(rate, rates, survival)
+    )
+
+
+def _scan_crossings(peak: np.ndarray, window: int, lengths: List[int]) -> np.ndarray:
+    """Expected number of times the scan crosses ``peak``, summed over signs and lengths.
+
+    For one length ``L`` the sums ``S / sqrt(L)`` form a Slepian process, which crosses a
+    high level ``b`` about ``(n - L) / L * b * phi(b)`` times in ``n`` bits (a little less
+    when sampled bit by bit). The sum double-counts crossings shared by neighbouring
+    lengths, so ``1 - exp(-total)`` overstates the p-value by a factor that depends on the
+    shape of the grid.
+    """
+    density = peak * stats.norm.pdf(peak)
+    tail = stats.norm.sf(peak)
+    expected = np.zeros_like(peak)
+    for length in lengths:
+        lattice = np.exp(-_SCAN_LATTICE * peak * math.sqrt(2 / length))
+        expected += 2 * ((window - length) / length * density * lattice + tail)
+    return expected
+
+
+@functools.cache
+def _scan_null(window: int, first: int) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Null distribution of the scan over ``window`` bits with shortest length ``first``.
+
+    Returns the log crossing rates of simulated fair peaks, ascending, the mid-rank share
+    of windows scoring at least as high, and the factor that scales the crossing rate onto
+    that share where the tail takes over. The crossing rate is accurate per length from
+    about 256 bits; what needs calibrating is the overlap between lengths, which depends
+    only on the grid's shape, so longer grids are simulated scaled down.
+    """
+    scale = max(1, first // _SCAN_NULL_MIN_BITS)
+    window, lengths = window // scale, scan_lengths(window // scale, first // scale)
+    generator = np.random.default_rng(0)
+    peaks = np.empty(_SCAN_NULL_SAMPLES)
+    batch = max(1, _SCAN_NULL_BATCH_BITS // window)
+    for offset in range(0, _SCAN_NULL_SAMPLES, batch):
+        rows = min(batch, _SCAN_NULL_SAMPLES - offset)
+        steps = 2 * generator.integers(0, 2, size=(rows, window), dtype=np.int8) - 1
+        walks = np.zeros((rows, window + 1), dtype=np.int32)
+        np.cumsum(steps, axis=1, dtype=np.int32, out=walks[:, 1:])
+        peaks[offset : offset + rows] = scan_peaks(walks, lengths)
+    peaks = np.sort(peaks)[::-1]
+    survival = (np.arange(_SCAN_NULL_SAMPLES) + 0.5) / _SCAN_NULL_SAMPLES
+    # Tied peaks share one knot at their mid-rank.
+    rates, group = np.unique(np.log(_scan_crossings(peaks, window, lengths)), return_inverse=True)
+    survival = np.bincount(group, weights=survival) / np.bincount(group)
+    edge = int(np.searchsorted(survival, _SCAN_NULL_TAIL / _SCAN_NULL_SAMPLES))
+    factor = -math.log1p(-survival[edge]) / math.exp(rates[edge])
+    return rates[edge:], survival[edge:], factor
+
+
+TESTS = (
+    monobit_test,
+    runs_test,
+    serial_two_bit_test,
+    approximate_entropy_test,
+    cusum_test,
+    light_fft_test,
+    block_frequency_test,
+    longest_run_test,
+    nonoverlapping_template_test,
+    linear_complexity_test,
+    maurer_universal_test,
+    scan_test,
+)
+
+
+# Column names of the result table, parallel to TESTS.
+TEST_NAMES = (
+    "monobit",
+    "runs",
+    "serial",
+    "ap_entropy",
+    "cusum",
+    "fft",
+    "block_freq",
+    "longest_run",
+    "template",
+    "lin_complexity",
+    "universal",
+    "scan",
+)
+
+
+# The byte tests score the whole bytes of a window from its ByteCounts instead of its bits.
+
+# Uniform bytes centred as y = 2x - 255 have this variance.
+CENTRED_BYTE_VARIANCE = 4 * (256**2 - 1) / 12
+# Fewer bytes than this per bin and the 255-df chi-square approximation breaks down.
+MIN_BYTES_PER_BIN = 5
+
+
+def byte_chi2_test(counts: ByteCounts) -> Optional[Score]:
+    n = counts.size
+    if n < 256 * MIN_BYTES_PER_BIN:
+        return None
+    expected = n / 256
+    chi_sq = float(np.sum((counts.histogram - expected) ** 2) / expected)
+    p_value = stats.chi2.sf(chi_sq, df=255)
+    z_score = (chi_sq - 255) / math.sqrt(2 * 255)
+    return _result(p_value, z_score)
+
+
+def byte_serial_test(counts: ByteCounts) -> Optional[Score]:
+    return _byte_correlation(counts, 1)
+
+
+def byte_lag_test(counts: ByteCounts) -> Optional[Score]:
+    return _byte_correlation(counts, counts.lag)
+
+
+def _byte_correlation(counts: ByteCounts, lag: int) -> Optional[Score]:
+    # For independent uniform bytes each centred product has mean 0 and variance
+    # CENTRED_BYTE_VARIANCE ** 2, so the normalized sum is close to a standard normal.
+    pairs = counts.size - lag
+    if pairs < 256 * MIN_BYTES_PER_BIN:
+        return None
+    z_score = counts.products[lag] / (CENTRED_BYTE_VARIANCE * math.sqrt(pairs))
+    p_value = math.erfc(abs(z_score) / math.sqrt(2))
+    return _result(p_value, z_score)
+
+
+BYTE_TESTS = (byte_chi2_test, byte_serial_test, byte_lag_test)
+
+# Column names of the byte tests, which follow TEST_NAMES in the result table.
+BYTE_TEST_NAMES = ("byte_chi2", "byte_serial", "byte_lag")
 
 
-def _result(name: str, window: int, p_value: float, z_score: float) -> TestResult:
-    p_value = float(np.clip(p_value, 1e-12, 1 - 1e-12))
-    direction = "positive" if z_score >= 0 else "negative"
-    return TestResult(name=name, window=window, p_value=p_value, z_score=float(z_score), direction=direction)
+def _result(p_value: float, z_score: float) -> Score:
+    return float(z_score), float(np.clip(p_value, 1e-12, 1 - 1e-12))
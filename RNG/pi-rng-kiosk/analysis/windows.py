@@ -1,41 +1,74 @@
 from __future__ import annotations
 
-from collections import deque
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable
 
 import numpy as np
 
 
 class RollingBitWindows:
-    """Maintains synchronized rolling windows for multiple window sizes."""
+    """Maintains synchronized rolling windows for multiple window sizes.
 
-    def __init__(self, window_sizes: Iterable[int]) -> None:
-        self._windows = {size: deque(maxlen=size) for size in sorted(window_sizes)}
+    Every window is a tail of one master history of ``capacity`` bits, so ``resize`` can
+    switch to new sizes without dropping what has been collected. The history lives in a
+    buffer of twice the capacity: bits are appended until it is full, then the newest
+    ``capacity`` bits move to the front, which keeps every tail contiguous at an amortized
+    cost of one copy per bit.
+    """
+
+    def __init__(self, window_sizes: Iterable[int], capacity: int = 0) -> None:
+        self._sizes = sorted(window_sizes)
+        self.capacity = max(capacity, *self._sizes)
+        self._buffer = np.zeros(2 * self.capacity, dtype=np.uint8)
+        self._end = 0
+        self.total = 0
+
+    def resize(self, window_sizes: Iterable[int]) -> None:
+        """Switch to new window sizes; windows up to ``capacity`` refill from the history."""
+        sizes = sorted(window_sizes)
+        if max(sizes) > self.capacity:
+            raise ValueError(f"window larger than the {self.capacity}-bit history")
+        self._sizes = sizes
 
     def add_bits(self, bits: Iterable[int]) -> None:
-        sanitized = [1 if bit else 0 for bit in bits]
-        if not sanitized:
+        bits = np.asarray(bits)
+        if bits.dtype != np.uint8:
+            bits = (bits != 0).astype(np.uint8)
+        count = len(bits)
+        if not count:
             return
-        for window in self._windows.values():
-            window.extend(sanitized)
+        if count > self.capacity:
+            bits = bits[-self.capacity :]
+        if self._end + len(bits) > len(self._buffer):
+            keep = self.capacity - len(bits)
+            self._buffer[:keep] = self._buffer[self._end - keep : self._end]
+            self._end = keep
+        self._buffer[self._end : self._end + len(bits)] = bits
+        self._end += len(bits)
+        self.total += count
+
+    def tail(self, count: int, total: int | None = None) -> np.ndarray:
+        """Read-only view of the ``count`` bits before ``total`` (default: the newest).
+
+        Fewer come back while the history fills or once those bits have aged out of it.
+        """
+        newer = 0 if total is None else self.total - total
+        count = max(0, min(count, self.total - newer, self.capacity - newer))
+        end = self._end - newer
+        view = self._buffer[end - count : end]
+        view.flags.writeable = False
+        return view
 
     def as_arrays(self) -> Dict[int, np.ndarray]:
-        return {size: self._to_array(window) for size, window in self._windows.items()}
+        # One copy of the largest window, so the arrays stay valid while bits keep arriving;
+        # the smaller windows are views into its end.
+        largest = np.array(self.tail(self._sizes[-1]))
+        return {size: largest[max(0, len(largest) - size) :] for size in self._sizes}
 
     def has_enough_data(self, min_size: int | None = None) -> bool:
         if min_size is None:
-            min_size = min(self._windows)
-        smallest = self._windows[min_size]
-        return len(smallest) == min_size
+            min_size = self._sizes[0]
+        return self.total >= min_size
 
     def clear(self) -> None:
-        for window in self._windows.values():
-            window.clear()
-
-    @staticmethod
-    def _to_array(window: deque[int]) -> np.ndarray:
-        if not window:
-            return np.empty(0, dtype=np.int8)
-        data: List[int] = list(window)
-        return np.frombuffer(bytearray(data), dtype=np.uint8)
-
+        self._end = 0
+        self.total = 0
@@ -1,318 +1,90 @@
 from __future__ import annotations
 
 import argparse
-import asyncio
 import logging
 import signal
 import sys
-import threading
 import time
 from pathlib import Path
-from queue import Empty, Queue
-from typing import Any, Dict, List, Sequence, Tuple
+from typing import Dict
 
-import numpy as np
 import yaml
 from PySide6 import QtCore, QtGui, QtQml
 
-from analysis.combine import build_combined_stats
-from analysis.detector import Detector, DetectorConfig
-from analysis.model import AnalysisSnapshot
-from analysis.tests import run_all_tests
-from analysis.windows import RollingBitWindows
-from rng_sources.fake import FakeRNG
-from rng_sources.hwrng import HardwareRNG, bytes_to_bits as hwrng_bits
-from rng_sources.urandom import URandomSource, bytes_to_bits as urandom_bits
+from analysis.model import AnalysisSnapshot, DetectorState
+from diagnostics.stats import PipelineStats
+from network.publisher import TickPublisher
+from pipeline.mailbox import SnapshotMailbox
+from pipeline.multidevice import MultiDeviceRunner, device_configs
+from pipeline.processes import ProcessPipeline, pipeline_mode
+from pipeline.runner import PipelineRunner
+from pipeline.settings import history_capacity
+from storage.events import EventStore
 from storage.metrics import MetricsStore
-
+from storage.state import StateFile
+from storage.writer import StorageWriter
+from ui.plot import GdiPlot, GdiSeries
 
 LOGGER = logging.getLogger("pi-rng-kiosk")
 
-
-class PipelineRunner:
-    def __init__(
-        self,
-        config: Dict,
-        config_path: Path,
-        snapshot_queue: Queue,
-        fake_seed: int | None,
-        inject_bias: float,
-    ) -> None:
-        self.config = config
-        self.config_path = config_path
-        self.snapshot_queue = snapshot_queue
-        self.fake_seed = fake_seed
-        self.inject_bias = max(0.0, min(inject_bias, 0.5))
-        self._stop_flag = threading.Event()
-        self._thread: threading.Thread | None = None
-        self._settings_queue: Queue = Queue()
-        self._current_windows = list(config["windows"]["sizes"])
-        self.detector = Detector(
-            DetectorConfig(
-                gdi_threshold=config["alert"]["gdi_z"],
-                sustained_threshold=config["alert"]["sustained_z"],
-                sustained_ticks=config["alert"]["sustained_ticks"],
-                fdr_q_threshold=config["alert"]["fdr_q"],
-            )
-        )
-
-    def start(self) -> None:
-        if self._thread and self._thread.is_alive():
-            return
-        self._thread = threading.Thread(target=self._run_loop, daemon=True)
-        self._thread.start()
-
-    def stop(self) -> None:
-        self._stop_flag.set()
-        if self._thread:
-            self._thread.join(timeout=2)
-
-    def _run_loop(self) -> None:
-        try:
-            asyncio.run(self._async_loop())
-        except Exception:
-            LOGGER.exception("Pipeline crashed")
-
-    async def _async_loop(self) -> None:
-        if self.fake_seed is not None:
-            await self._run_fake_source()
-            return
-
-        bit_queue: asyncio.Queue[int] = asyncio.Queue(maxsize=8192)
-        producer = asyncio.create_task(self._producer_loop(bit_queue))
-        analyzer = asyncio.create_task(self._analyzer_loop(bit_queue))
-        await asyncio.wait(
-            [producer, analyzer],
-            return_when=asyncio.FIRST_EXCEPTION,
-        )
-        for task in (producer, analyzer):
-            if not task.done():
-                task.cancel()
-
-    async def _run_fake_source(self) -> None:
-        fake = FakeRNG(seed=self.fake_seed, chunk_bits=self.config["windows"]["chunk_bits"])
-        bit_queue: asyncio.Queue[int] = asyncio.Queue(maxsize=8192)
-        producer = asyncio.create_task(fake.pump_bits(bit_queue, self._stop_flag, self.inject_bias))
-        analyzer = asyncio.create_task(self._analyzer_loop(bit_queue))
-        await asyncio.wait([producer, analyzer], return_when=asyncio.FIRST_EXCEPTION)
-
-    async def _producer_loop(self, bit_queue: asyncio.Queue[int]) -> None:
-        source = HardwareRNG(
-            device=self.config["source"]["primary"],
-            chunk_bytes=self.config["source"]["read_bytes"],
-        )
-        fallback = URandomSource(
-            device=self.config["source"]["fallback"],
-            chunk_bytes=self.config["source"]["read_bytes"],
-        )
-        active = source
-        while not self._stop_flag.is_set():
-            try:
-                chunk = await active.read_chunk()
-            except Exception as exc:
-                LOGGER.warning("RNG read failed (%s), switching to fallback", exc)
-                if active is source:
-                    active = fallback
-                    continue
-                await asyncio.sleep(0.5)
-                continue
-            bits = hwrng_bits(chunk) if active is source else urandom_bits(chunk)
-            biased = self._apply_bias(bits)
-            for bit in biased:
-                await bit_queue.put(bit)
-        source.close()
-        fallback.close()
-
-    def enqueue_settings(self, payload: Dict) -> None:
-        self._settings_queue.put(payload)
-
-    async def _analyzer_loop(self, bit_queue: asyncio.Queue[int]) -> None:
-        windows = RollingBitWindows(self._current_windows)
-        history_bits: List[int] = []
-        interval = self.config["windows"]["analysis_interval_ms"] / 1000
-        history_cap = self._history_cap()
-        last_emit = time.monotonic()
-        while not self._stop_flag.is_set():
-            try:
-                bit = await asyncio.wait_for(bit_queue.get(), timeout=0.1)
-                windows.add_bits([bit])
-                history_bits.append(bit)
-                if len(history_bits) > history_cap:
-                    history_bits = history_bits[-history_cap:]
-                bit_queue.task_done()
-            except asyncio.TimeoutError:
-                pass
-
-            windows, history_bits, history_cap = self._process_pending_settings(
-                windows, history_bits, history_cap
-            )
-
-            now = time.monotonic()
-            if now - last_emit < interval:
-                continue
-            if not windows.has_enough_data():
-                last_emit = now
-                continue
-            last_emit = now
-            snapshot = self._compute_snapshot(windows)
-            tail = history_bits[-self.config["storage"]["snapshot_bits"] :]
-            self.snapshot_queue.put((snapshot, tail))
-
-    def _compute_snapshot(self, windows: RollingBitWindows) -> AnalysisSnapshot:
-        arrays = windows.as_arrays()
-        summaries = run_all_tests(arrays)
-        combined = build_combined_stats(summaries)
-        state, reason = self.detector.evaluate(combined.gdi, combined.q_values)
-        return AnalysisSnapshot(
-            timestamp_ms=int(time.time() * 1000),
-            combined=combined,
-            detector_state=state,
-            detector_reason=reason,
-        )
-
-    def _apply_bias(self, bits: Sequence[int]) -> Sequence[int]:
-        if self.inject_bias <= 0:
-            return bits
-        mutated = list(bits)
-        step = max(1, int(1 / self.inject_bias))
-        for idx in range(0, len(mutated), step):
-            mutated[idx] ^= 1
-        return mutated
-
-    def _process_pending_settings(
-        self,
-        windows: RollingBitWindows,
-        history_bits: List[int],
-        history_cap: int,
-    ) -> Tuple[RollingBitWindows, List[int], int]:
-        updated = False
-        while True:
-            try:
-                payload = self._settings_queue.get_nowait()
-            except Empty:
-                break
-            windows, history_bits, history_cap = self._apply_settings_payload(
-                payload, windows, history_bits, history_cap
-            )
-            updated = True
-        if updated:
-            LOGGER.info(
-                "Applied settings: windows=%s gdi=%.2f",
-                self._current_windows,
-                self.detector.config.gdi_threshold,
-            )
-        return windows, history_bits, history_cap
-
-    def _apply_settings_payload(
-        self,
-        payload: Dict,
-        windows: RollingBitWindows,
-        history_bits: List[int],
-        history_cap: int,
-    ) -> Tuple[RollingBitWindows, List[int], int]:
-        alert_payload = payload.get("alert") or {}
-        windows_payload = payload.get("windows")
-
-        if windows_payload:
-            cleaned: List[int] = []
-            for size in windows_payload:
-                try:
-                    value = int(float(size))
-                except (TypeError, ValueError):
-                    continue
-                if value > 0:
-                    cleaned.append(value)
-            if cleaned:
-                self._current_windows = cleaned
-                self.config["windows"]["sizes"] = cleaned
-                windows = RollingBitWindows(cleaned)
-                history_bits = []
-                history_cap = self._history_cap()
-
-        detector_config = self.detector.config
-        if "gdi_z" in alert_payload:
-            detector_config.gdi_threshold = self._safe_float(
-                alert_payload["gdi_z"], detector_config.gdi_threshold
-            )
-            self.config["alert"]["gdi_z"] = detector_config.gdi_threshold
-        if "sustained_z" in alert_payload:
-            detector_config.sustained_threshold = self._safe_float(
-                alert_payload["sustained_z"], detector_config.sustained_threshold
-            )
-            self.config["alert"]["sustained_z"] = detector_config.sustained_threshold
-        if "sustained_ticks" in alert_payload:
-            detector_config.sustained_ticks = self._safe_int(
-                alert_payload["sustained_ticks"], detector_config.sustained_ticks
-            )
-            self.config["alert"]["sustained_ticks"] = detector_config.sustained_ticks
-        if "fdr_q" in alert_payload:
-            detector_config.fdr_q_threshold = self._safe_float(
-                alert_payload["fdr_q"], detector_config.fdr_q_threshold
-            )
-            self.config["alert"]["fdr_q"] = detector_config.fdr_q_threshold
-
-        if payload.get("persist"):
-            self._persist_config()
-
-        return windows, history_bits, history_cap
-
-    def _history_cap(self) -> int:
-        storage_bits = self.config.get("storage", {}).get("snapshot_bits", 0)
-        window_max = max(self._current_windows) if self._current_windows else 0
-        return max(storage_bits, window_max)
-
-    def _persist_config(self) -> None:
-        try:
-            with self.config_path.open("w", encoding="utf-8") as handle:
-                yaml.safe_dump(self.config, handle, sort_keys=False)
-        except Exception:
-            LOGGER.exception("Failed to persist config overrides")
-
-    @staticmethod
-    def _safe_float(value: Any, default: float) -> float:
-        try:
-            return float(value)
-        except (TypeError, ValueError):
-            return default
-
-    @staticmethod
-    def _safe_int(value: Any, default: int) -> int:
-        try:
-            return int(float(value))
-        except (TypeError, ValueError):
-            return default
+# Events sent to the list per request; the view asks for more as it scrolls.
+_EVENT_PAGE = 50
 
 
 class RNGViewModel(QtCore.QObject):
     gdiChanged = QtCore.Signal(float)
     stateChanged = QtCore.Signal(str)
-    sparklineChanged = QtCore.Signal(list)
     testsChanged = QtCore.Signal(list)
     eventsChanged = QtCore.Signal(list)
     exportCompleted = QtCore.Signal(bool, str)
     histogramChanged = QtCore.Signal(list)
     serialMatrixChanged = QtCore.Signal(list)
     settingsApplied = QtCore.Signal(dict)
+    diagnosticsChanged = QtCore.Signal(dict)
+    devicesChanged = QtCore.Signal(list)
+    # Emitted from the producer's and the storage writer's threads; the queued connections
+    # run the handlers on ours.
+    _snapshotsArrived = QtCore.Signal()
+    _ticksStored = QtCore.Signal()
 
     def __init__(
         self,
-        queue: Queue,
+        mailbox: SnapshotMailbox,
         metrics: MetricsStore,
-        pipeline: PipelineRunner,
+        pipeline: PipelineRunner | MultiDeviceRunner,
         usb_mount: Path,
         export_snapshot_count: int | None = None,
         parent=None,
     ) -> None:
         super().__init__(parent)
-        self._queue = queue
+        self._mailbox = mailbox
         self.metrics = metrics
         self.pipeline = pipeline
         self.usb_mount = usb_mount
         self.export_snapshot_count = export_snapshot_count
-        self._timer = QtCore.QTimer(self)
-        self._timer.setInterval(100)
-        self._timer.timeout.connect(self._drain_queue)
-        self._timer.start()
+        # The sparkline and timeline plots draw from this; it mirrors metrics.history.
+        self._series = GdiSeries(metrics.history.maxlen or 0, self)
+        self._series.reset(
+            (record.gdi, record.state == DetectorState.EVENT) for record in metrics.history
+        )
+        self._snapshotsArrived.connect(self._drain_queue, QtCore.Qt.QueuedConnection)
+        mailbox.notify = self._snapshotsArrived.emit
+        # The storage writer records events, so the list refreshes once it has.
+        self._ticksStored.connect(self._emit_events, QtCore.Qt.QueuedConnection)
+        if mailbox.storage is not None:
+            mailbox.storage.notify = self._ticksStored.emit
+        # Anything the pipeline put before the hook was set would otherwise never wake us.
+        QtCore.QTimer.singleShot(0, self._drain_queue)
+        self._diagnostics_timer = QtCore.QTimer(self)
+        self._diagnostics_timer.setInterval(1000)
+        self._diagnostics_timer.timeout.connect(self._emit_diagnostics)
+        self._events_version = -1
+        # After a warm restart the events come straight from the event database.
+        QtCore.QTimer.singleShot(0, self._emit_events)
+
+    @QtCore.Property(QtCore.QObject, constant=True)
+    def gdiSeries(self) -> GdiSeries:
+        return self._series
 
     @QtCore.Slot()
     def forceRefresh(self) -> None:
@@ -331,80 +103,97 @@ class RNGViewModel(QtCore.QObject):
         self.pipeline.enqueue_settings(payload)
         self.settingsApplied.emit(payload)
 
+    @QtCore.Slot(int, bool)
+    def startProfile(self, ticks: int, trace_alloc: bool) -> None:
+        self.pipeline.request_profile(ticks, trace_alloc)
+        self._emit_diagnostics()
+
+    @QtCore.Slot(int, result="QVariantList")
+    def loadEvents(self, offset: int) -> list:
+        return self._event_page(offset)
+
+    @QtCore.Slot(bool)
+    def setDiagnosticsVisible(self, visible: bool) -> None:
+        if visible:
+            self._emit_diagnostics()
+            self._diagnostics_timer.start()
+        else:
+            self._diagnostics_timer.stop()
+
+    def _emit_diagnostics(self) -> None:
+        self.diagnosticsChanged.emit(self.pipeline.diagnostics())
+
     def _drain_queue(self) -> None:
-        updated = False
-        latest_bits: Sequence[int] | None = None
-        while True:
-            try:
-                snapshot, bits = self._queue.get_nowait()
-            except Empty:
-                break
-            self.metrics.add(snapshot, bits)
-            self._emit_snapshot(snapshot)
-            updated = True
-            latest_bits = bits
-        if updated:
-            self._emit_history()
-            self._emit_events()
-            if latest_bits:
-                self._emit_distributions(latest_bits)
+        with self.pipeline.profiler.drain():
+            self._drain_pending()
+
+    def _drain_pending(self) -> None:
+        # The plots get every pending tick's GDI; the views only draw the newest snapshot.
+        started = time.perf_counter()
+        points, latest = self._mailbox.take()
+        self.pipeline.stats.set_gauge("snapshot_queue_depth", len(points))
+        if points:
+            self._series.extend(points)
+        if latest is None:
+            return
+        self._emit_snapshot(latest)
+        if latest.bit_counts:
+            self._emit_distributions(latest.bit_counts)
+        self.pipeline.stats.observe("ui_drain", time.perf_counter() - started)
 
     def _emit_snapshot(self, snapshot: AnalysisSnapshot) -> None:
         self.gdiChanged.emit(snapshot.combined.gdi)
         self.stateChanged.emit(snapshot.detector_state.value)
-        tests_payload = []
-        for summary in snapshot.combined.window_summaries:
-            for result in summary.tests:
-                key = result.key
-                tests_payload.append(
+        tests_payload = [
+            {
+                "window": window,
+                "name": name,
+                "z": z_score,
+                "p": p_value,
+                "q": q_value,
+                "direction": "positive" if z_score >= 0 else "negative",
+            }
+            for window, name, z_score, p_value, q_value in snapshot.combined.table.rows()
+        ]
+        self.testsChanged.emit(tests_payload)
+        if snapshot.devices:
+            self.devicesChanged.emit(
+                [
                     {
-                        "window": summary.window,
-                        "name": result.name,
-                        "z": result.z_score,
-                        "p": result.p_value,
-                        "q": summary.q_values.get(key, 1.0),
-                        "direction": result.direction,
+                        "name": device.name,
+                        "gdi": device.gdi,
+                        "state": device.state.value,
+                        "reason": device.reason,
                     }
-                )
-        self.testsChanged.emit(tests_payload)
-
-    def _emit_history(self) -> None:
-        history = [
-            {"t": record.timestamp_ms, "gdi": record.gdi, "state": record.state.value}
-            for record in list(self.metrics.history)
-        ]
-        self.sparklineChanged.emit(history)
+                    for device in snapshot.devices
+                ]
+            )
 
     def _emit_events(self) -> None:
-        events = [
+        # Only the newest page is sent, and only when the event list changed.
+        if self.metrics.events.version == self._events_version:
+            return
+        self._events_version = self.metrics.events.version
+        self.eventsChanged.emit(self._event_page(0))
+
+    def _event_page(self, offset: int) -> list:
+        return [
             {
-                "t": record.timestamp_ms,
-                "gdi": record.gdi,
-                "state": record.state.value,
-                "reason": record.reason,
+                "t": event.start_ms,
+                "end": event.end_ms,
+                "gdi": event.peak_gdi,
+                "ticks": event.ticks,
+                "state": "event",
+                "reason": event.reason,
             }
-            for record in self.metrics.events
+            for event in self.metrics.events.page(offset, _EVENT_PAGE)
         ]
-        self.eventsChanged.emit(events)
 
-    def _emit_distributions(self, bits: Sequence[int]) -> None:
-        data = list(bits)
-        if not data:
-            return
-        zeros = data.count(0)
-        ones = len(data) - zeros
-        histogram = [
-            {"label": "0", "value": zeros},
-            {"label": "1", "value": ones},
-        ]
-        serial_counts = {"00": 0, "01": 0, "10": 0, "11": 0}
-        for idx in range(len(data) - 1):
-            pair = f"{data[idx]}{data[idx + 1]}"
-            if pair in serial_counts:
-                serial_counts[pair] += 1
+    def _emit_distributions(self, counts: Dict[str, int]) -> None:
+        histogram = [{"label": label, "value": counts.get(label, 0)} for label in ("0", "1")]
         serial_matrix = [
-            {"label": label, "value": value}
-            for label, value in serial_counts.items()
+            {"label": label, "value": counts.get(label, 0)}
+            for label in ("00", "01", "10", "11")
         ]
         self.histogramChanged.emit(histogram)
         self.serialMatrixChanged.emit(serial_matrix)
@@ -419,12 +208,35 @@ def parse_args() -> argparse.Namespace:
         const="1234",
         help="Run with deterministic PRNG (optional seed)",
     )
+    parser.add_argument(
+        "--fake-rate",
+        type=float,
+        metavar="BITS_PER_S",
+        help="Pace the fake source to this bit rate (overrides source.fake_bit_rate)",
+    )
     parser.add_argument(
         "--inject-bias",
         type=float,
         default=0.0,
         help="Flip roughly N%% of bits to simulate bias (0-0.5)",
     )
+    parser.add_argument(
+        "--profile",
+        type=int,
+        default=0,
+        metavar="TICKS",
+        help="Profile the analyzer and UI drain for TICKS analysis ticks",
+    )
+    parser.add_argument(
+        "--profile-alloc",
+        action="store_true",
+        help="Also track allocations with tracemalloc while profiling",
+    )
+    parser.add_argument(
+        "--pipeline-mode",
+        choices=("thread", "process"),
+        help="Override pipeline.mode from the config",
+    )
     parser.add_argument("--log-level", default="INFO")
     return parser.parse_args()
 
@@ -447,7 +259,6 @@ def main() -> int:
     configure_logging(args.log_level)
     config = load_config(Path(args.config))
 
-    queue: Queue = Queue()
     fake_seed = None
     if args.fake is not None:
         try:
@@ -457,36 +268,61 @@ def main() -> int:
     storage_cfg = config.get("storage", {})
     snapshot_dir = Path(storage_cfg.get("snapshot_dir", "data/snapshots"))
     log_csv = storage_cfg.get("log_csv")
+    shadow_csv = storage_cfg.get("shadow_csv")
     export_cfg = storage_cfg.get("export", {})
     export_snapshot_count = export_cfg.get("snapshot_count", 10)
     usb_mount = Path(export_cfg.get("usb_mount", "/media/pi/RNG-LOGS"))
 
+    stats = PipelineStats()
+    state_file = StateFile.from_config(config, history_capacity(config))
+    events = EventStore.from_config(config)
     metrics = MetricsStore(
         maxlen=config["windows"]["history_length"],
         snapshot_dir=snapshot_dir,
-        snapshot_bits=storage_cfg.get("snapshot_bits", 0),
         csv_path=Path(log_csv) if log_csv else None,
         export_snapshot_count=export_snapshot_count,
+        stats=stats,
+        state=state_file,
+        events=events,
+        shadow_csv_path=Path(shadow_csv) if shadow_csv else None,
     )
-
-    pipeline = PipelineRunner(
+    storage = StorageWriter(metrics, stats)
+    storage.start()
+    mailbox = SnapshotMailbox(stats=stats, storage=storage)
+
+    if args.fake_rate is not None:
+        config["source"]["fake_bit_rate"] = args.fake_rate
+    if args.pipeline_mode:
+        config.setdefault("pipeline", {})["mode"] = args.pipeline_mode
+    if device_configs(config):
+        runner_cls = MultiDeviceRunner
+    elif pipeline_mode(config) == "process":
+        runner_cls = ProcessPipeline
+    else:
+        runner_cls = PipelineRunner
+    pipeline = runner_cls(
         config=config,
         config_path=Path(args.config),
-        snapshot_queue=queue,
+        snapshot_queue=mailbox,
         fake_seed=fake_seed,
         inject_bias=args.inject_bias,
+        stats=stats,
+        publisher=TickPublisher.from_config(config, stats),
     )
+    if args.profile:
+        pipeline.request_profile(args.profile, trace_alloc=args.profile_alloc)
     pipeline.start()
 
     app = QtGui.QGuiApplication(sys.argv)
     app.setOverrideCursor(QtCore.Qt.BlankCursor)
     view_model = RNGViewModel(
-        queue,
+        mailbox,
         metrics,
         pipeline,
         usb_mount=usb_mount,
         export_snapshot_count=export_snapshot_count,
     )
+    QtQml.qmlRegisterType(GdiPlot, "RngKiosk", 1, 0, "GdiPlot")
     engine = QtQml.QQmlApplicationEngine()
     engine.rootContext().setContextProperty("viewModel", view_model)
     engine.rootContext().setContextProperty(
@@ -508,9 +344,18 @@ def main() -> int:
 
     for sig in (signal.SIGINT, signal.SIGTERM):
         signal.signal(sig, handle_signal)
+    # Python only runs signal handlers between bytecodes, and with no snapshots arriving
+    # the Qt loop may never call back into Python; a no-op tick makes sure it does.
+    signal_timer = QtCore.QTimer()
+    signal_timer.timeout.connect(lambda: None)
+    signal_timer.start(250)
 
     exit_code = app.exec()
     pipeline.stop()
+    storage.stop()
+    if state_file is not None:
+        state_file.close()
+    events.close()
     return exit_code
 
 
@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import argparse
+import copy
+import csv
+import logging
+import math
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import yaml
+from PySide6 import QtCore
+
+from analysis.calibration import BiasModel
+from analysis.model import DetectorState
+from app import RNGViewModel
+from diagnostics.stats import PipelineStats
+from pipeline.mailbox import SnapshotMailbox
+from pipeline.runner import PipelineRunner
+from rng_sources.bits import BiasInjector
+from storage.metrics import MetricsStore
+
+LOGGER = logging.getLogger("pi-rng-kiosk.latency")
+
+_POLL_MS = 10
+# Detector reasons raised by the per-chunk fast tier rather than a full tick.
+_FAST_REASONS = ("fast_", "page_cusum_")
+
+
+@dataclass(slots=True)
+class LatencyTrial:
+    """One timed onset. Latencies are seconds from the onset chunk entering the pipeline,
+    None if nothing was seen within the timeout. ``early`` marks a false alarm before it."""
+
+    config: str
+    model: str
+    detect_s: Optional[float]
+    ui_s: Optional[float]
+    reason: str = ""
+    early: bool = False
+
+
+class _EventProbe:
+    """Stands in for the snapshot queue and notes when the first EVENT snapshot leaves the
+    analyzer, whichever tier raised it."""
+
+    def __init__(self, mailbox: SnapshotMailbox) -> None:
+        self.mailbox = mailbox
+        self.event_time: Optional[float] = None
+        self.reason = ""
+
+    def put(self, item) -> None:
+        snapshot, _ = item
+        if self.event_time is None and snapshot.detector_state == DetectorState.EVENT:
+            self.event_time = time.monotonic()
+            self.reason = snapshot.detector_reason
+        self.mailbox.put(item)
+
+    def qsize(self) -> int:
+        return self.mailbox.qsize()
+
+
+def benchmark_config(config: Dict, bit_rate: float) -> Dict:
+    """``config`` with the fake source paced to ``bit_rate`` and nothing written to disk."""
+    config = copy.deepcopy(config)
+    config["source"]["fake_bit_rate"] = bit_rate
+    config["source"]["devices"] = []
+    config.setdefault("storage", {})["state_file"] = ""
+    config["storage"].pop("log_csv", None)
+    config.pop("entropy", None)
+    config.setdefault("pipeline", {})["mode"] = "thread"
+    return config
+
+
+def run_trial(
+    config: Dict,
+    label: str,
+    model: BiasModel,
+    seed: int,
+    onset_bits: int,
+    timeout_s: float,
+) -> LatencyTrial:
+    """Run the thread pipeline and the UI view model until the onset reaches the UI."""
+    app = QtCore.QCoreApplication.instance() or QtCore.QCoreApplication([])
+    stats = PipelineStats()
+    mailbox = SnapshotMailbox(stats=stats)
+    probe = _EventProbe(mailbox)
+    injector = BiasInjector(model.strength, kind=model.kind, onset=onset_bits, seed=seed)
+    runner = PipelineRunner(
+        config=config,
+        config_path=Path(tempfile.gettempdir()) / "latency-config.yaml",
+        snapshot_queue=probe,
+        fake_seed=seed,
+        inject_bias=0.0,
+        stats=stats,
+        injector=injector,
+    )
+    ui_seen: List[float] = []
+    with tempfile.TemporaryDirectory() as scratch:
+        metrics = MetricsStore(
+            maxlen=config["windows"]["history_length"], snapshot_dir=Path(scratch), stats=stats
+        )
+        view_model = RNGViewModel(mailbox, metrics, runner, usb_mount=Path(scratch))
+
+        def on_state(state: str) -> None:
+            if not ui_seen and state == DetectorState.EVENT.value:
+                ui_seen.append(time.monotonic())
+
+        # Time from start until the onset must have been reached, plus the timeout after it.
+        rate = max(1.0, float(config["source"]["fake_bit_rate"]))
+        give_up = time.monotonic() + 2 * onset_bits / rate + 10
+
+        def check() -> None:
+            onset = injector.onset_time
+            expired = time.monotonic() > (give_up if onset is None else onset + timeout_s)
+            early = probe.event_time is not None and onset is None
+            if ui_seen or expired or early:
+                app.quit()
+
+        view_model.stateChanged.connect(on_state)
+        timer = QtCore.QTimer()
+        timer.timeout.connect(check)
+        timer.start(_POLL_MS)
+        runner.start()
+        try:
+            app.exec()
+        finally:
+            timer.stop()
+            runner.stop()
+            metrics.events.close()
+    onset = injector.onset_time
+    if onset is None or (probe.event_time is not None and probe.event_time < onset):
+        return LatencyTrial(label, model.label, None, None, probe.reason, early=True)
+    detect_s = probe.event_time - onset if probe.event_time is not None else None
+    ui_s = ui_seen[0] - onset if ui_seen else None
+    return LatencyTrial(label, model.label, detect_s, ui_s, probe.reason)
+
+
+def run_benchmark(
+    configs: Sequence[Tuple[str, Dict]],
+    models: Sequence[BiasModel],
+    trials: int = 20,
+    bit_rate: float = 262144,
+    warmup_s: float = 2.0,
+    timeout_s: float = 30.0,
+    seed: int = 0,
+) -> List[LatencyTrial]:
+    onset_bits = int(warmup_s * bit_rate)
+    results = []
+    for label, config in configs:
+        prepared = benchmark_config(config, bit_rate)
+        for model in models:
+            for trial in range(trials):
+                result = run_trial(prepared, label, model, seed + trial, onset_bits, timeout_s)
+                LOGGER.info(
+                    "%s %s trial %d: detect=%s ui=%s %s",
+                    label,
+                    model.label,
+                    trial,
+                    result.detect_s,
+                    result.ui_s,
+                    result.reason,
+                )
+                results.append(result)
+    return results
+
+
+def _percentile(values: Sequence[Optional[float]], fraction: float) -> float:
+    # Misses count as infinitely late, as in the calibration table.
+    if not values:
+        return float("nan")
+    data = np.array([math.inf if value is None else value for value in values])
+    return float(np.quantile(data, fraction, method="higher"))
+
+
+def summarize(results: Sequence[LatencyTrial]) -> List[Dict[str, object]]:
+    """One row per (config, model): detection rate and latency percentiles."""
+    groups: Dict[Tuple[str, str], List[LatencyTrial]] = {}
+    for result in results:
+        groups.setdefault((result.config, result.model), []).append(result)
+    rows = []
+    for (label, model), group in groups.items():
+        timed = [result for result in group if not result.early]
+        detect = [result.detect_s for result in timed]
+        ui = [result.ui_s for result in timed]
+        seen = [result for result in timed if result.detect_s is not None]
+        fast = sum(result.reason.startswith(_FAST_REASONS) for result in seen)
+        detected = sum(value is not None for value in ui)
+        rows.append(
+            {
+                "config": label,
+                "model": model,
+                "trials": len(group),
+                "early": len(group) - len(timed),
+                "detected": detected / len(timed) if timed else float("nan"),
+                "fast_share": fast / len(seen) if seen else float("nan"),
+                **{
+                    f"{name}_p{int(fraction * 100)}_s": _percentile(values, fraction)
+                    for name, values in (("detect", detect), ("ui", ui))
+                    for fraction in (0.5, 0.9, 1.0)
+                },
+            }
+        )
+    return rows
+
+
+def format_table(rows: Sequence[Dict[str, object]]) -> str:
+    header = [
+        "config",
+        "model",
+        "n",
+        "early",
+        "det%",
+        "fast%",
+        "det_p50",
+        "det_p90",
+        "det_max",
+        "ui_p50",
+        "ui_p90",
+        "ui_max",
+    ]
+    lines = [header]
+    for row in rows:
+        lines.append(
+            [
+                str(row["config"]),
+                str(row["model"]),
+                str(row["trials"]),
+                str(row["early"]),
+                f"{100 * row['detected']:.0f}",
+                f"{100 * row['fast_share']:.0f}",
+                *(
+                    f"{row[f'{name}_p{percent}_s']:.2f}"
+                    for name in ("detect", "ui")
+                    for percent in (50, 90, 100)
+                ),
+            ]
+        )
+    widths = [max(len(line[col]) for line in lines) for col in range(len(header))]
+    return "\n".join(
+        "  ".join(cell.rjust(width) for cell, width in zip(line, widths, strict=True))
+        for line in lines
+    )
+
+
+def write_csv(path: Path, results: Sequence[LatencyTrial]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["config", "model", "detect_s", "ui_s", "reason", "early"])
+        for result in results:
+            writer.writerow(
+                [
+                    result.config,
+                    result.model,
+                    result.detect_s,
+                    result.ui_s,
+                    result.reason,
+                    int(result.early),
+                ]
+            )
+
+
+def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="End-to-end detection latency of the live pipeline and UI"
+    )
+    parser.add_argument(
+        "--config", action="append", default=[], help="Kiosk config to benchmark (repeatable)"
+    )
+    parser.add_argument(
+        "--bias",
+        action="append",
+        default=[],
+        help="Bias model after the onset, e.g. p1:0.01, corr:0.01 (repeatable)",
+    )
+    parser.add_argument("--trials", type=int, default=20, help="Trials per config and model")
+    parser.add_argument(
+        "--bit-rate",
+        type=float,
+        help="Fake source bits per second (default: pipeline.max_bit_rate)",
+    )
+    parser.add_argument("--warmup-s", type=float, default=2.0, help="Unbiased run before onset")
+    parser.add_argument("--timeout-s", type=float, default=30.0, help="Give up after onset")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", type=Path, help="Also write every trial to this CSV file")
+    return parser.parse_args(list(argv) if argv is not None else None)
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s :: %(message)s")
+    configs = []
+    for path in args.config or ["config.yaml"]:
+        with open(path, encoding="utf-8") as handle:
+            configs.append((Path(path).stem, yaml.safe_load(handle)))
+    bit_rate = args.bit_rate or configs[0][1].get("pipeline", {}).get("max_bit_rate") or 262144
+    models = [BiasModel.parse(spec) for spec in args.bias or ["p1:0.01"]]
+    results = run_benchmark(
+        configs,
+        models,
+        trials=args.trials,
+        bit_rate=bit_rate,
+        warmup_s=args.warmup_s,
+        timeout_s=args.timeout_s,
+        seed=args.seed,
+    )
+    print(f"bit_rate={bit_rate:g}/s warmup={args.warmup_s:g}s trials={args.trials}")
+    print(format_table(summarize(results)))
+    if args.csv:
+        write_csv(args.csv, results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import UTC, datetime
+from pathlib import Path
+from types import FrameType
+from typing import Any, Dict, Optional
+
+LOGGER = logging.getLogger("pi-rng-kiosk.profiler")
+
+
+class _ProfileSession:
+    def __init__(self, ticks: int, trace_alloc: bool, output_dir: Path) -> None:
+        self.ticks = ticks
+        self.trace_alloc = trace_alloc
+        self.output_dir = output_dir
+        self.ticks_done = 0
+        self.analyzer = cProfile.Profile()
+        self.drain: Optional[cProfile.Profile] = cProfile.Profile()
+        self.drain_calls = 0
+        self.stacks: Counter[str] = Counter()
+
+
+class _DrainScope:
+    __slots__ = ("_profiler", "_profile")
+
+    def __init__(self, profiler: "TickProfiler") -> None:
+        self._profiler = profiler
+        self._profile: Optional[cProfile.Profile] = None
+
+    def __enter__(self) -> "_DrainScope":
+        self._profile = self._profiler._enter_drain()
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        if self._profile is not None:
+            self._profiler._exit_drain(self._profile)
+
+
+class TickProfiler:
+    """Profiles the analyzer thread and the Qt drain for a fixed number of analysis ticks.
+
+    Writes cProfile statistics per thread, a collapsed-stack file for flame-graph tools, and
+    optionally a tracemalloc report into a timestamped folder under ``output_dir``.
+    """
+
+    def __init__(self, output_dir: Path, sample_interval: float = 0.002) -> None:
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.last_output: Optional[Path] = None
+        self._lock = threading.Lock()
+        self._pending: Optional[_ProfileSession] = None
+        self._session: Optional[_ProfileSession] = None
+        self._analyzer_ident: Optional[int] = None
+        self._drain_ident: Optional[int] = None
+        self._sampler: Optional[threading.Thread] = None
+        self._sampler_stop = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        return self._session is not None or self._pending is not None
+
+    def request(self, ticks: int, trace_alloc: bool = False) -> bool:
+        if ticks <= 0:
+            return False
+        with self._lock:
+            if self.active:
+                return False
+            stamp = datetime.now(UTC).strftime("%Y%m%d_%H%M%SZ")
+            self._pending = _ProfileSession(
+                ticks, trace_alloc, self.output_dir / f"profile_{stamp}"
+            )
+        LOGGER.info("Profiling requested for %d ticks (tracemalloc=%s)", ticks, trace_alloc)
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        session = self._session or self._pending
+        return {
+            "active": session is not None,
+            "ticks": session.ticks if session else 0,
+            "ticks_done": session.ticks_done if session else 0,
+            "last_output": str(self.last_output) if self.last_output else "",
+        }
+
+    def on_tick(self) -> None:
+        """Called from the analyzer thread once per analysis tick."""
+        if self._pending is not None and self._session is None:
+            self._start()
+            return
+        session = self._session
+        if session is None:
+            return
+        session.ticks_done += 1
+        if session.ticks_done >= session.ticks:
+            self._finish()
+
+    def drain(self) -> _DrainScope:
+        return _DrainScope(self)
+
+    def _start(self) -> None:
+        with self._lock:
+            session, self._pending = self._pending, None
+            if session is None:
+                return
+            self._analyzer_ident = threading.get_ident()
+            if session.trace_alloc and not tracemalloc.is_tracing():
+                tracemalloc.start(25)
+            self._session = session
+        self._sampler_stop.clear()
+        self._sampler = threading.Thread(
+            target=self._sample_loop, name="profile-sampler", daemon=True
+        )
+        self._sampler.start()
+        session.analyzer.enable()
+
+    def _finish(self) -> None:
+        session = self._session
+        if session is None:
+            return
+        session.analyzer.disable()
+        self._sampler_stop.set()
+        if self._sampler:
+            self._sampler.join(timeout=1)
+        # Holding the lock guarantees the Qt drain profile is not enabled while we dump it.
+        with self._lock:
+            self._session = None
+            alloc_snapshot = None
+            if session.trace_alloc and tracemalloc.is_tracing():
+                alloc_snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+            try:
+                self._write(session, alloc_snapshot)
+                self.last_output = session.output_dir
+                LOGGER.info("Profile written to %s", session.output_dir)
+            except Exception:
+                LOGGER.exception("Failed to write profile output")
+
+    def _enter_drain(self) -> Optional[cProfile.Profile]:
+        if self._session is None:
+            return None
+        self._lock.acquire()
+        session = self._session
+        if session is None or session.drain is None:
+            self._lock.release()
+            return None
+        self._drain_ident = threading.get_ident()
+        try:
+            session.drain.enable()
+        except ValueError:
+            # Python 3.12+ allows a single active cProfile per process; rely on sampling instead.
+            session.drain = None
+            self._lock.release()
+            return None
+        session.drain_calls += 1
+        return session.drain
+
+    def _exit_drain(self, profile: cProfile.Profile) -> None:
+        profile.disable()
+        self._drain_ident = None
+        self._lock.release()
+
+    def _sample_loop(self) -> None:
+        while not self._sampler_stop.wait(self.sample_interval):
+            session = self._session
+            if session is None:
+                return
+            frames = sys._current_frames()
+            roles = (("analyzer", self._analyzer_ident), ("qt_drain", self._drain_ident))
+            for role, ident in roles:
+                frame = frames.get(ident) if ident is not None else None
+                if frame is not None:
+                    session.stacks[_collapse(role, frame)] += 1
+
+    def _write(
+        self, session: _ProfileSession, alloc_snapshot: Optional[tracemalloc.Snapshot]
+    ) -> None:
+        target = session.output_dir
+        target.mkdir(parents=True, exist_ok=True)
+        _dump_profile(session.analyzer, target / "analyzer")
+        if session.drain is not None and session.drain_calls:
+            _dump_profile(session.drain, target / "qt_drain")
+        with (target / "collapsed.txt").open("w", encoding="utf-8") as handle:
+            for stack, count in session.stacks.most_common():
+                handle.write(f"{stack} {count}\n")
+        if alloc_snapshot is not None:
+            with (target / "tracemalloc.txt").open("w", encoding="utf-8") as handle:
+                handle.write("Top allocation sites by size\n")
+                for stat in alloc_snapshot.statistics("lineno")[:50]:
+                    handle.write(f"{stat}\n")
+                handle.write("\nTop allocation tracebacks\n")
+                for stat in alloc_snapshot.statistics("traceback")[:10]:
+                    handle.write(f"\n{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+                    handle.writelines(f"  {line}\n" for line in stat.traceback.format())
+        (target / "summary.txt").write_text(
+            f"ticks={session.ticks_done}\ndrain_calls={session.drain_calls}\n"
+            f"samples={sum(session.stacks.values())}\n"
+            f"written={time.strftime('%Y-%m-%d %H:%M:%S')}\n",
+            encoding="utf-8",
+        )
+
+
+def _dump_profile(profile: cProfile.Profile, stem: Path) -> None:
+    profile.dump_stats(str(stem.with_suffix(".pstats")))
+    buffer = io.StringIO()
+    stats = pstats.Stats(profile, stream=buffer)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(60)
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(30)
+    stem.with_suffix(".txt").write_text(buffer.getvalue(), encoding="utf-8")
+
+
+def _collapse(role: str, frame: Optional[FrameType]) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.append(role)
+    return ";".join(reversed(names))
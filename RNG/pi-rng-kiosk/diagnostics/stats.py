@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Bucket i holds samples in [2**(i-1), 2**i) microseconds; bucket 0 is sub-microsecond.
+_BUCKET_COUNT = 24
+
+
+class LatencyHistogram:
+    """Fixed log2-bucket latency histogram with constant-time recording."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * _BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        index = min(int(seconds * 1_000_000).bit_length(), _BUCKET_COUNT - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction: float) -> float:
+        if self.count == 0:
+            return 0.0
+        target = max(1, int(round(fraction * self.count)))
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= target:
+                upper = (2**index) / 1_000_000
+                return min(upper, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, float]:
+        mean = self.total / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "mean_ms": mean * 1000,
+            "p50_ms": self.percentile(0.5) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+class RateMeter:
+    """Tracks a running total and reports its rate over the last sampling interval."""
+
+    __slots__ = ("total", "_checkpoint_total", "_checkpoint_time", "_rate", "interval")
+
+    def __init__(self, interval: float = 1.0) -> None:
+        self.total = 0
+        self.interval = interval
+        self._checkpoint_total = 0
+        self._checkpoint_time = time.monotonic()
+        self._rate = 0.0
+
+    def mark(self, amount: int) -> None:
+        self.total += amount
+
+    def rate(self, now: float | None = None) -> float:
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._checkpoint_time
+        if elapsed >= self.interval:
+            self._rate = (self.total - self._checkpoint_total) / elapsed
+            self._checkpoint_total = self.total
+            self._checkpoint_time = now
+        return self._rate
+
+
+class _StageTimer:
+    __slots__ = ("_stats", "_stage", "_start")
+
+    def __init__(self, stats: "PipelineStats", stage: str) -> None:
+        self._stats = stats
+        self._stage = stage
+        self._start = 0.0
+
+    def __enter__(self) -> "_StageTimer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        self._stats.observe(self._stage, time.perf_counter() - self._start)
+
+
+class PipelineStats:
+    """Always-on per-stage latency histograms, counters, gauges, and rate meters."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._counters: Dict[str, int] = {}
+        self._gauges: Dict[str, float] = {}
+        self._rates: Dict[str, RateMeter] = {}
+        self.started = time.monotonic()
+
+    def time(self, stage: str) -> _StageTimer:
+        return _StageTimer(self, stage)
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def set_gauge(self, name: str, value: float) -> None:
+        self._gauges[name] = value
+
+    def mark(self, name: str, amount: int) -> None:
+        with self._lock:
+            meter = self._rates.get(name)
+            if meter is None:
+                meter = self._rates[name] = RateMeter()
+            meter.mark(amount)
+
+    def histogram(self, stage: str) -> Optional[LatencyHistogram]:
+        return self._histograms.get(stage)
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            stages = [
+                {"name": name, **histogram.to_dict()}
+                for name, histogram in sorted(self._histograms.items())
+            ]
+            counters = dict(self._counters)
+            rates = {name: meter.rate(now) for name, meter in self._rates.items()}
+        return {
+            "uptime_s": now - self.started,
+            "stages": stages,
+            "counters": counters,
+            "gauges": dict(self._gauges),
+            "rates": rates,
+        }
+
+    def format_summary(self) -> str:
+        snapshot = self.snapshot()
+        parts = [
+            f"{stage['name']}: n={stage['count']} mean={stage['mean_ms']:.3f}ms "
+            f"p99={stage['p99_ms']:.3f}ms max={stage['max_ms']:.3f}ms"
+            for stage in snapshot["stages"]
+        ]
+        parts.extend(f"{name}={value:g}" for name, value in sorted(snapshot["gauges"].items()))
+        parts.extend(f"{name}={value:.0f}/s" for name, value in sorted(snapshot["rates"].items()))
+        parts.extend(f"{name}={value}" for name, value in sorted(snapshot["counters"].items()))
+        return "; ".join(parts)
+
+
+def merge_snapshot(payload: Dict[str, Any], prefix: str, child: Dict[str, Any]) -> None:
+    """Fold a child process's stats snapshot into ``payload`` under ``prefix/``."""
+    payload["stages"].extend(
+        {**stage, "name": f"{prefix}/{stage['name']}"} for stage in child["stages"]
+    )
+    for key in ("counters", "gauges", "rates"):
+        payload[key].update({f"{prefix}/{label}": value for label, value in child[key].items()})
+    if child.get("shadow"):
+        payload.setdefault("shadow", []).extend(
+            {**row, "label": f"{prefix}/{row['label']}"} for row in child["shadow"]
+        )
@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from analysis.combine import combine_device_stats
+from analysis.detector import Detector, DetectorConfig
+from analysis.model import AnalysisSnapshot, DetectorState, DeviceStatus
+from storage.metrics import MetricsStore
+
+from .protocol import NodeTick, decode_batch
+
+LOGGER = logging.getLogger("pi-rng-kiosk.collector")
+
+
+class TickAligner:
+    """Groups node ticks into fixed time buckets and releases a bucket once its grace expires."""
+
+    def __init__(self, bucket_ms: int = 500, grace_ms: int = 1500, max_buckets: int = 120) -> None:
+        self.bucket_ms = bucket_ms
+        self.grace_ms = grace_ms
+        self.max_buckets = max_buckets
+        self.late = 0
+        self.evicted = 0
+        self._buckets: "OrderedDict[int, Dict[str, NodeTick]]" = OrderedDict()
+        self._released = -1
+
+    def add(self, tick: NodeTick) -> None:
+        bucket = tick.timestamp_ms // self.bucket_ms
+        if bucket <= self._released:
+            self.late += 1
+            return
+        slot = self._buckets.get(bucket)
+        if slot is None:
+            slot = self._buckets[bucket] = {}
+            if len(self._buckets) > 1 and bucket < next(reversed(self._buckets)):
+                self._buckets = OrderedDict(sorted(self._buckets.items()))
+            while len(self._buckets) > self.max_buckets:
+                evicted, _ = self._buckets.popitem(last=False)
+                self._released = max(self._released, evicted)
+                self.evicted += 1
+        slot[tick.node] = tick
+
+    def ready(self, now_ms: int) -> List[tuple[int, Dict[str, NodeTick]]]:
+        released = []
+        while self._buckets:
+            bucket = next(iter(self._buckets))
+            if (bucket + 1) * self.bucket_ms + self.grace_ms > now_ms:
+                break
+            released.append((bucket, self._buckets.pop(bucket)))
+            self._released = bucket
+        return released
+
+
+class Collector:
+    """Combines aligned ticks from many kiosks and runs a network-wide Detector."""
+
+    def __init__(
+        self,
+        detector_config: DetectorConfig,
+        bucket_ms: int = 500,
+        grace_ms: int = 1500,
+        max_buckets: int = 120,
+        metrics: Optional[MetricsStore] = None,
+        on_result: Optional[Callable[[AnalysisSnapshot], None]] = None,
+    ) -> None:
+        self.aligner = TickAligner(bucket_ms, grace_ms, max_buckets)
+        self.detector = Detector(detector_config)
+        self.metrics = metrics
+        self.on_result = on_result
+        self.results = 0
+        self.received = 0
+        self.connections = 0
+
+    def ingest(self, ticks: List[NodeTick]) -> None:
+        self.received += len(ticks)
+        for tick in ticks:
+            self.aligner.add(tick)
+
+    def process(self, now_ms: int | None = None) -> List[AnalysisSnapshot]:
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        results = []
+        for bucket, nodes in self.aligner.ready(now_ms):
+            if not nodes:
+                continue
+            combined = combine_device_stats({node: tick.combined for node, tick in nodes.items()})
+            state, reason = self.detector.evaluate(combined.gdi, combined.table.q)
+            snapshot = AnalysisSnapshot(
+                timestamp_ms=bucket * self.aligner.bucket_ms,
+                combined=combined,
+                detector_state=state,
+                detector_reason=reason,
+                devices=[
+                    DeviceStatus(
+                        name=node,
+                        timestamp_ms=tick.timestamp_ms,
+                        gdi=tick.gdi,
+                        state=tick.state,
+                        reason="",
+                    )
+                    for node, tick in sorted(nodes.items())
+                ],
+            )
+            self.results += 1
+            if self.metrics is not None:
+                self.metrics.add(snapshot)
+            if self.on_result is not None:
+                self.on_result(snapshot)
+            level = logging.WARNING if state == DetectorState.EVENT else logging.DEBUG
+            LOGGER.log(
+                level,
+                "t=%d nodes=%d gdi=%.2f state=%s reason=%s",
+                snapshot.timestamp_ms,
+                len(nodes),
+                combined.gdi,
+                state.value,
+                reason,
+            )
+            results.append(snapshot)
+        return results
+
+    async def serve(
+        self,
+        host: str,
+        port: int,
+        ready: Optional[Callable[[int], None]] = None,
+        stop: Optional[asyncio.Event] = None,
+        line_limit: int = 4 * 1024 * 1024,
+    ) -> None:
+        server = await asyncio.start_server(self._handle, host, port, limit=line_limit)
+        bound_port = server.sockets[0].getsockname()[1]
+        LOGGER.info("Collector listening on %s:%d", host, bound_port)
+        if ready is not None:
+            ready(bound_port)
+        stop = stop or asyncio.Event()
+        async with server:
+            while not stop.is_set():
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(stop.wait(), timeout=self.aligner.bucket_ms / 2000)
+                self.process()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        peer = writer.get_extra_info("peername")
+        self.connections += 1
+        LOGGER.info("Node connected from %s", peer)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (asyncio.LimitOverrunError, ValueError):
+                    LOGGER.warning("Dropping oversized batch from %s", peer)
+                    break
+                if not line:
+                    break
+                try:
+                    _node, ticks = decode_batch(line)
+                except (ValueError, KeyError, TypeError) as exc:
+                    LOGGER.warning("Malformed batch from %s (%s)", peer, exc)
+                    continue
+                self.ingest(ticks)
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            writer.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="RNG kiosk network collector")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=7845)
+    parser.add_argument("--bucket-ms", type=int, default=500, help="Tick alignment bucket")
+    parser.add_argument("--grace-ms", type=int, default=1500, help="Wait for late nodes")
+    parser.add_argument("--gdi-z", type=float, default=3.0)
+    parser.add_argument("--sustained-z", type=float, default=2.5)
+    parser.add_argument("--sustained-ticks", type=int, default=5)
+    parser.add_argument("--fdr-q", type=float, default=0.01)
+    parser.add_argument("--csv", help="Append combined ticks to this CSV")
+    parser.add_argument("--log-level", default="INFO")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    logging.basicConfig(
+        level=getattr(logging, args.log_level.upper(), logging.INFO),
+        format="%(asctime)s %(levelname)s %(name)s :: %(message)s",
+    )
+    metrics = None
+    if args.csv:
+        csv_path = Path(args.csv)
+        metrics = MetricsStore(
+            maxlen=600,
+            snapshot_dir=csv_path.parent / "snapshots",
+            csv_path=csv_path,
+        )
+    collector = Collector(
+        DetectorConfig(
+            gdi_threshold=args.gdi_z,
+            sustained_threshold=args.sustained_z,
+            sustained_ticks=args.sustained_ticks,
+            fdr_q_threshold=args.fdr_q,
+        ),
+        bucket_ms=args.bucket_ms,
+        grace_ms=args.grace_ms,
+        metrics=metrics,
+    )
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(collector.serve(args.host, args.port))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
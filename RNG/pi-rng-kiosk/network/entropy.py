@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import contextlib
+import errno
+import hashlib
+import logging
+import os
+import socket
+import stat
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import numpy as np
+
+from diagnostics.stats import PipelineStats
+
+LOGGER = logging.getLogger("pi-rng-kiosk.entropy")
+
+CONDITIONERS = ("none", "von_neumann", "sha256")
+MODES = ("socket", "fifo")
+_SEND_BYTES = 4096
+_POLL_S = 0.2
+
+
+def von_neumann(bits: np.ndarray) -> np.ndarray:
+    """Von Neumann debiasing over bit pairs: 01 gives 0, 10 gives 1, 00 and 11 are dropped."""
+    pairs = bits[: len(bits) // 2 * 2].reshape(-1, 2)
+    return pairs[pairs[:, 0] != pairs[:, 1], 0]
+
+
+class Conditioner:
+    """Turns released bits into output bytes.
+
+    ``von_neumann`` removes bias at the cost of at least three quarters of the bits;
+    ``sha256`` hashes every ``block_bytes`` of input into a 32-byte digest. Partial pairs,
+    bytes and hash blocks carry over between calls, so the output does not depend on how
+    the input was chunked.
+    """
+
+    def __init__(self, method: str = "none", block_bytes: int = 64) -> None:
+        if method not in CONDITIONERS:
+            raise ValueError(f"unknown conditioner {method!r}")
+        self.method = method
+        self.block_bytes = max(32, block_bytes)
+        self._odd = np.empty(0, dtype=np.uint8)
+        self._bits = np.empty(0, dtype=np.uint8)
+        self._block = b""
+
+    def feed(self, bits: np.ndarray) -> bytes:
+        if self.method == "von_neumann":
+            bits = np.concatenate([self._odd, bits])
+            even = len(bits) // 2 * 2
+            self._odd = bits[even:]
+            bits = von_neumann(bits[:even])
+        bits = np.concatenate([self._bits, bits])
+        whole = len(bits) // 8 * 8
+        self._bits = bits[whole:]
+        packed = np.packbits(bits[:whole]).tobytes()
+        if self.method != "sha256":
+            return packed
+        data = self._block + packed
+        size = self.block_bytes
+        blocks = len(data) // size
+        self._block = data[blocks * size :]
+        return b"".join(
+            hashlib.sha256(data[index * size : (index + 1) * size]).digest()
+            for index in range(blocks)
+        )
+
+
+class EntropyOutput:
+    """Streams bits from healthy periods to local consumers over a Unix socket or named pipe.
+
+    The analyzer hands over each tick's bits with ``offer`` once the detector has judged
+    them. Bits from calm ticks are queued and everything else is discarded. ``offer`` only
+    copies into a bounded queue. Conditioning and writing happen on consumer threads, one
+    per connected socket client or one for the pipe, so a slow or absent consumer never
+    holds up the analysis. Bits offered while the queue is full are dropped and counted.
+    Every output byte goes to exactly one consumer and is never sent twice.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        mode: str = "socket",
+        conditioner: str = "none",
+        max_buffer_bits: int = 1 << 23,
+        stats: Optional[PipelineStats] = None,
+    ) -> None:
+        if mode not in MODES:
+            raise ValueError(f"unknown entropy output mode {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.max_buffer_bits = max(1, max_buffer_bits)
+        self.stats = stats
+        self.released_bits = 0
+        self.discarded_bits = 0
+        self.dropped_bits = 0
+        self.sent_bytes = 0
+        self._conditioner = Conditioner(conditioner)
+        self._queue: Deque[np.ndarray] = deque()
+        self._queued_bits = 0
+        self._ready = bytearray()
+        # offer() only ever takes _queued; consumers hold _take_lock while conditioning.
+        self._queued = threading.Condition()
+        self._take_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._server: Optional[socket.socket] = None
+        self._clients: List[socket.socket] = []
+        self._threads: List[threading.Thread] = []
+
+    @classmethod
+    def from_config(
+        cls, config: Dict, stats: Optional[PipelineStats] = None
+    ) -> Optional["EntropyOutput"]:
+        entropy_cfg = config.get("entropy") or {}
+        if not entropy_cfg.get("enabled"):
+            return None
+        return cls(
+            path=Path(entropy_cfg.get("path", "data/entropy.sock")),
+            mode=str(entropy_cfg.get("mode", "socket")).lower(),
+            conditioner=str(entropy_cfg.get("conditioner", "none")).lower(),
+            max_buffer_bits=int(entropy_cfg.get("max_buffer_bits", 1 << 23)),
+            stats=stats,
+        )
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.mode == "fifo":
+            if not self.path.exists():
+                os.mkfifo(self.path)
+            elif not stat.S_ISFIFO(self.path.stat().st_mode):
+                raise ValueError(f"{self.path} exists and is not a named pipe")
+            target = self._serve_fifo
+        else:
+            self.path.unlink(missing_ok=True)
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(str(self.path))
+            server.listen()
+            server.settimeout(_POLL_S)
+            self._server = server
+            target = self._accept_loop
+        self._spawn(target)
+        LOGGER.info("Serving entropy on %s %s", self.mode, self.path)
+
+    def stop(self, timeout: float = 2.0) -> None:
+        self._stop.set()
+        with self._queued:
+            self._queued.notify_all()
+        for client in list(self._clients):
+            with contextlib.suppress(OSError):
+                client.shutdown(socket.SHUT_RDWR)
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            self.path.unlink(missing_ok=True)
+
+    def offer(self, bits: np.ndarray, healthy: bool) -> None:
+        """Queue bits the detector judged calm; never blocks on consumers."""
+        count = len(bits)
+        if not count:
+            return
+        if not healthy:
+            self.discarded_bits += count
+            self._count("entropy_discarded_bits", count)
+            return
+        if self._queued_bits + count > self.max_buffer_bits:
+            self.dropped_bits += count
+            self._count("entropy_dropped_bits", count)
+            return
+        chunk = np.array(bits, dtype=np.uint8)
+        with self._queued:
+            self._queue.append(chunk)
+            self._queued_bits += count
+            self._queued.notify()
+        self.released_bits += count
+        self._count("entropy_released_bits", count)
+        if self.stats is not None:
+            self.stats.set_gauge("entropy_buffer_bits", self._queued_bits)
+
+    def pending_bits(self) -> int:
+        return self._queued_bits
+
+    def _count(self, name: str, amount: int) -> None:
+        if self.stats is not None:
+            self.stats.incr(name, amount)
+
+    def _spawn(self, target: Callable[..., None], *args: Any) -> None:
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        thread = threading.Thread(target=target, args=args, name="entropy-output", daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def _take(self, limit: int) -> bytes:
+        """Up to ``limit`` conditioned bytes; blocks until some are ready, empty on stop."""
+        with self._take_lock:
+            while not self._ready:
+                with self._queued:
+                    while not self._queue:
+                        if self._stop.is_set():
+                            return b""
+                        self._queued.wait(_POLL_S)
+                    chunk = self._queue.popleft()
+                    self._queued_bits -= len(chunk)
+                self._ready += self._conditioner.feed(chunk)
+            data = bytes(self._ready[:limit])
+            del self._ready[:limit]
+        return data
+
+    def _sent(self, count: int) -> None:
+        self.sent_bytes += count
+        if self.stats is not None:
+            self.stats.incr("entropy_sent_bytes", count)
+            self.stats.mark("entropy_bytes", count)
+
+    def _accept_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                client, _ = self._server.accept()
+            except TimeoutError:
+                continue
+            except OSError:
+                return
+            client.settimeout(None)
+            self._clients.append(client)
+            self._spawn(self._serve_client, client)
+
+    def _serve_client(self, client: socket.socket) -> None:
+        # A chunk lost to a broken connection is not re-queued: it may already have been
+        # partly read, and entropy must never reach two consumers.
+        try:
+            while True:
+                data = self._take(_SEND_BYTES)
+                if not data:
+                    return
+                client.sendall(data)
+                self._sent(len(data))
+        except OSError as exc:
+            LOGGER.debug("Entropy consumer went away (%s)", exc)
+        finally:
+            self._clients.remove(client)
+            client.close()
+
+    def _serve_fifo(self) -> None:
+        while not self._stop.is_set():
+            try:
+                # Non-blocking open fails with ENXIO until a reader has the pipe open.
+                fd = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+            except OSError as exc:
+                if exc.errno != errno.ENXIO:
+                    LOGGER.warning("Cannot open %s (%s)", self.path, exc)
+                self._stop.wait(_POLL_S)
+                continue
+            os.set_blocking(fd, True)
+            try:
+                while True:
+                    data = memoryview(self._take(_SEND_BYTES))
+                    if not data:
+                        break
+                    while data:
+                        written = os.write(fd, data)
+                        self._sent(written)
+                        data = data[written:]
+            except OSError as exc:
+                LOGGER.debug("Entropy pipe reader went away (%s)", exc)
+            finally:
+                os.close(fd)
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from typing import Any, Dict, List, Sequence, Tuple
+
+from analysis.model import AnalysisSnapshot, CombinedStats, DetectorState, TickResultTable
+
+# Wire format: one newline-terminated JSON object per batch,
+#   {"node": "<id>", "ticks": [[timestamp_ms, gdi, state, [[test, window, z, p], ...]], ...]}
+
+
+@dataclass(slots=True)
+class NodeTick:
+    node: str
+    timestamp_ms: int
+    gdi: float
+    state: DetectorState
+    combined: CombinedStats
+
+
+def encode_tick(snapshot: AnalysisSnapshot) -> List[Any]:
+    tests = [
+        [name, window, z_score, p_value]
+        for window, name, z_score, p_value, _ in snapshot.combined.table.rows()
+    ]
+    return [
+        snapshot.timestamp_ms,
+        snapshot.combined.gdi,
+        snapshot.detector_state.value,
+        tests,
+    ]
+
+
+def encode_batch(node: str, ticks: Sequence[List[Any]]) -> bytes:
+    payload = {"node": node, "ticks": list(ticks)}
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def decode_batch(line: bytes) -> Tuple[str, List[NodeTick]]:
+    payload: Dict[str, Any] = json.loads(line)
+    node = str(payload["node"])
+    return node, [_decode_tick(node, tick) for tick in payload.get("ticks", [])]
+
+
+def _decode_tick(node: str, tick: Sequence[Any]) -> NodeTick:
+    timestamp_ms, gdi, state, tests = tick
+    # q-values are left unset: the collector recomputes them across nodes.
+    combined = CombinedStats(
+        gdi=float(gdi),
+        stouffer_z=float(gdi),
+        table=TickResultTable.from_rows(
+            (str(name), window, z_score, p_value) for name, window, z_score, p_value in tests
+        ),
+    )
+    return NodeTick(
+        node=node,
+        timestamp_ms=int(timestamp_ms),
+        gdi=float(gdi),
+        state=DetectorState(state),
+        combined=combined,
+    )
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import logging
+import socket
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from analysis.model import AnalysisSnapshot
+from diagnostics.stats import PipelineStats
+
+from .protocol import encode_batch, encode_tick
+
+LOGGER = logging.getLogger("pi-rng-kiosk.publisher")
+
+
+class TickPublisher:
+    """Ships compact per-tick results to a collector without ever blocking the analyzer.
+
+    Ticks land in a bounded buffer (oldest dropped first); a background thread sends them in
+    batches over TCP and reconnects with exponential backoff when the collector goes away.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        node_id: str,
+        batch_interval: float = 1.0,
+        batch_size: int = 32,
+        max_buffer: int = 1000,
+        max_backoff: float = 30.0,
+        stats: Optional[PipelineStats] = None,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.node_id = node_id
+        self.batch_interval = batch_interval
+        self.batch_size = max(1, batch_size)
+        self.max_backoff = max_backoff
+        self.stats = stats
+        self.sent = 0
+        self.dropped = 0
+        self.reconnects = 0
+        self._buffer: Deque[List[Any]] = deque(maxlen=max(1, max_buffer))
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._socket: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(
+        cls, config: Dict, stats: Optional[PipelineStats] = None
+    ) -> Optional["TickPublisher"]:
+        publish_cfg = config.get("network", {}).get("publish") or {}
+        if not publish_cfg.get("enabled"):
+            return None
+        return cls(
+            host=publish_cfg.get("host", "127.0.0.1"),
+            port=int(publish_cfg.get("port", 7845)),
+            node_id=str(publish_cfg.get("node_id") or socket.gethostname()),
+            batch_interval=float(publish_cfg.get("batch_interval_ms", 1000)) / 1000,
+            batch_size=int(publish_cfg.get("batch_size", 32)),
+            max_buffer=int(publish_cfg.get("max_buffer", 1000)),
+            stats=stats,
+        )
+
+    @property
+    def connected(self) -> bool:
+        return self._socket is not None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="tick-publisher", daemon=True)
+        self._thread.start()
+
+    def stop(self, flush_timeout: float = 2.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=flush_timeout)
+        self._close()
+
+    def publish(self, snapshot: AnalysisSnapshot) -> None:
+        tick = encode_tick(snapshot)
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.dropped += 1
+                if self.stats is not None:
+                    self.stats.incr("publish_dropped")
+            self._buffer.append(tick)
+            pending = len(self._buffer)
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer)
+
+    def _run(self) -> None:
+        backoff = 0.5
+        while True:
+            self._wake.wait(self.batch_interval)
+            self._wake.clear()
+            stopping = self._stop.is_set()
+            while self.pending():
+                if self._socket is None and not self._connect():
+                    break
+                batch = self._take_batch()
+                try:
+                    self._socket.sendall(encode_batch(self.node_id, batch))
+                except OSError as exc:
+                    LOGGER.warning("Lost collector connection (%s)", exc)
+                    self._requeue(batch)
+                    self._close()
+                    break
+                self.sent += len(batch)
+                backoff = 0.5
+                if self.stats is not None:
+                    self.stats.incr("publish_sent", len(batch))
+            if self.stats is not None:
+                self.stats.set_gauge("publish_buffer", self.pending())
+            if stopping:
+                return
+            if self._socket is None and self.pending():
+                if self._stop.wait(backoff):
+                    return
+                backoff = min(self.max_backoff, backoff * 2)
+
+    def _connect(self) -> bool:
+        try:
+            self._socket = socket.create_connection((self.host, self.port), timeout=5)
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError as exc:
+            LOGGER.debug("Collector %s:%s unreachable (%s)", self.host, self.port, exc)
+            self._socket = None
+            return False
+        self.reconnects += 1
+        LOGGER.info("Connected to collector %s:%s", self.host, self.port)
+        return True
+
+    def _close(self) -> None:
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            finally:
+                self._socket = None
+
+    def _take_batch(self) -> List[List[Any]]:
+        with self._lock:
+            count = min(self.batch_size, len(self._buffer))
+            return [self._buffer.popleft() for _ in range(count)]
+
+    def _requeue(self, batch: List[List[Any]]) -> None:
+        with self._lock:
+            room = self._buffer.maxlen - len(self._buffer)
+            keep = batch[-room:] if room > 0 else []
+            self.dropped += len(batch) - len(keep)
+            self._buffer.extendleft(reversed(keep))
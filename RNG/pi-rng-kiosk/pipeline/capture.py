@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+
+from analysis.model import AnalysisSnapshot, DetectorState, EventCapture
+
+DEFAULT_CAPTURE_BITS = 16384
+
+
+def capture_spans(config: Dict) -> Tuple[int, int]:
+    """Pre- and post-trigger bits from ``storage.capture``.
+
+    Configs that predate the capture settings still carry ``storage.snapshot_bits``, which
+    used to be the tail written on every event; it becomes the pre-trigger span.
+    """
+    storage_cfg = config.get("storage", {})
+    capture_cfg = storage_cfg.get("capture", {})
+    pre_bits = capture_cfg.get("pre_bits", storage_cfg.get("snapshot_bits", DEFAULT_CAPTURE_BITS))
+    post_bits = capture_cfg.get("post_bits", DEFAULT_CAPTURE_BITS)
+    return max(0, int(pre_bits)), max(0, int(post_bits))
+
+
+def distribution_counts(bits: np.ndarray) -> Dict[str, int]:
+    """Bit and serial-pair counts behind the histogram and serial-matrix views."""
+    bits = np.asarray(bits, dtype=np.uint8)
+    ones = int(np.count_nonzero(bits))
+    pairs = np.bincount(2 * bits[:-1] + bits[1:], minlength=4) if len(bits) > 1 else [0] * 4
+    return {
+        "0": len(bits) - ones,
+        "1": ones,
+        "00": int(pairs[0]),
+        "01": int(pairs[1]),
+        "10": int(pairs[2]),
+        "11": int(pairs[3]),
+    }
+
+
+class TriggerCapture:
+    """Records the raw bits around each detector event, like a scope's trigger capture.
+
+    The analysis history already holds the most recent bits, so it doubles as the
+    pre-trigger ring and arming costs nothing. Once ``post_bits`` more bits have arrived
+    after the trigger, the span from ``pre_bits`` before it to ``post_bits`` after it is
+    copied out once. Triggers that fire while a capture is open fall inside it.
+    """
+
+    def __init__(self, pre_bits: int, post_bits: int) -> None:
+        self.pre_bits = pre_bits
+        self.post_bits = post_bits
+        self._state = DetectorState.CALM
+        self._trigger: Tuple[int, int, str, int] | None = None
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "TriggerCapture":
+        return cls(*capture_spans(config))
+
+    @property
+    def enabled(self) -> bool:
+        return self.pre_bits + self.post_bits > 0
+
+    def observe(self, snapshot: AnalysisSnapshot, total: int) -> None:
+        """Arm on the transition into *event*; ``total`` is the bit count it was computed at."""
+        entered = (
+            snapshot.detector_state == DetectorState.EVENT and self._state != DetectorState.EVENT
+        )
+        self._state = snapshot.detector_state
+        if entered and self.enabled and self._trigger is None:
+            pre_bits = min(self.pre_bits, total)
+            self._trigger = (total, pre_bits, snapshot.detector_reason, snapshot.timestamp_ms)
+
+    def collect(self, total: int, tail: Callable[[int], np.ndarray]) -> EventCapture | None:
+        """Return the finished capture once ``post_bits`` have followed the trigger.
+
+        ``tail(count)`` must return the newest ``count`` bits of the history as of ``total``.
+        """
+        if self._trigger is None:
+            return None
+        trigger_total, pre_bits, reason, trigger_ms = self._trigger
+        end = trigger_total + self.post_bits
+        if total < end:
+            return None
+        self._trigger = None
+        span = tail(total - (trigger_total - pre_bits))
+        # Bits the history already dropped shorten the pre-trigger side.
+        lost = total - (trigger_total - pre_bits) - len(span)
+        bits = np.array(span[: len(span) - (total - end)], dtype=np.uint8)
+        return EventCapture(
+            trigger_ms=trigger_ms,
+            reason=reason,
+            pre_bits=max(0, pre_bits - lost),
+            bits=bits,
+        )
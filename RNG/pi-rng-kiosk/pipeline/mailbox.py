@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import threading
+from collections import deque
+from typing import TYPE_CHECKING, Callable, Deque, List, Optional, Tuple
+
+from analysis.model import AnalysisSnapshot, DetectorState, EventCapture
+from diagnostics.stats import PipelineStats
+
+if TYPE_CHECKING:
+    from storage.writer import StorageWriter
+
+Item = Tuple[AnalysisSnapshot, Optional[EventCapture]]
+# A tick's GDI and whether it was an EVENT tick, as the plots draw it.
+Point = Tuple[float, bool]
+
+
+class SnapshotMailbox:
+    """Handoff from the analyzer to the UI thread and storage, in place of one queue.
+
+    Producers ``put`` snapshots as before. Every tick goes straight on to ``storage`` (a
+    ``StorageWriter``), which logs it on its own thread, so a stalled UI never costs the
+    log a tick. The UI only ever draws the newest snapshot, so a snapshot replaced before
+    it was taken is coalesced; the plots get every tick's GDI, up to the newest
+    ``max_points`` of them. ``notify`` is called once per batch, on the first put after a
+    ``take``, so a stalled consumer is woken once rather than once per tick.
+    """
+
+    def __init__(
+        self,
+        max_points: int = 256,
+        stats: Optional[PipelineStats] = None,
+        notify: Optional[Callable[[], None]] = None,
+        storage: Optional["StorageWriter"] = None,
+    ) -> None:
+        self.stats = stats
+        self.notify = notify
+        self.storage = storage
+        self.coalesced = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._points: Deque[Point] = deque(maxlen=max(1, max_points))
+        self._latest: Optional[AnalysisSnapshot] = None
+        self._notified = False
+
+    def put(self, item: Item) -> None:
+        if self.storage is not None:
+            self.storage.put(item)
+        snapshot, _ = item
+        with self._lock:
+            if self._latest is not None:
+                self.coalesced += 1
+                self._count("ui_coalesced")
+            if len(self._points) == self._points.maxlen:
+                self.dropped += 1
+                self._count("ui_points_dropped")
+            self._latest = snapshot
+            self._points.append(
+                (snapshot.combined.gdi, snapshot.detector_state == DetectorState.EVENT)
+            )
+            wake = not self._notified
+            self._notified = True
+        if wake and self.notify is not None:
+            self.notify()
+
+    def qsize(self) -> int:
+        return len(self._points)
+
+    def take(self) -> Tuple[List[Point], Optional[AnalysisSnapshot]]:
+        """Every pending plot point, oldest first, and the newest snapshot (None if none)."""
+        with self._lock:
+            points = list(self._points)
+            self._points.clear()
+            latest, self._latest = self._latest, None
+            self._notified = False
+        return points, latest
+
+    def _count(self, name: str) -> None:
+        if self.stats is not None:
+            self.stats.incr(name)
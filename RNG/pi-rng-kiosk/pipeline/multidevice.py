@@ -0,0 +1,363 @@
+from __future__ import annotations
+
+import copy
+import dataclasses
+import logging
+import multiprocessing as mp
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from queue import Empty, Queue
+from typing import Any, Deque, Dict, List, Tuple
+
+from analysis.combine import combine_device_stats
+from analysis.detector import Detector
+from analysis.model import AnalysisSnapshot, DeviceStatus, EventCapture
+from analysis.shadow import ShadowDetectorBank
+from diagnostics.profiler import TickProfiler
+from diagnostics.stats import PipelineStats, merge_snapshot
+from network.publisher import TickPublisher
+from pipeline.runner import PipelineRunner
+from pipeline.settings import (
+    apply_alert_settings,
+    clean_window_sizes,
+    detector_config_from,
+    fit_window_sizes,
+    history_capacity,
+    persist_config,
+)
+
+LOGGER = logging.getLogger("pi-rng-kiosk")
+
+_STATS_INTERVAL_S = 2.0
+
+
+def device_configs(config: Dict) -> List[Dict[str, Any]]:
+    source_cfg = config["source"]
+    devices = []
+    for index, entry in enumerate(source_cfg.get("devices") or []):
+        if isinstance(entry, str):
+            entry = {"primary": entry}
+        devices.append(
+            {
+                "name": str(entry.get("name") or f"rng{index}"),
+                "primary": entry.get("primary", source_cfg["primary"]),
+                "fallback": entry.get("fallback", source_cfg["fallback"]),
+                "read_bytes": int(entry.get("read_bytes", source_cfg["read_bytes"])),
+                "max_read_bytes": int(
+                    entry.get("max_read_bytes", source_cfg.get("max_read_bytes", 65536))
+                ),
+            }
+        )
+    return devices
+
+
+class _TaggedQueue:
+    """Adapts a device runner's snapshot queue onto the shared multiprocessing queue."""
+
+    def __init__(self, name: str, queue: Any) -> None:
+        self.name = name
+        self._queue = queue
+
+    def put(self, item: Tuple[AnalysisSnapshot, EventCapture | None]) -> None:
+        snapshot, capture = item
+        self._queue.put(("tick", self.name, snapshot, capture))
+
+    def qsize(self) -> int:
+        try:
+            return self._queue.qsize()
+        except NotImplementedError:
+            return 0
+
+
+def _device_main(
+    config: Dict,
+    config_path: str,
+    name: str,
+    out_queue: Any,
+    control_queue: Any,
+    stop_event: Any,
+    fake_seed: int | None,
+    inject_bias: float,
+    log_level: int,
+) -> None:
+    logging.basicConfig(
+        level=log_level,
+        format=f"%(asctime)s %(levelname)s %(name)s[{name}] :: %(message)s",
+    )
+    runner = PipelineRunner(
+        config=config,
+        config_path=Path(config_path),
+        snapshot_queue=_TaggedQueue(name, out_queue),
+        fake_seed=fake_seed,
+        inject_bias=inject_bias,
+    )
+    runner.start()
+    last_stats = time.monotonic()
+    try:
+        while not stop_event.is_set():
+            try:
+                payload = control_queue.get(timeout=0.2)
+            except Empty:
+                payload = None
+            if payload:
+                profile = payload.pop("profile", None)
+                if profile:
+                    runner.request_profile(profile["ticks"], profile.get("trace_alloc", False))
+                if payload:
+                    runner.enqueue_settings(payload)
+            now = time.monotonic()
+            if now - last_stats >= _STATS_INTERVAL_S:
+                last_stats = now
+                out_queue.put(("stats", name, runner.diagnostics()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runner.stop()
+
+
+class MultiDeviceRunner:
+    """Runs one PipelineRunner per configured device, each in its own process.
+
+    The parent keeps the latest snapshot from every device and, once per analysis interval,
+    combines them into a cross-device Stouffer GDI evaluated by its own Detector.
+    """
+
+    def __init__(
+        self,
+        config: Dict,
+        config_path: Path,
+        snapshot_queue: Queue,
+        fake_seed: int | None,
+        inject_bias: float,
+        stats: PipelineStats | None = None,
+        publisher: TickPublisher | None = None,
+    ) -> None:
+        self.config = config
+        self.config_path = config_path
+        self.snapshot_queue = snapshot_queue
+        self.fake_seed = fake_seed
+        self.inject_bias = inject_bias
+        self.devices = device_configs(config)
+        self.capacity = history_capacity(config)
+        diagnostics_cfg = config.get("diagnostics", {})
+        self.stats = stats or PipelineStats()
+        self.publisher = publisher
+        self.profiler = TickProfiler(Path(diagnostics_cfg.get("profile_dir", "data/profiles")))
+        self.detector = Detector(detector_config_from(config))
+        # Shadows judge the combined statistics, which is what drives the UI here.
+        self.shadows = ShadowDetectorBank.from_config(config, self.detector.config)
+        self._context = mp.get_context("spawn")
+        self._out_queue = self._context.Queue(maxsize=1024)
+        self._stop_event = self._context.Event()
+        self._stop_flag = threading.Event()
+        self._processes: Dict[str, Any] = {}
+        self._control_queues: Dict[str, Any] = {}
+        self._latest: Dict[str, Tuple[AnalysisSnapshot, float]] = {}
+        # Snapshots that arrived since the last aggregate, newest per device.
+        self._fresh: Dict[str, AnalysisSnapshot] = {}
+        self._captures: Deque[EventCapture] = deque()
+        self._device_diagnostics: Dict[str, Dict[str, Any]] = {}
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        log_level = logging.getLogger().getEffectiveLevel()
+        for index, device in enumerate(self.devices):
+            name = device["name"]
+            control_queue = self._context.Queue()
+            process = self._context.Process(
+                target=_device_main,
+                name=f"rng-device-{name}",
+                args=(
+                    self._device_config(device),
+                    str(self.config_path),
+                    name,
+                    self._out_queue,
+                    control_queue,
+                    self._stop_event,
+                    None if self.fake_seed is None else self.fake_seed + index,
+                    self.inject_bias,
+                    log_level,
+                ),
+                daemon=True,
+            )
+            process.start()
+            self._processes[name] = process
+            self._control_queues[name] = control_queue
+            LOGGER.info(
+                "Started device pipeline %s (%s) pid=%s", name, device["primary"], process.pid
+            )
+        if self.publisher is not None:
+            self.publisher.start()
+        self._thread = threading.Thread(target=self._collect_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_flag.set()
+        self._stop_event.set()
+        for process in self._processes.values():
+            process.join(timeout=3)
+            if process.is_alive():
+                process.terminate()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self.publisher is not None:
+            self.publisher.stop()
+
+    def enqueue_settings(self, payload: Dict) -> None:
+        device_payload = {key: value for key, value in payload.items() if key != "persist"}
+        windows_payload = payload.get("windows")
+        if windows_payload:
+            # Every device keeps the same history, so clamp once here for all of them.
+            cleaned = fit_window_sizes(clean_window_sizes(windows_payload), self.capacity)
+            if cleaned:
+                self.config["windows"]["sizes"] = cleaned
+                device_payload["windows"] = cleaned
+            else:
+                device_payload.pop("windows")
+        alert_payload = payload.get("alert") or {}
+        apply_alert_settings(self.detector.config, self.config, alert_payload)
+        if alert_payload and self.shadows is not None:
+            self.shadows.set_live(self.detector.config)
+        for control_queue in self._control_queues.values():
+            control_queue.put(dict(device_payload))
+        if payload.get("persist"):
+            persist_config(self.config, self.config_path)
+
+    def request_profile(self, ticks: int, trace_alloc: bool = False) -> bool:
+        for control_queue in self._control_queues.values():
+            control_queue.put({"profile": {"ticks": ticks, "trace_alloc": trace_alloc}})
+        return self.profiler.request(ticks, trace_alloc)
+
+    def diagnostics(self) -> Dict[str, Any]:
+        payload = self.stats.snapshot()
+        payload["profile"] = self.profiler.status()
+        if self.shadows is not None:
+            payload["shadow"] = self.shadows.summary()
+        for name, device_payload in sorted(self._device_diagnostics.items()):
+            merge_snapshot(payload, name, device_payload)
+        return payload
+
+    def _device_config(self, device: Dict[str, Any]) -> Dict:
+        device_config = copy.deepcopy(self.config)
+        device_config["alert"].pop("shadow", None)
+        device_config["source"] = {
+            "primary": device["primary"],
+            "fallback": device["fallback"],
+            "read_bytes": device["read_bytes"],
+            "max_read_bytes": device["max_read_bytes"],
+        }
+        device_config.setdefault("diagnostics", {})["profile_dir"] = str(
+            Path(self.config.get("diagnostics", {}).get("profile_dir", "data/profiles"))
+            / device["name"]
+        )
+        state_file = self.config.get("storage", {}).get("state_file")
+        if state_file:
+            path = Path(state_file)
+            device_config["storage"]["state_file"] = str(
+                path.with_name(f"{path.stem}.{device['name']}{path.suffix}")
+            )
+        entropy_cfg = self.config.get("entropy") or {}
+        if entropy_cfg.get("enabled"):
+            # Each device judges and serves its own bits.
+            path = Path(entropy_cfg.get("path", "data/entropy.sock"))
+            device_config["entropy"]["path"] = str(
+                path.with_name(f"{path.stem}.{device['name']}{path.suffix}")
+            )
+        return device_config
+
+    def _collect_loop(self) -> None:
+        interval = self.config["windows"]["analysis_interval_ms"] / 1000
+        last_emit = time.monotonic()
+        while not self._stop_flag.is_set():
+            try:
+                message = self._out_queue.get(timeout=0.1)
+            except Empty:
+                message = None
+            except (EOFError, OSError):
+                break
+            if message is not None:
+                kind, name = message[0], message[1]
+                if kind == "tick":
+                    _, _, snapshot, capture = message
+                    self._receive(name, snapshot, capture, time.monotonic())
+                elif kind == "stats":
+                    self._device_diagnostics[name] = message[2]
+            now = time.monotonic()
+            if not self._fresh or now - last_emit < interval:
+                continue
+            last_emit = now
+            with self.stats.time("aggregate"):
+                item = self._aggregate(now, stale_after=3 * interval)
+            if item is None:
+                continue
+            self.snapshot_queue.put(item)
+            if self.publisher is not None:
+                self.publisher.publish(item[0])
+            self.stats.incr("ticks")
+            self.stats.set_gauge("snapshot_queue_depth", self.snapshot_queue.qsize())
+            self.stats.set_gauge("devices_live", len(item[0].devices))
+            self.profiler.on_tick()
+
+    def _receive(
+        self, name: str, snapshot: AnalysisSnapshot, capture: EventCapture | None, now: float
+    ) -> None:
+        self._latest[name] = (snapshot, now)
+        self._fresh[name] = snapshot
+        if capture is not None:
+            self._captures.append(dataclasses.replace(capture, reason=f"{name}:{capture.reason}"))
+        self.stats.incr("device_ticks")
+
+    def _aggregate(
+        self, now: float, stale_after: float
+    ) -> Tuple[AnalysisSnapshot, EventCapture | None] | None:
+        # Each device snapshot is combined once, so a device that missed this round is
+        # listed but its evidence is not counted again; ``stale_after`` drops it from the
+        # list too.
+        fresh, self._fresh = self._fresh, {}
+        if not fresh:
+            return None
+        live = {
+            name: snapshot
+            for name, (snapshot, received) in self._latest.items()
+            if now - received <= stale_after
+        }
+        combined = combine_device_stats(
+            {name: snapshot.combined for name, snapshot in fresh.items()}
+        )
+        timestamp_ms = int(time.time() * 1000)
+        with self.stats.time("detect"):
+            state, reason = self.detector.evaluate(combined.gdi, combined.table.q)
+        shadow_events: List[Tuple[str, str]] = []
+        if self.shadows is not None:
+            with self.stats.time("shadow_detect"):
+                shadow_events = self.shadows.evaluate(
+                    combined.gdi, combined.table.q, timestamp_ms
+                )
+        devices = [
+            DeviceStatus(
+                name=name,
+                timestamp_ms=snapshot.timestamp_ms,
+                gdi=snapshot.combined.gdi,
+                state=snapshot.detector_state,
+                reason=snapshot.detector_reason,
+            )
+            for name, snapshot in sorted(live.items())
+        ]
+        # Show the bit distributions of the most deviant device; event captures come from
+        # the devices themselves, one per aggregated snapshot.
+        loudest = max(fresh.values(), key=lambda snapshot: abs(snapshot.combined.gdi))
+        snapshot = AnalysisSnapshot(
+            timestamp_ms=timestamp_ms,
+            combined=combined,
+            detector_state=state,
+            detector_reason=reason,
+            devices=devices,
+            bit_counts=loudest.bit_counts,
+            shadow_events=shadow_events,
+        )
+        capture = self._captures.popleft() if self._captures else None
+        return snapshot, capture
@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import multiprocessing as mp
+import threading
+import time
+from pathlib import Path
+from queue import Empty, Full, Queue
+from typing import Any, Dict
+
+from diagnostics.profiler import TickProfiler
+from diagnostics.stats import PipelineStats, merge_snapshot
+from network.publisher import TickPublisher
+from pipeline.ring import SharedBitRing
+from pipeline.runner import PipelineRunner
+from pipeline.settings import (
+    apply_alert_settings,
+    clean_window_sizes,
+    detector_config_from,
+    fit_window_sizes,
+    history_capacity,
+    persist_config,
+)
+from storage.state import StateFile
+
+LOGGER = logging.getLogger("pi-rng-kiosk")
+
+_STATS_INTERVAL_S = 2.0
+DEFAULT_MAX_BIT_RATE = 1 << 18
+
+
+def pipeline_mode(config: Dict) -> str:
+    mode = str(config.get("pipeline", {}).get("mode", "thread")).lower()
+    return mode if mode in ("thread", "process") else "thread"
+
+
+def _serve_child(
+    runner: PipelineRunner,
+    role: str,
+    control_queue: Any,
+    stats_queue: Any,
+    stop_event: Any,
+) -> None:
+    last_stats = time.monotonic()
+    while not stop_event.is_set():
+        payload = None
+        if control_queue is None:
+            time.sleep(0.2)
+        else:
+            with contextlib.suppress(Empty):
+                payload = control_queue.get(timeout=0.2)
+        if payload:
+            profile = payload.pop("profile", None)
+            if profile:
+                runner.request_profile(profile["ticks"], profile.get("trace_alloc", False))
+            if payload:
+                runner.enqueue_settings(payload)
+        now = time.monotonic()
+        if now - last_stats >= _STATS_INTERVAL_S:
+            last_stats = now
+            with contextlib.suppress(Full):
+                stats_queue.put_nowait((role, runner.diagnostics()))
+    runner.stop()
+
+
+def _reader_main(
+    config: Dict,
+    config_path: str,
+    ring_name: str,
+    stats_queue: Any,
+    stop_event: Any,
+    fake_seed: int | None,
+    inject_bias: float,
+    log_level: int,
+) -> None:
+    logging.basicConfig(
+        level=log_level, format="%(asctime)s %(levelname)s %(name)s[reader] :: %(message)s"
+    )
+    ring = SharedBitRing.attach(ring_name)
+    runner = PipelineRunner(
+        config=config,
+        config_path=Path(config_path),
+        snapshot_queue=Queue(),
+        fake_seed=fake_seed,
+        inject_bias=inject_bias,
+    )
+    server = threading.Thread(
+        target=_serve_child,
+        args=(runner, "reader", None, stats_queue, stop_event),
+        daemon=True,
+    )
+    server.start()
+    try:
+        pipeline_cfg = config.get("pipeline", {})
+        max_bit_rate = float(pipeline_cfg.get("max_bit_rate", DEFAULT_MAX_BIT_RATE))
+        asyncio.run(runner.run_ring_producer(ring, max_bit_rate))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ring.close()
+
+
+def _analysis_main(
+    config: Dict,
+    config_path: str,
+    ring_name: str,
+    out_queue: Any,
+    control_queue: Any,
+    stats_queue: Any,
+    stop_event: Any,
+    publish: bool,
+    restored_bits: int,
+    log_level: int,
+) -> None:
+    logging.basicConfig(
+        level=log_level, format="%(asctime)s %(levelname)s %(name)s[analysis] :: %(message)s"
+    )
+    ring = SharedBitRing.attach(ring_name)
+    stats = PipelineStats()
+    publisher = TickPublisher.from_config(config, stats) if publish else None
+    runner = PipelineRunner(
+        config=config,
+        config_path=Path(config_path),
+        snapshot_queue=out_queue,
+        fake_seed=None,
+        inject_bias=0.0,
+        stats=stats,
+        publisher=publisher,
+    )
+    if publisher is not None:
+        publisher.start()
+    server = threading.Thread(
+        target=_serve_child,
+        args=(runner, "analysis", control_queue, stats_queue, stop_event),
+        daemon=True,
+    )
+    server.start()
+    try:
+        runner.run_ring_analyzer(ring, stop_event, restored_bits)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if publisher is not None:
+            publisher.stop()
+        ring.close()
+
+
+class ProcessPipeline:
+    """Runs the bit reader and the analysis in two processes around a shared bit ring.
+
+    The reader process appends bits to a ``SharedBitRing``; the analysis process slices
+    its windows straight out of the ring and sends ``(snapshot, capture)`` pairs. Snapshots
+    carry bit counts rather than raw bits, and ``capture`` is None except for the one tick
+    that delivers the bits around an event. The UI process forwards the pairs as they are
+    onto ``snapshot_queue``.
+    """
+
+    def __init__(
+        self,
+        config: Dict,
+        config_path: Path,
+        snapshot_queue: Queue,
+        fake_seed: int | None,
+        inject_bias: float,
+        stats: PipelineStats | None = None,
+        publisher: TickPublisher | None = None,
+    ) -> None:
+        self.config = config
+        self.config_path = config_path
+        self.snapshot_queue = snapshot_queue
+        self.fake_seed = fake_seed
+        self.inject_bias = inject_bias
+        diagnostics_cfg = config.get("diagnostics", {})
+        self.stats = stats or PipelineStats()
+        # Ticks are published from the analysis process, which builds its own publisher
+        # from the same config; the instance passed in here is never started.
+        self.publisher = publisher
+        self.profiler = TickProfiler(Path(diagnostics_cfg.get("profile_dir", "data/profiles")))
+        self.capacity = history_capacity(config)
+        self._context = mp.get_context("spawn")
+        self._out_queue = self._context.Queue(maxsize=64)
+        self._stats_queue = self._context.Queue(maxsize=16)
+        self._control_queue = self._context.Queue()
+        self._stop_event = self._context.Event()
+        self._stop_flag = threading.Event()
+        self._ring: SharedBitRing | None = None
+        self._processes: Dict[str, Any] = {}
+        self._child_diagnostics: Dict[str, Dict[str, Any]] = {}
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self.config["windows"]["sizes"] = fit_window_sizes(
+            self.config["windows"]["sizes"], self.capacity
+        )
+        self._ring = SharedBitRing.create(self.capacity)
+        restored_bits = self._restore_ring()
+        log_level = logging.getLogger().getEffectiveLevel()
+        self._spawn(
+            "reader",
+            _reader_main,
+            (
+                self.config,
+                str(self.config_path),
+                self._ring.name,
+                self._stats_queue,
+                self._stop_event,
+                self.fake_seed,
+                self.inject_bias,
+                log_level,
+            ),
+        )
+        self._spawn(
+            "analysis",
+            _analysis_main,
+            (
+                self.config,
+                str(self.config_path),
+                self._ring.name,
+                self._out_queue,
+                self._control_queue,
+                self._stats_queue,
+                self._stop_event,
+                self.publisher is not None,
+                restored_bits,
+                log_level,
+            ),
+        )
+        self._thread = threading.Thread(target=self._forward_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_flag.set()
+        self._stop_event.set()
+        for process in self._processes.values():
+            process.join(timeout=3)
+            if process.is_alive():
+                process.terminate()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self._ring is not None:
+            self._ring.close()
+            self._ring = None
+
+    def enqueue_settings(self, payload: Dict) -> None:
+        child_payload = {key: value for key, value in payload.items() if key != "persist"}
+        windows_payload = payload.get("windows")
+        if windows_payload:
+            cleaned = fit_window_sizes(clean_window_sizes(windows_payload), self.capacity)
+            if cleaned:
+                self.config["windows"]["sizes"] = cleaned
+                child_payload["windows"] = cleaned
+            else:
+                child_payload.pop("windows")
+        apply_alert_settings(
+            detector_config_from(self.config), self.config, payload.get("alert") or {}
+        )
+        self._control_queue.put(child_payload)
+        if payload.get("persist"):
+            persist_config(self.config, self.config_path)
+
+    def request_profile(self, ticks: int, trace_alloc: bool = False) -> bool:
+        self._control_queue.put({"profile": {"ticks": ticks, "trace_alloc": trace_alloc}})
+        return self.profiler.request(ticks, trace_alloc)
+
+    def diagnostics(self) -> Dict[str, Any]:
+        self._drain_stats()
+        payload = self.stats.snapshot()
+        payload["profile"] = self.profiler.status()
+        for role, child_payload in sorted(self._child_diagnostics.items()):
+            merge_snapshot(payload, role, child_payload)
+        return payload
+
+    def _restore_ring(self) -> int:
+        # Refill the ring from the state file before the reader starts writing, so the
+        # analysis process begins on full windows after a restart.
+        state = StateFile.from_config(self.config, self.capacity)
+        if state is None:
+            return 0
+        loaded = state.load_pipeline()
+        state.close()
+        if loaded is None:
+            return 0
+        bits = loaded[0]
+        self._ring.write(bits)
+        LOGGER.info("Warm restart: restored %d bits into the ring", len(bits))
+        return len(bits)
+
+    def _spawn(self, role: str, target: Any, args: tuple) -> None:
+        process = self._context.Process(
+            target=target, name=f"rng-{role}", args=args, daemon=True
+        )
+        process.start()
+        self._processes[role] = process
+        LOGGER.info("Started %s process pid=%s", role, process.pid)
+
+    def _drain_stats(self) -> None:
+        while True:
+            try:
+                role, payload = self._stats_queue.get_nowait()
+            except (Empty, EOFError, OSError):
+                return
+            self._child_diagnostics[role] = payload
+
+    def _forward_loop(self) -> None:
+        while not self._stop_flag.is_set():
+            try:
+                item = self._out_queue.get(timeout=0.1)
+            except Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            self.snapshot_queue.put(item)
+            self.stats.incr("ticks")
+            self.stats.set_gauge("snapshot_queue_depth", self.snapshot_queue.qsize())
+            self.profiler.on_tick()
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from multiprocessing import shared_memory
+from typing import Dict, Sequence
+
+import numpy as np
+
+from rng_sources.health import HEALTH_TESTS
+
+_HEADER_BYTES = 64
+_HEALTH_SLOT = 2
+
+
+class SharedBitRing:
+    """Single-writer bit ring in shared memory that readers slice without copying.
+
+    The data area is mirrored: every bit is stored at ``p`` and ``p + capacity``, so the
+    most recent ``n <= capacity`` bits are always one contiguous slice ending at
+    ``total % capacity + capacity``. The header holds the capacity and the running total
+    of bits written; the writer publishes the new total only after both copies are in
+    place. It also carries one failure counter per source health test, so the writer can
+    raise an alarm in the reader's process.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool) -> None:
+        self._shm = shm
+        self._owner = owner
+        self._header = np.ndarray(
+            (_HEALTH_SLOT + len(HEALTH_TESTS),), dtype=np.uint64, buffer=shm.buf
+        )
+        self.capacity = int(self._header[1])
+        self._data = np.ndarray(
+            (2 * self.capacity,), dtype=np.uint8, buffer=shm.buf, offset=_HEADER_BYTES
+        )
+
+    @classmethod
+    def create(cls, capacity: int) -> "SharedBitRing":
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        shm = shared_memory.SharedMemory(create=True, size=_HEADER_BYTES + 2 * capacity)
+        header = np.ndarray((_HEALTH_SLOT + len(HEALTH_TESTS),), dtype=np.uint64, buffer=shm.buf)
+        header[:] = 0
+        header[1] = capacity
+        del header
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedBitRing":
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def total(self) -> int:
+        return int(self._header[0])
+
+    def record_health_failure(self, test: str) -> None:
+        self._header[_HEALTH_SLOT + HEALTH_TESTS.index(test)] += 1
+
+    def health_failures(self) -> Dict[str, int]:
+        counts = self._header[_HEALTH_SLOT:]
+        return {test: int(count) for test, count in zip(HEALTH_TESTS, counts, strict=True)}
+
+    def write(self, bits: np.ndarray) -> None:
+        count = len(bits)
+        if count == 0:
+            return
+        total = int(self._header[0])
+        if count > self.capacity:
+            total += count - self.capacity
+            bits = bits[-self.capacity :]
+            count = self.capacity
+        capacity = self.capacity
+        start = total % capacity
+        first = min(count, capacity - start)
+        self._data[start : start + first] = bits[:first]
+        self._data[start + capacity : start + capacity + first] = bits[:first]
+        rest = count - first
+        if rest:
+            self._data[:rest] = bits[first:]
+            self._data[capacity : capacity + rest] = bits[first:]
+        self._header[0] = total + count
+
+    def tail(self, count: int, total: int | None = None) -> np.ndarray:
+        """Return a read-only view of the ``count`` bits that precede ``total``."""
+        if total is None:
+            total = self.total
+        count = min(count, total, self.capacity)
+        end = total % self.capacity + self.capacity
+        view = self._data[end - count : end]
+        view.flags.writeable = False
+        return view
+
+    def windows(self, sizes: Sequence[int], total: int | None = None) -> Dict[int, np.ndarray]:
+        if total is None:
+            total = self.total
+        return {size: self.tail(size, total) for size in sizes if size <= min(total, self.capacity)}
+
+    def is_intact(self, total: int, count: int) -> bool:
+        """True if the ``count`` bits before ``total`` have not been overwritten since."""
+        return self.total - total <= self.capacity - min(count, self.capacity)
+
+    def close(self) -> None:
+        # Views into the buffer must be released before the mapping can be closed.
+        self._header = None
+        self._data = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
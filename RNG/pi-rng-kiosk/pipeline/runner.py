@@ -0,0 +1,634 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from queue import Empty, Queue
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+import numpy as np
+
+from analysis.bytes import ByteCounts, RollingByteCounts
+from analysis.combine import build_combined_stats
+from analysis.detector import Detector
+from analysis.model import AnalysisSnapshot, CombinedStats, DetectorState, EventCapture
+from analysis.shadow import ShadowDetectorBank
+from analysis.tests import SCAN_MIN_BITS, prepare_scan, run_all_tests
+from analysis.windows import RollingBitWindows
+from diagnostics.profiler import TickProfiler
+from diagnostics.stats import PipelineStats
+from network.entropy import EntropyOutput
+from network.publisher import TickPublisher
+from pipeline.capture import TriggerCapture, distribution_counts
+from pipeline.ring import SharedBitRing
+from pipeline.settings import (
+    apply_alert_settings,
+    clean_window_sizes,
+    detector_config_from,
+    fit_window_sizes,
+    history_capacity,
+    persist_config,
+)
+from rng_sources.bits import BiasInjector, unpack_bits
+from rng_sources.fake import FakeRNG
+from rng_sources.health import HEALTH_TESTS, HealthMonitor
+from rng_sources.hwrng import HardwareRNG
+from rng_sources.urandom import URandomSource
+from storage.state import StateFile
+
+LOGGER = logging.getLogger("pi-rng-kiosk")
+
+# The producer hands whole chunks to the analyzer; a few in flight is enough to keep both
+# sides busy without letting the analyzer fall far behind the source.
+_BIT_QUEUE_CHUNKS = 4
+# The ring analyzer polls for new bits this often so the fast tier sees them promptly.
+_RING_POLL_S = 0.02
+
+
+class PipelineRunner:
+    def __init__(
+        self,
+        config: Dict,
+        config_path: Path,
+        snapshot_queue: Queue,
+        fake_seed: int | None,
+        inject_bias: float,
+        stats: PipelineStats | None = None,
+        publisher: TickPublisher | None = None,
+        injector: BiasInjector | None = None,
+    ) -> None:
+        self.config = config
+        self.config_path = config_path
+        self.snapshot_queue = snapshot_queue
+        self.fake_seed = fake_seed
+        self.inject_bias = max(0.0, min(inject_bias, 0.5))
+        # The latency benchmark passes its own injector to time a bias onset.
+        self.injector = injector or BiasInjector(self.inject_bias)
+        self._stop_flag = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._settings_queue: Queue = Queue()
+        self.capacity = history_capacity(config)
+        self._current_windows = fit_window_sizes(list(config["windows"]["sizes"]), self.capacity)
+        self._scan_min_bits = int(config["windows"].get("scan_min_bits", SCAN_MIN_BITS))
+        diagnostics_cfg = config.get("diagnostics", {})
+        self.stats = stats or PipelineStats()
+        self.publisher = publisher
+        self.profiler = TickProfiler(Path(diagnostics_cfg.get("profile_dir", "data/profiles")))
+        self._log_interval = float(diagnostics_cfg.get("log_interval_s", 60))
+        self.detector = Detector(detector_config_from(config))
+        self.shadows = ShadowDetectorBank.from_config(config, self.detector.config)
+        self._ring: SharedBitRing | None = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        if self.publisher is not None:
+            self.publisher.start()
+        self._thread = threading.Thread(target=self._run_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop_flag.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self.publisher is not None:
+            self.publisher.stop()
+
+    def _run_loop(self) -> None:
+        try:
+            asyncio.run(self._async_loop())
+        except Exception:
+            LOGGER.exception("Pipeline crashed")
+
+    async def _async_loop(self) -> None:
+        bit_queue: asyncio.Queue[np.ndarray] = asyncio.Queue(maxsize=_BIT_QUEUE_CHUNKS)
+        producer = asyncio.create_task(self._producer_loop(bit_queue))
+        analyzer = asyncio.create_task(self._analyzer_loop(bit_queue))
+        await asyncio.wait(
+            [producer, analyzer],
+            return_when=asyncio.FIRST_EXCEPTION,
+        )
+        for task in (producer, analyzer):
+            if not task.done():
+                task.cancel()
+
+    async def _producer_loop(self, bit_queue: asyncio.Queue[np.ndarray]) -> None:
+        async for bits in self._bit_chunks():
+            with self.stats.time("enqueue"):
+                await bit_queue.put(bits)
+
+    async def run_ring_producer(self, ring: SharedBitRing, max_bit_rate: float = 0.0) -> None:
+        # Nothing downstream blocks the ring writer, so cap its rate instead of letting a
+        # fast source (or the fake PRNG) spin a core the analysis process needs.
+        self._ring = ring
+        started = time.monotonic()
+        written = 0
+        async for bits in self._bit_chunks():
+            with self.stats.time("ring_write"):
+                ring.write(bits)
+            written += len(bits)
+            if max_bit_rate > 0:
+                delay = started + written / max_bit_rate - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                elif delay < -1.0:
+                    started, written = time.monotonic(), 0
+
+    def _bit_chunks(self) -> AsyncIterator[np.ndarray]:
+        if self.fake_seed is not None:
+            return self._fake_chunks()
+        return self._source_chunks()
+
+    async def _fake_chunks(self) -> AsyncIterator[np.ndarray]:
+        fake = FakeRNG(
+            seed=self.fake_seed,
+            chunk_bits=self.config["windows"]["chunk_bits"],
+            bit_rate=float(self.config["source"].get("fake_bit_rate", 0)),
+        )
+        while not self._stop_flag.is_set():
+            bits = self.injector.apply(await fake.read_bits())
+            self.stats.mark("source_bits", len(bits))
+            yield bits
+
+    async def _source_chunks(self) -> AsyncIterator[np.ndarray]:
+        source_cfg = self.config["source"]
+        max_bytes = int(source_cfg.get("max_read_bytes", 65536))
+        source = HardwareRNG(
+            device=source_cfg["primary"],
+            chunk_bytes=source_cfg["read_bytes"],
+            max_bytes=max_bytes,
+        )
+        fallback = URandomSource(
+            device=source_cfg["fallback"],
+            chunk_bytes=source_cfg["read_bytes"],
+            max_bytes=max_bytes,
+        )
+        health = HealthMonitor.from_config(self.config)
+        chunk_bits = self.config["windows"]["chunk_bits"]
+        active = source
+        try:
+            while not self._stop_flag.is_set():
+                try:
+                    with self.stats.time("device_read"):
+                        chunk = await active.read_chunk()
+                except Exception as exc:
+                    self.stats.incr("read_errors")
+                    LOGGER.warning("RNG read failed (%s), switching to fallback", exc)
+                    if active is source:
+                        source.close()
+                        active = fallback
+                        continue
+                    await asyncio.sleep(0.5)
+                    continue
+                with self.stats.time("unpack"):
+                    bits = unpack_bits(chunk)
+                # The unpacked bits are a copy, so the reader can refill the buffer now.
+                active.release(chunk)
+                self.stats.set_gauge("device_read_bytes", active.read_size)
+                if health is not None:
+                    with self.stats.time("health"):
+                        failed = health.check(bits)
+                    if failed:
+                        # A failed chunk is never analyzed; the next read comes from the
+                        # fallback, with both tests restarted on the new source.
+                        self._report_health_failure(failed, active is source)
+                        if active is source:
+                            source.close()
+                            active = fallback
+                            health.reset()
+                        continue
+                biased = self.injector.apply(bits)
+                self.stats.mark("source_bits", len(biased))
+                # Reads can be far larger than an analysis chunk; slicing them keeps the
+                # fast tier and event captures at chunk granularity without copying.
+                for start in range(0, len(biased), chunk_bits):
+                    yield biased[start : start + chunk_bits]
+        finally:
+            source.close()
+            fallback.close()
+
+    def _report_health_failure(self, failed: List[str], on_primary: bool) -> None:
+        for test in failed:
+            self.stats.incr(f"health_{test}_failures")
+            if self._ring is not None:
+                self._ring.record_health_failure(test)
+        self.detector.trigger(f"health_{failed[0]}")
+        if on_primary:
+            LOGGER.warning("RNG health test failed (%s), switching to fallback", ", ".join(failed))
+        else:
+            LOGGER.error("Fallback RNG failed health test (%s)", ", ".join(failed))
+
+    def enqueue_settings(self, payload: Dict) -> None:
+        self._settings_queue.put(payload)
+
+    def request_profile(self, ticks: int, trace_alloc: bool = False) -> bool:
+        return self.profiler.request(ticks, trace_alloc)
+
+    def diagnostics(self) -> Dict[str, Any]:
+        payload = self.stats.snapshot()
+        payload["profile"] = self.profiler.status()
+        if self.shadows is not None:
+            payload["shadow"] = self.shadows.summary()
+        return payload
+
+    async def _analyzer_loop(self, bit_queue: asyncio.Queue[np.ndarray]) -> None:
+        loop = asyncio.get_running_loop()
+        tick_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rng-tick")
+        scan_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rng-scan")
+        scan_sizes, scan_ready = self._prepare_scan(scan_pool)
+        tick_sizes = scan_sizes
+        windows = RollingBitWindows(tick_sizes, self.capacity)
+        byte_windows = RollingByteCounts.from_config(self.config, tick_sizes, self.capacity)
+        state = StateFile.from_config(self.config, self.capacity)
+        restored = self._restore_state(state)
+        if restored is not None:
+            windows.add_bits(restored)
+            if byte_windows is not None:
+                byte_windows.add_bits(restored)
+        saved_total = windows.total
+        # Restored bits may already have been served before the restart.
+        released_total = windows.total
+        entropy = self._start_entropy()
+        capture = TriggerCapture.from_config(self.config)
+        interval = self.config["windows"]["analysis_interval_ms"] / 1000
+        last_emit = time.monotonic()
+        last_log = last_emit
+        if restored is not None:
+            last_emit -= interval
+        last_snapshot: AnalysisSnapshot | None = None
+        pending: asyncio.Future | None = None
+        pending_total = 0
+        pending_counts: Dict[str, int] = {}
+        finished: EventCapture | None = None
+        try:
+            while not self._stop_flag.is_set():
+                try:
+                    chunks = [await asyncio.wait_for(bit_queue.get(), timeout=0.1)]
+                    while True:
+                        try:
+                            chunks.append(bit_queue.get_nowait())
+                        except asyncio.QueueEmpty:
+                            break
+                    with self.stats.time("window_update"):
+                        fresh = np.concatenate(chunks)
+                        windows.add_bits(fresh)
+                    if byte_windows is not None:
+                        with self.stats.time("byte_update"):
+                            byte_windows.add_bits(fresh)
+                    provisional = self._fast_path(fresh, last_snapshot)
+                    if provisional is not None:
+                        capture.observe(provisional, windows.total)
+                        self.snapshot_queue.put((provisional, finished))
+                        finished = None
+                    finished = finished or capture.collect(windows.total, windows.tail)
+                except TimeoutError:
+                    pass
+
+                if pending is not None and pending.done():
+                    snapshot = self._finish_tick(pending.result(), pending_counts)
+                    pending = None
+                    last_snapshot = snapshot
+                    capture.observe(snapshot, pending_total)
+                    self.snapshot_queue.put((snapshot, finished))
+                    finished = None
+                    if self.publisher is not None:
+                        self.publisher.publish(snapshot)
+                    self.stats.incr("ticks")
+                    self.stats.set_gauge("snapshot_queue_depth", self.snapshot_queue.qsize())
+                    if state is not None:
+                        self._save_state(state, windows.tail(windows.total - saved_total))
+                        saved_total = windows.total
+                    if entropy is not None:
+                        bits = windows.tail(pending_total - released_total, pending_total)
+                        entropy.offer(bits, snapshot.detector_state == DetectorState.CALM)
+                        released_total = pending_total
+
+                if self._process_pending_settings():
+                    scan_sizes, scan_ready = self._prepare_scan(scan_pool)
+                if scan_sizes != tick_sizes and scan_ready.done():
+                    # Resized windows are cut from the retained history, so there is no
+                    # warm-up gap; the detector and the fast tier keep their state. Until
+                    # the scan is calibrated for them, ticks go on with the old sizes.
+                    tick_sizes = scan_sizes
+                    windows.resize(tick_sizes)
+                    if byte_windows is not None:
+                        byte_windows.resize(tick_sizes)
+
+                now = time.monotonic()
+                if self._log_interval > 0 and now - last_log >= self._log_interval:
+                    last_log = now
+                    LOGGER.info("Pipeline stats: %s", self.stats.format_summary())
+                # Only the first sizes have no calibrated ones to fall back on.
+                calibrating = scan_sizes == tick_sizes and not scan_ready.done()
+                if pending is not None or calibrating:
+                    continue
+                if now - last_emit < interval and not self.detector.pending_trigger:
+                    continue
+                if not windows.has_enough_data():
+                    last_emit = now
+                    continue
+                last_emit = now
+                self.stats.set_gauge("bit_queue_depth", bit_queue.qsize())
+                with self.stats.time("window_snapshot"):
+                    arrays = windows.as_arrays()
+                    byte_counts = byte_windows.snapshot() if byte_windows is not None else None
+                pending_total = windows.total
+                pending_counts = distribution_counts(windows.tail(capture.pre_bits))
+                pending = loop.run_in_executor(tick_pool, self._run_tick, arrays, byte_counts)
+        finally:
+            tick_pool.shutdown(wait=False, cancel_futures=True)
+            scan_pool.shutdown(wait=False, cancel_futures=True)
+            if state is not None:
+                state.close()
+            if entropy is not None:
+                entropy.stop()
+
+    def run_ring_analyzer(
+        self, ring: SharedBitRing, stop_event: Any, restored_bits: int = 0
+    ) -> None:
+        interval = self.config["windows"]["analysis_interval_ms"] / 1000
+        capture = TriggerCapture.from_config(self.config)
+        next_tick = time.monotonic() + interval
+        last_log = time.monotonic()
+        # The ring is new with each start, so failures the reader hit before this process
+        # attached still count.
+        health_seen = dict.fromkeys(HEALTH_TESTS, 0)
+        seen_total = ring.total
+        scan_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rng-scan")
+        scan_sizes, scan_ready = self._prepare_scan(scan_pool)
+        tick_sizes = scan_sizes
+        byte_windows = RollingByteCounts.from_config(self.config, tick_sizes, ring.capacity)
+        if byte_windows is not None:
+            byte_windows.add_bits(ring.tail(seen_total))
+        last_snapshot: AnalysisSnapshot | None = None
+        pending: Future | None = None
+        pending_total = 0
+        pending_counts: Dict[str, int] = {}
+        finished: EventCapture | None = None
+        # The parent restored the persisted bits into the ring before the reader started;
+        # only the detector state is left to restore here.
+        state = StateFile.from_config(self.config, ring.capacity)
+        self._restore_state(state)
+        saved_total = restored_bits
+        released_total = restored_bits
+        entropy = self._start_entropy()
+        if restored_bits:
+            next_tick = time.monotonic()
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="rng-tick") as tick_pool:
+            # Poll rather than block in stop_event.wait(): a waiter killed by a signal leaves
+            # a multiprocessing.Event unable to ever be set() again by the parent.
+            while not stop_event.is_set():
+                health = ring.health_failures()
+                if health != health_seen:
+                    failed = [test for test in health if health[test] > health_seen[test]]
+                    health_seen = health
+                    self.detector.trigger(f"health_{failed[0]}")
+                    next_tick = time.monotonic()
+                total = ring.total
+                if total > seen_total:
+                    fresh = ring.tail(total - seen_total, total)
+                    seen_total = total
+                    if byte_windows is not None:
+                        with self.stats.time("byte_update"):
+                            byte_windows.add_bits(fresh)
+                    provisional = self._fast_path(fresh, last_snapshot)
+                    if provisional is not None:
+                        capture.observe(provisional, total)
+                        self.snapshot_queue.put((provisional, finished))
+                        finished = None
+                    finished = finished or capture.collect(
+                        total, lambda count, end=total: ring.tail(count, end)
+                    )
+
+                if pending is not None and pending.done():
+                    combined = pending.result()
+                    pending = None
+                    if combined is None:
+                        self.stats.incr("torn_ticks")
+                        if entropy is not None:
+                            torn = ring.tail(pending_total - released_total, pending_total)
+                            entropy.offer(torn, False)
+                            released_total = pending_total
+                    else:
+                        snapshot = self._finish_tick(combined, pending_counts)
+                        last_snapshot = snapshot
+                        capture.observe(snapshot, pending_total)
+                        self.snapshot_queue.put((snapshot, finished))
+                        finished = None
+                        if self.publisher is not None:
+                            self.publisher.publish(snapshot)
+                        self.stats.incr("ticks")
+                        if state is not None:
+                            fresh = ring.tail(pending_total - saved_total, pending_total)
+                            self._save_state(state, fresh)
+                            saved_total = pending_total
+                        if entropy is not None:
+                            count = pending_total - released_total
+                            bits = np.array(ring.tail(count, pending_total))
+                            # Bits the reader overwrote during the copy are not the ones judged.
+                            calm = snapshot.detector_state == DetectorState.CALM
+                            entropy.offer(bits, calm and ring.is_intact(pending_total, len(bits)))
+                            released_total = pending_total
+
+                if self._process_pending_settings():
+                    scan_sizes, scan_ready = self._prepare_scan(scan_pool)
+                if scan_sizes != tick_sizes and scan_ready.done():
+                    # Until the scan is calibrated for resized windows, ticks go on with
+                    # the old sizes.
+                    tick_sizes = scan_sizes
+                    if byte_windows is not None:
+                        byte_windows.resize(tick_sizes)
+                # Only the first sizes have no calibrated ones to fall back on.
+                calibrating = scan_sizes == tick_sizes and not scan_ready.done()
+                if pending is not None or calibrating or next_tick > time.monotonic():
+                    time.sleep(_RING_POLL_S)
+                    continue
+                now = time.monotonic()
+                next_tick = max(next_tick + interval, now)
+                if self._log_interval > 0 and now - last_log >= self._log_interval:
+                    last_log = now
+                    LOGGER.info("Pipeline stats: %s", self.stats.format_summary())
+                sizes = [size for size in tick_sizes if size <= ring.capacity]
+                # The bits up to seen_total are the ones the byte counts have taken in.
+                total = seen_total
+                if not sizes or total < min(sizes):
+                    continue
+                self.stats.set_gauge("ring_fill", min(total, ring.capacity))
+                pending_total = total
+                pending_counts = distribution_counts(ring.tail(capture.pre_bits, total))
+                byte_counts = byte_windows.snapshot() if byte_windows is not None else None
+                pending = tick_pool.submit(self._run_ring_tick, ring, sizes, total, byte_counts)
+        scan_pool.shutdown(wait=False, cancel_futures=True)
+        if state is not None:
+            state.close()
+        if entropy is not None:
+            entropy.stop()
+
+    def _prepare_scan(self, pool: ThreadPoolExecutor) -> Tuple[List[int], Future]:
+        """The current window sizes and a future that completes once the scan's null
+        distribution is simulated for them, so no tick has to wait on it.
+        """
+        sizes = list(self._current_windows)
+        return sizes, pool.submit(prepare_scan, sizes, self._scan_min_bits)
+
+    def _start_entropy(self) -> EntropyOutput | None:
+        # Built by whichever loop analyzes, so the reader process never binds the output.
+        entropy = EntropyOutput.from_config(self.config, self.stats)
+        if entropy is None:
+            return None
+        try:
+            entropy.start()
+        except (OSError, ValueError) as exc:
+            LOGGER.warning("Entropy output unavailable (%s)", exc)
+            return None
+        return entropy
+
+    def _restore_state(self, state: StateFile | None) -> np.ndarray | None:
+        loaded = state.load_pipeline() if state is not None else None
+        if loaded is None:
+            return None
+        bits, detector_state = loaded
+        self.detector.restore_state(detector_state)
+        LOGGER.info(
+            "Warm restart: restored %d bits, detector %s", len(bits), detector_state["state"]
+        )
+        return bits
+
+    def _save_state(self, state: StateFile, fresh: np.ndarray) -> None:
+        with self.stats.time("state_save"):
+            state.append_bits(fresh)
+            state.save_detector(self.detector.export_state())
+
+    def _fast_path(
+        self, bits: np.ndarray, previous: AnalysisSnapshot | None
+    ) -> AnalysisSnapshot | None:
+        """Run the per-chunk tier; on an alert, return a provisional snapshot to publish.
+
+        The provisional snapshot repeats the last full tick's statistics with the new
+        detector state. Before the first full tick the alert is raised on the next one.
+        """
+        with self.stats.time("fast_path"):
+            alert = self.detector.evaluate_chunk(bits)
+        self.stats.set_gauge("page_cusum_level", self.detector.cusum_level)
+        if alert is None:
+            return None
+        state, reason = alert
+        self.stats.incr("fast_alerts")
+        if previous is None:
+            self.detector.trigger(reason)
+            return None
+        snapshot = dataclasses.replace(
+            previous,
+            timestamp_ms=int(time.time() * 1000),
+            detector_state=state,
+            detector_reason=reason,
+            shadow_events=[],
+        )
+        if self.publisher is not None:
+            self.publisher.publish(snapshot)
+        return snapshot
+
+    def _run_tick(
+        self,
+        arrays: Dict[int, np.ndarray],
+        byte_counts: Dict[int, ByteCounts] | None = None,
+    ) -> CombinedStats:
+        """Full tier: every test on every window.
+
+        Runs on a worker thread so the analyzer loop keeps feeding arriving chunks to the
+        fast tier meanwhile; the detector itself is only touched from the loop.
+        """
+        with self.stats.time("tick"):
+            table = run_all_tests(
+                arrays,
+                stats=self.stats,
+                byte_counts=byte_counts,
+                scan_min_bits=self._scan_min_bits,
+            )
+            with self.stats.time("combine"):
+                combined = build_combined_stats(table)
+        self.profiler.on_tick()
+        return combined
+
+    def _run_ring_tick(
+        self,
+        ring: SharedBitRing,
+        sizes: List[int],
+        total: int,
+        byte_counts: Dict[int, ByteCounts] | None = None,
+    ) -> CombinedStats | None:
+        with self.stats.time("window_snapshot"):
+            arrays = ring.windows(sizes, total)
+        combined = self._run_tick(arrays, byte_counts)
+        if not ring.is_intact(total, max(sizes)):
+            # The reader lapped the ring while the tests ran; drop the tick instead of
+            # publishing statistics computed over partially overwritten windows.
+            return None
+        return combined
+
+    def _finish_tick(
+        self, combined: CombinedStats, bit_counts: Dict[str, int]
+    ) -> AnalysisSnapshot:
+        timestamp_ms = int(time.time() * 1000)
+        with self.stats.time("detect"):
+            state, reason = self.detector.evaluate(combined.gdi, combined.table.q)
+        shadow_events: List[Tuple[str, str]] = []
+        if self.shadows is not None:
+            with self.stats.time("shadow_detect"):
+                shadow_events = self.shadows.evaluate(
+                    combined.gdi, combined.table.q, timestamp_ms
+                )
+        return AnalysisSnapshot(
+            timestamp_ms=timestamp_ms,
+            combined=combined,
+            detector_state=state,
+            detector_reason=reason,
+            bit_counts=bit_counts,
+            shadow_events=shadow_events,
+        )
+
+    def _process_pending_settings(self) -> bool:
+        updated = False
+        windows_changed = False
+        while True:
+            try:
+                payload = self._settings_queue.get_nowait()
+            except Empty:
+                break
+            windows_changed |= self._apply_settings_payload(payload)
+            updated = True
+        if updated:
+            LOGGER.info(
+                "Applied settings: windows=%s gdi=%.2f",
+                self._current_windows,
+                self.detector.config.gdi_threshold,
+            )
+        return windows_changed
+
+    def _apply_settings_payload(self, payload: Dict) -> bool:
+        alert_payload = payload.get("alert") or {}
+        windows_payload = payload.get("windows")
+        windows_changed = False
+
+        if windows_payload:
+            cleaned = fit_window_sizes(clean_window_sizes(windows_payload), self.capacity)
+            if cleaned:
+                self._current_windows = cleaned
+                self.config["windows"]["sizes"] = cleaned
+                windows_changed = True
+
+        apply_alert_settings(self.detector.config, self.config, alert_payload)
+        if alert_payload and self.shadows is not None:
+            self.shadows.set_live(self.detector.config)
+
+        if payload.get("persist"):
+            self._persist_config()
+
+        return windows_changed
+
+    def _persist_config(self) -> None:
+        persist_config(self.config, self.config_path)
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+import yaml
+
+from analysis.detector import DetectorConfig
+from pipeline.capture import capture_spans
+
+LOGGER = logging.getLogger("pi-rng-kiosk")
+
+DEFAULT_RING_BITS = 1 << 20
+
+
+def detector_config_from(config: Dict) -> DetectorConfig:
+    return DetectorConfig(
+        gdi_threshold=config["alert"]["gdi_z"],
+        sustained_threshold=config["alert"]["sustained_z"],
+        sustained_ticks=config["alert"]["sustained_ticks"],
+        fdr_q_threshold=config["alert"]["fdr_q"],
+        fast_z=config["alert"].get("fast_z", 6.0),
+        fast_span_bits=config["alert"].get("fast_span_bits", 65536),
+        cusum_bias=float(config["alert"].get("cusum_bias", 0.01)),
+        cusum_arl_bits=float(config["alert"].get("cusum_arl_bits", 1e12)),
+    )
+
+
+def history_capacity(config: Dict) -> int:
+    """Bits of history kept for the windows, which bounds any size set at runtime."""
+    ring_bits = int(config.get("pipeline", {}).get("ring_bits") or DEFAULT_RING_BITS)
+    largest = max(config["windows"]["sizes"] or [0])
+    return max(ring_bits, largest, sum(capture_spans(config)))
+
+
+def fit_window_sizes(sizes: List[int], capacity: int) -> List[int]:
+    fitted = [size for size in sizes if size <= capacity]
+    if len(fitted) != len(sizes):
+        LOGGER.warning(
+            "Dropping windows larger than the %d-bit history: %s",
+            capacity,
+            [size for size in sizes if size > capacity],
+        )
+    return fitted
+
+
+def clean_window_sizes(values: Iterable[Any]) -> List[int]:
+    cleaned: List[int] = []
+    for size in values:
+        try:
+            value = int(float(size))
+        except (TypeError, ValueError):
+            continue
+        if value > 0:
+            cleaned.append(value)
+    return cleaned
+
+
+def apply_alert_settings(
+    detector_config: DetectorConfig, config: Dict, alert_payload: Dict
+) -> None:
+    if "gdi_z" in alert_payload:
+        detector_config.gdi_threshold = safe_float(
+            alert_payload["gdi_z"], detector_config.gdi_threshold
+        )
+        config["alert"]["gdi_z"] = detector_config.gdi_threshold
+    if "sustained_z" in alert_payload:
+        detector_config.sustained_threshold = safe_float(
+            alert_payload["sustained_z"], detector_config.sustained_threshold
+        )
+        config["alert"]["sustained_z"] = detector_config.sustained_threshold
+    if "sustained_ticks" in alert_payload:
+        detector_config.sustained_ticks = safe_int(
+            alert_payload["sustained_ticks"], detector_config.sustained_ticks
+        )
+        config["alert"]["sustained_ticks"] = detector_config.sustained_ticks
+    if "fdr_q" in alert_payload:
+        detector_config.fdr_q_threshold = safe_float(
+            alert_payload["fdr_q"], detector_config.fdr_q_threshold
+        )
+        config["alert"]["fdr_q"] = detector_config.fdr_q_threshold
+    if "fast_z" in alert_payload:
+        detector_config.fast_z = safe_float(alert_payload["fast_z"], detector_config.fast_z)
+        config["alert"]["fast_z"] = detector_config.fast_z
+
+
+def persist_config(config: Dict, path: Path) -> None:
+    try:
+        with path.open("w", encoding="utf-8") as handle:
+            yaml.safe_dump(config, handle, sort_keys=False)
+    except Exception:
+        LOGGER.exception("Failed to persist config overrides")
+
+
+def safe_float(value: Any, default: float) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def safe_int(value: Any, default: int) -> int:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return default
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+import numpy as np
+
+BIAS_KINDS = ("flip", "p1", "corr")
+
+
+def unpack_bits(data: bytes) -> np.ndarray:
+    """Unpack bytes least-significant bit first, as the devices emit them."""
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8), bitorder="little")
+
+
+class BiasInjector:
+    """Distorts a bit stream from stream position ``onset`` on, carrying state across chunks.
+
+    ``flip`` (what ``--inject-bias`` does) flips every ``1 / bias``-th bit. ``p1`` sets
+    each bit to 1 with probability ``2 * bias``, so P(1) = 0.5 + bias. ``corr`` repeats the
+    previous output bit with probability ``2 * bias``, so P(repeat) = 0.5 + bias. These are
+    the calibration tool's bias models. ``onset_time`` is the monotonic time at which the
+    chunk holding the onset bit passed through ``apply``.
+    """
+
+    def __init__(
+        self, bias: float = 0.0, kind: str = "flip", onset: int = 0, seed: Optional[int] = None
+    ) -> None:
+        if kind not in BIAS_KINDS:
+            raise ValueError(f"unknown bias kind {kind!r}")
+        bias = max(0.0, min(bias, 0.5))
+        self.kind = kind
+        self.bias = bias
+        self.flip_every = int(1 / bias) if bias > 0 else 0
+        self.onset = max(0, onset)
+        self.onset_time: Optional[float] = None
+        self._generator = np.random.default_rng(seed)
+        self._position = 0
+        self._previous = 0
+
+    @property
+    def active(self) -> bool:
+        return self.bias > 0
+
+    def apply(self, bits: np.ndarray) -> np.ndarray:
+        if not self.active:
+            return bits
+        skip = min(len(bits), max(0, self.onset - self._position))
+        self._position += len(bits)
+        if skip == len(bits):
+            if len(bits):
+                self._previous = int(bits[-1])
+            return bits
+        if self.onset_time is None:
+            self.onset_time = time.monotonic()
+        mutated = np.array(bits, dtype=np.uint8)
+        tail = mutated[skip:]
+        if self.kind == "flip":
+            # Flip the bits whose 1-based stream position is a multiple of flip_every.
+            first = -(self._position - len(tail) + 1) % self.flip_every
+            tail[first :: self.flip_every] ^= 1
+        elif self.kind == "p1":
+            tail[self._generator.random(len(tail)) < 2 * self.bias] = 1
+        else:
+            previous = self._previous if skip == 0 else int(mutated[skip - 1])
+            repeat = self._generator.random(len(tail)) < 2 * self.bias
+            # Each repeated bit takes the value of the last bit that was not repeated.
+            sources = np.where(repeat, -1, np.arange(len(tail)))
+            sources = np.maximum.accumulate(sources)
+            tail[:] = np.where(sources >= 0, tail[np.maximum(sources, 0)], previous)
+        self._previous = int(mutated[-1])
+        return mutated
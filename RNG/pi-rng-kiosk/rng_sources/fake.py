@@ -1,31 +1,49 @@
 from __future__ import annotations
 
 import asyncio
-import random
-from typing import List
+import time
+
+import numpy as np
+
+from .bits import BiasInjector, unpack_bits
 
 
 class FakeRNG:
-    """Deterministic RNG for demos and tests."""
+    """Deterministic RNG for demos, tests, and load generation.
+
+    Chunks are drawn as packed bytes from a seeded NumPy generator and unpacked in one
+    call, so a single core produces far more than hardware rate. ``bit_rate`` (bits per
+    second, 0 for unlimited) paces ``read_bits`` to mimic a real device.
+    """
 
-    def __init__(self, seed: int | None = None, chunk_bits: int = 4096) -> None:
-        self.random = random.Random(seed)
+    def __init__(
+        self,
+        seed: int | None = None,
+        chunk_bits: int = 4096,
+        bias: float = 0.0,
+        bit_rate: float = 0.0,
+    ) -> None:
+        self.generator = np.random.default_rng(seed)
         self.chunk_bits = chunk_bits
+        self.bit_rate = max(0.0, bit_rate)
+        self._bias = BiasInjector(bias)
+        self._next_due = 0.0
 
-    async def pump_bits(self, queue: "asyncio.Queue[int]", stop_flag, bias: float = 0.0) -> None:
-        flip_every = int(1 / bias) if bias > 0 else 0
-        counter = 0
+    async def pump_bits(self, queue: "asyncio.Queue[np.ndarray]", stop_flag) -> None:
         while not stop_flag.is_set():
-            bits = self._generate_bits()
-            if bias > 0:
-                for idx in range(len(bits)):
-                    counter += 1
-                    if flip_every and counter % flip_every == 0:
-                        bits[idx] ^= 1
-            for bit in bits:
-                await queue.put(bit)
-            await asyncio.sleep(0)
+            await queue.put(await self.read_bits())
 
-    def _generate_bits(self) -> List[int]:
-        return [self.random.randint(0, 1) for _ in range(self.chunk_bits)]
+    async def read_bits(self) -> np.ndarray:
+        if self.bit_rate > 0:
+            now = time.monotonic()
+            if self._next_due > now:
+                await asyncio.sleep(self._next_due - now)
+            self._next_due = max(self._next_due, now) + self.chunk_bits / self.bit_rate
+        else:
+            await asyncio.sleep(0)
+        return self.next_chunk()
 
+    def next_chunk(self) -> np.ndarray:
+        packed = self.generator.bytes((self.chunk_bits + 7) // 8)
+        bits = unpack_bits(packed)[: self.chunk_bits]
+        return self._bias.apply(bits)
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import BinaryIO
+
+import numpy as np
+
+# Aim for reads that take about this long at the measured device rate.
+_TARGET_READ_S = 0.05
+_RATE_SMOOTHING = 0.2
+_POLL_S = 0.2
+
+
+class DeviceReader:
+    """Reads a character device on its own thread into a pool of preallocated buffers.
+
+    ``read_chunk`` hands back a view of the next filled buffer without copying it. Pass the
+    view to ``release`` once it has been unpacked so the thread can fill it again. Only
+    ``buffers`` reads are ever in flight, so a stalled consumer blocks the thread rather
+    than growing a queue. Reads start at ``chunk_bytes``. The size then follows the
+    measured device rate, aiming for about 50 ms per read, and doubles while the consumer
+    has half the pool waiting. It stays a power of two no larger than ``max_bytes``.
+    """
+
+    label = "device"
+
+    def __init__(
+        self,
+        device: str,
+        chunk_bytes: int = 4096,
+        max_bytes: int = 65536,
+        buffers: int = 4,
+    ) -> None:
+        self.device = Path(device)
+        self.chunk_bytes = max(1, chunk_bytes)
+        self.max_bytes = max(self.chunk_bytes, max_bytes)
+        self.read_size = self.chunk_bytes
+        self.rate = 0.0
+        self._pool = [np.empty(self.max_bytes, dtype=np.uint8) for _ in range(max(2, buffers))]
+        self._free: queue.Queue[np.ndarray] = queue.Queue()
+        self._filled: asyncio.Queue[tuple[np.ndarray, int] | Exception] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def open(self) -> BinaryIO:
+        return self.device.open("rb", buffering=0)
+
+    def close(self) -> None:
+        self._stop.set()
+
+    async def read_chunk(self) -> np.ndarray:
+        """The next filled buffer as a uint8 view; raises if the device failed."""
+        if self._thread is None:
+            self._start()
+        item = await self._filled.get()
+        if isinstance(item, Exception):
+            # The thread has exited; the next call opens the device again.
+            self._thread = None
+            raise item
+        buffer, count = item
+        return buffer[:count]
+
+    def release(self, chunk: np.ndarray) -> None:
+        self._free.put(chunk.base)
+
+    def _start(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._filled = asyncio.Queue()
+        self._free = queue.Queue()
+        self._stop.clear()
+        for buffer in self._pool:
+            self._free.put(buffer)
+        self._thread = threading.Thread(
+            target=self._read_loop, name=f"rng-reader-{self.device.name}", daemon=True
+        )
+        self._thread.start()
+
+    def _deliver(self, item: tuple[np.ndarray, int] | Exception) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._filled.put_nowait, item)
+        except RuntimeError:
+            # The event loop closed under us; nobody is left to read.
+            self._stop.set()
+
+    def _read_loop(self) -> None:
+        try:
+            handle = self.open()
+        except Exception as exc:
+            self._deliver(exc)
+            return
+        try:
+            while not self._stop.is_set():
+                try:
+                    buffer = self._free.get(timeout=_POLL_S)
+                except queue.Empty:
+                    continue
+                started = time.perf_counter()
+                count = handle.readinto(memoryview(buffer)[: self.read_size])
+                if not count:
+                    raise RuntimeError(f"No data from {self.label}")
+                self._adapt(count, time.perf_counter() - started, self._filled.qsize())
+                self._deliver((buffer, count))
+        except Exception as exc:
+            self._deliver(exc)
+        finally:
+            handle.close()
+
+    def _adapt(self, count: int, elapsed: float, waiting: int) -> None:
+        rate = count / max(elapsed, 1e-6)
+        self.rate = rate if not self.rate else self.rate + _RATE_SMOOTHING * (rate - self.rate)
+        size = self.rate * _TARGET_READ_S
+        if waiting >= len(self._pool) // 2:
+            # The consumer is behind: fewer, larger handoffs cost it less per byte.
+            size = max(size, 2 * self.read_size)
+        size = int(size)
+        if size > 0:
+            size = 1 << (size.bit_length() - 1)
+        self.read_size = min(self.max_bytes, max(self.chunk_bytes, size))
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+LOGGER = logging.getLogger("pi-rng-kiosk")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    start_ms INTEGER NOT NULL,
+    end_ms INTEGER NOT NULL,
+    peak_gdi REAL NOT NULL,
+    reason TEXT NOT NULL,
+    ticks INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_start ON events (start_ms);
+CREATE INDEX IF NOT EXISTS events_reason ON events (reason, start_ms);
+CREATE INDEX IF NOT EXISTS events_peak ON events (peak_gdi);
+"""
+
+_ORDERS = {"recent": "start_ms DESC", "peak": "peak_gdi DESC"}
+
+
+@dataclass(slots=True)
+class EventRecord:
+    id: int
+    start_ms: int
+    end_ms: int
+    peak_gdi: float
+    reason: str
+    ticks: int
+
+    def as_row(self) -> Tuple[int, int, int, float, str, int]:
+        return self.id, self.start_ms, self.end_ms, self.peak_gdi, self.reason, self.ticks
+
+
+class EventStore:
+    """Detector events in an embedded SQLite database, one row per run of EVENT ticks.
+
+    Consecutive EVENT snapshots extend the open event's end, peak GDI and tick count;
+    the reason is the one that opened it. ``record`` updates the open event in memory;
+    changed rows are written in one transaction at most every ``flush_interval_s`` and
+    before any query, in WAL mode so a commit is a sequential append. Indexes on start
+    time, reason and peak GDI keep ``page`` and ``count`` as fast after months of events
+    as after one.
+    """
+
+    def __init__(self, path: Path | str = ":memory:", flush_interval_s: float = 1.0) -> None:
+        self.path = path
+        self.flush_interval_s = flush_interval_s
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # The storage writer records while the UI thread pages, so every call takes the lock.
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        last_id = self._db.execute("SELECT MAX(id) FROM events").fetchone()[0]
+        self._next_id = (last_id or 0) + 1
+        self._open: EventRecord | None = None
+        self._dirty: Dict[int, EventRecord] = {}
+        self._last_flush = time.monotonic()
+        # Bumped whenever the event list changes, so a view can skip unchanged redraws.
+        self.version = 0
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "EventStore":
+        path = config.get("storage", {}).get("event_db")
+        if not path:
+            return cls()
+        try:
+            return cls(Path(path))
+        except sqlite3.Error as exc:
+            LOGGER.warning(
+                "Event database %s unavailable (%s); keeping events in memory", path, exc
+            )
+            return cls()
+
+    def record(self, timestamp_ms: int, gdi: float, is_event: bool, reason: str) -> None:
+        with self._lock:
+            if not is_event:
+                self._open = None
+            elif self._open is None:
+                self._open = EventRecord(self._next_id, timestamp_ms, timestamp_ms, gdi, reason, 1)
+                self._next_id += 1
+            else:
+                self._open.end_ms = timestamp_ms
+                self._open.peak_gdi = max(self._open.peak_gdi, gdi)
+                self._open.ticks += 1
+            if is_event:
+                self._dirty[self._open.id] = self._open
+                self.version += 1
+            self.flush()
+
+    def flush(self, force: bool = False) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            now = time.monotonic()
+            if not force and now - self._last_flush < self.flush_interval_s:
+                return
+            self._last_flush = now
+            rows = [record.as_row() for record in self._dirty.values()]
+            self._dirty.clear()
+            with self._db:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?)", rows
+                )
+
+    def page(
+        self,
+        offset: int = 0,
+        limit: int = 50,
+        reason: Optional[str] = None,
+        min_peak: Optional[float] = None,
+        order: str = "recent",
+    ) -> List[EventRecord]:
+        """Events in ``order`` ("recent" or "peak"), optionally filtered."""
+        where, params = self._filter(reason, min_peak)
+        with self._lock:
+            self.flush(force=True)
+            rows = self._db.execute(
+                f"SELECT * FROM events{where} ORDER BY {_ORDERS[order]} LIMIT ? OFFSET ?",
+                (*params, limit, offset),
+            ).fetchall()
+        return [EventRecord(*row) for row in rows]
+
+    def count(self, reason: Optional[str] = None, min_peak: Optional[float] = None) -> int:
+        where, params = self._filter(reason, min_peak)
+        with self._lock:
+            self.flush(force=True)
+            return self._db.execute(f"SELECT COUNT(*) FROM events{where}", params).fetchone()[0]
+
+    @staticmethod
+    def _filter(reason: Optional[str], min_peak: Optional[float]) -> Tuple[str, tuple]:
+        clauses, params = [], []
+        if reason is not None:
+            clauses.append("reason = ?")
+            params.append(reason)
+        if min_peak is not None:
+            clauses.append("peak_gdi >= ?")
+            params.append(min_peak)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), tuple(params)
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush(force=True)
+            self._db.close()
@@ -1,17 +1,22 @@
 from __future__ import annotations
 
+import csv
+import shutil
+import threading
 from collections import deque
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Deque, List, Sequence, Tuple
-
-import csv
-import shutil
+from typing import TYPE_CHECKING, Deque, List, Optional, Tuple
 
 import numpy as np
 
-from analysis.model import AnalysisSnapshot, DetectorState
+from analysis.model import AnalysisSnapshot, DetectorState, EventCapture
+from storage.events import EventStore
+
+if TYPE_CHECKING:
+    from diagnostics.stats import PipelineStats
+    from storage.state import StateFile
 
 
 @dataclass(slots=True)
@@ -27,23 +32,60 @@ class MetricsStore:
         self,
         maxlen: int,
         snapshot_dir: Path,
-        snapshot_bits: int,
         csv_path: Path | None = None,
         export_snapshot_count: int | None = None,
+        stats: Optional["PipelineStats"] = None,
+        state: Optional["StateFile"] = None,
+        events: Optional[EventStore] = None,
+        shadow_csv_path: Path | None = None,
     ) -> None:
         self.history: Deque[MetricRecord] = deque(maxlen=maxlen)
-        self.events: List[MetricRecord] = []
+        self.events = events or EventStore()
         self.snapshot_dir = snapshot_dir
-        self.snapshot_bits = snapshot_bits
         self.snapshot_dir.mkdir(parents=True, exist_ok=True)
         self.csv_path = csv_path
         self.export_snapshot_count = export_snapshot_count
+        self.stats = stats
+        self.state = state
+        # Ticks are logged on the storage writer's thread and exported from the UI thread.
+        self._lock = threading.Lock()
+        if state is not None:
+            self._restore(state)
         if self.csv_path:
             self.csv_path.parent.mkdir(parents=True, exist_ok=True)
             if not self.csv_path.exists():
                 self._write_csv_header()
+        # Would-be events of the shadow detector configs, one row per event.
+        self.shadow_csv_path = shadow_csv_path
+        if self.shadow_csv_path and not self.shadow_csv_path.exists():
+            self.shadow_csv_path.parent.mkdir(parents=True, exist_ok=True)
+            with self.shadow_csv_path.open("w", newline="", encoding="utf-8") as handle:
+                csv.writer(handle).writerow(
+                    ["timestamp_ms", "timestamp_iso", "config", "reason", "gdi", "live_state"]
+                )
+
+    def add(self, snapshot: AnalysisSnapshot, capture: EventCapture | None = None) -> None:
+        self.add_many([(snapshot, capture)])
 
-    def add(self, snapshot: AnalysisSnapshot, bits: Sequence[int]) -> None:
+    def add_many(self, items: List[Tuple[AnalysisSnapshot, EventCapture | None]]) -> None:
+        """Record a batch of ticks, oldest first, appending all their CSV rows at once."""
+        rows: List[List[object]] = []
+        shadow_rows: List[List[object]] = []
+        with self._lock:
+            for snapshot, capture in items:
+                self._record(snapshot, capture)
+                rows.extend(self._csv_rows(snapshot))
+                shadow_rows.extend(self._shadow_rows(snapshot))
+            if self.stats is None:
+                self._write_rows(rows)
+            else:
+                with self.stats.time("csv_log"):
+                    self._write_rows(rows)
+            if self.shadow_csv_path and shadow_rows:
+                with self.shadow_csv_path.open("a", newline="", encoding="utf-8") as handle:
+                    csv.writer(handle).writerows(shadow_rows)
+
+    def _record(self, snapshot: AnalysisSnapshot, capture: EventCapture | None) -> None:
         record = MetricRecord(
             timestamp_ms=snapshot.timestamp_ms,
             gdi=snapshot.combined.gdi,
@@ -51,17 +93,26 @@ class MetricsStore:
             reason=snapshot.detector_reason,
         )
         self.history.append(record)
-        if snapshot.detector_state == DetectorState.EVENT:
-            self.events.append(record)
-            self._persist_bits(snapshot.timestamp_ms, bits)
-        self._log_snapshot(snapshot)
+        self.events.record(
+            record.timestamp_ms, record.gdi, record.state == DetectorState.EVENT, record.reason
+        )
+        if capture is not None:
+            self._persist_capture(capture)
+        if self.state is not None:
+            self.state.append_record(
+                (record.timestamp_ms, record.gdi, record.state.value, record.reason)
+            )
 
-    def _persist_bits(self, timestamp_ms: int, bits: Sequence[int]) -> None:
-        if self.snapshot_bits <= 0:
-            return
-        sample = np.array(bits[-self.snapshot_bits :], dtype=np.uint8)
-        target = self.snapshot_dir / f"snapshot_{timestamp_ms}.npy"
-        np.save(target, sample)
+    def _restore(self, state: "StateFile") -> None:
+        self.history.extend(
+            MetricRecord(timestamp, gdi, DetectorState(value), reason)
+            for timestamp, gdi, value, reason in state.load_history()
+        )
+
+    def _persist_capture(self, capture: EventCapture) -> None:
+        # The file name records where the trigger sits within the saved bits.
+        target = self.snapshot_dir / f"snapshot_{capture.trigger_ms}_pre{capture.pre_bits}.npy"
+        np.save(target, capture.bits)
 
     def _write_csv_header(self) -> None:
         if not self.csv_path:
@@ -83,30 +134,27 @@ class MetricsStore:
                 ]
             )
 
-    def _log_snapshot(self, snapshot: AnalysisSnapshot) -> None:
+    def _csv_rows(self, snapshot: AnalysisSnapshot) -> List[List[object]]:
         if not self.csv_path:
-            return
+            return []
         timestamp = snapshot.timestamp_ms
         iso = datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc).isoformat()
         rows: List[List[object]] = []
-        for summary in snapshot.combined.window_summaries:
-            for result in summary.tests:
-                key = result.key
-                q_value = summary.q_values.get(key, snapshot.combined.q_values.get(key, 1.0))
-                rows.append(
-                    [
-                        timestamp,
-                        iso,
-                        summary.window,
-                        result.name,
-                        result.z_score,
-                        result.p_value,
-                        q_value,
-                        snapshot.combined.gdi,
-                        snapshot.detector_state.value,
-                        snapshot.detector_reason,
-                    ]
-                )
+        for window, name, z_score, p_value, q_value in snapshot.combined.table.rows():
+            rows.append(
+                [
+                    timestamp,
+                    iso,
+                    window,
+                    name,
+                    z_score,
+                    p_value,
+                    q_value,
+                    snapshot.combined.gdi,
+                    snapshot.detector_state.value,
+                    snapshot.detector_reason,
+                ]
+            )
         if not rows:
             rows.append(
                 [
@@ -122,11 +170,28 @@ class MetricsStore:
                     snapshot.detector_reason,
                 ]
             )
+        return rows
+
+    def _shadow_rows(self, snapshot: AnalysisSnapshot) -> List[List[object]]:
+        if not self.shadow_csv_path or not snapshot.shadow_events:
+            return []
+        timestamp = snapshot.timestamp_ms
+        iso = datetime.fromtimestamp(timestamp / 1000, tz=timezone.utc).isoformat()
+        return [
+            [timestamp, iso, label, reason, snapshot.combined.gdi, snapshot.detector_state.value]
+            for label, reason in snapshot.shadow_events
+        ]
+
+    def _write_rows(self, rows: List[List[object]]) -> None:
+        if not self.csv_path or not rows:
+            return
         with self.csv_path.open("a", newline="", encoding="utf-8") as handle:
             writer = csv.writer(handle)
             writer.writerows(rows)
 
-    def export_to_usb(self, mount_path: Path, snapshot_count: int | None = None) -> Tuple[bool, str]:
+    def export_to_usb(
+        self, mount_path: Path, snapshot_count: int | None = None
+    ) -> Tuple[bool, str]:
         if not mount_path.exists():
             return False, f"Mount point {mount_path} not found"
         timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%SZ")
@@ -137,9 +202,11 @@ class MetricsStore:
             return False, f"Failed to create export folder: {exc}"
 
         files_copied = 0
-        if self.csv_path and self.csv_path.exists():
-            shutil.copy2(self.csv_path, export_root / self.csv_path.name)
-            files_copied += 1
+        with self._lock:
+            for path in (self.csv_path, self.shadow_csv_path):
+                if path and path.exists():
+                    shutil.copy2(path, export_root / path.name)
+                    files_copied += 1
 
         snapshot_files = sorted(self.snapshot_dir.glob("snapshot_*.npy"))
         count = snapshot_count or self.export_snapshot_count
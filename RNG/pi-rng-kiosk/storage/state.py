@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+LOGGER = logging.getLogger("pi-rng-kiosk")
+
+_MAGIC = b"RNGSTATE"
+_VERSION = 2
+_HEADER_BYTES = 256
+
+_HEADER = np.dtype(
+    [
+        ("magic", "S8"),
+        ("version", "<u4"),
+        ("history_len", "<u4"),
+        ("bit_bytes", "<u8"),
+        ("pipeline_ms", "<u8"),
+        ("bytes_written", "<u8"),
+        ("detector_state", "S8"),
+        ("sustain_counter", "<i8"),
+        ("cusum_up", "<f8"),
+        ("cusum_down", "<f8"),
+        ("metrics_ms", "<u8"),
+        ("history_written", "<u8"),
+    ]
+)
+
+RECORD = np.dtype([("t", "<i8"), ("gdi", "<f8"), ("state", "S8"), ("reason", "S24")])
+# (timestamp_ms, gdi, state, reason), as stored in RECORD.
+Record = Tuple[int, float, str, str]
+
+
+def _now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def _ordered(ring: np.ndarray, written: int) -> np.ndarray:
+    slots = len(ring)
+    if written <= slots:
+        return ring[:written]
+    start = written % slots
+    return np.concatenate([ring[start:], ring[:start]])
+
+
+class StateFile:
+    """Memory-mapped pipeline and UI state that lets the kiosk warm-restart after a reboot.
+
+    The file holds two rings behind a fixed header: the bit history packed eight to a
+    byte and the recent GDI records behind the sparkline (events live in the event
+    database, see ``storage/events.py``). The pipeline
+    writes the bits and the detector state once per tick; the UI appends a record per
+    snapshot. Every write is a few small in-place copies into the mapping, and the kernel
+    takes care of writing the dirty pages back. Sections last written more than
+    ``max_age_s`` ago are not restored.
+    """
+
+    def __init__(self, path: Path, history_bits: int, history_len: int, max_age_s: float) -> None:
+        self.path = path
+        self.max_age_s = max_age_s
+        bit_bytes = (history_bits + 7) // 8
+        size = _HEADER_BYTES + bit_bytes + history_len * RECORD.itemsize
+        self._map = self._open(path, size, bit_bytes, history_len)
+        self._header = self._map[: _HEADER.itemsize].view(_HEADER)[0:1]
+        offset = _HEADER_BYTES
+        self._bits = self._map[offset : offset + bit_bytes]
+        offset += bit_bytes
+        self._history = self._map[offset:].view(RECORD)
+        self._carry = np.empty(0, dtype=np.uint8)
+
+    @classmethod
+    def from_config(cls, config: Dict, history_bits: int) -> Optional["StateFile"]:
+        storage_cfg = config.get("storage", {})
+        path = storage_cfg.get("state_file")
+        if not path:
+            return None
+        try:
+            return cls(
+                Path(path),
+                history_bits=history_bits,
+                history_len=int(config["windows"]["history_length"]),
+                max_age_s=float(storage_cfg.get("state_max_age_s", 600)),
+            )
+        except OSError as exc:
+            LOGGER.warning("State file %s unavailable (%s); starting cold", path, exc)
+            return None
+
+    @staticmethod
+    def _open(path: Path, size: int, bit_bytes: int, history_len: int) -> np.memmap:
+        if path.exists() and path.stat().st_size == size:
+            mapping = np.memmap(path, dtype=np.uint8, mode="r+", shape=(size,))
+            header = mapping[: _HEADER.itemsize].view(_HEADER)[0]
+            if (
+                header["magic"] == _MAGIC
+                and header["version"] == _VERSION
+                and header["bit_bytes"] == bit_bytes
+                and header["history_len"] == history_len
+            ):
+                return mapping
+            del mapping
+        path.parent.mkdir(parents=True, exist_ok=True)
+        mapping = np.memmap(path, dtype=np.uint8, mode="w+", shape=(size,))
+        header = mapping[: _HEADER.itemsize].view(_HEADER)
+        header["magic"] = _MAGIC
+        header["version"] = _VERSION
+        header["bit_bytes"] = bit_bytes
+        header["history_len"] = history_len
+        return mapping
+
+    def _fresh(self, field: str) -> bool:
+        stamp = int(self._header[field][0])
+        return stamp > 0 and _now_ms() - stamp <= self.max_age_s * 1000
+
+    def append_bits(self, bits: np.ndarray) -> None:
+        """Append bits to the packed ring; a tail of up to seven bits waits for the next call."""
+        if len(self._carry):
+            bits = np.concatenate([self._carry, bits])
+        whole = len(bits) // 8 * 8
+        self._carry = np.array(bits[whole:], dtype=np.uint8)
+        packed = np.packbits(bits[:whole])[-len(self._bits) :]
+        capacity = len(self._bits)
+        written = int(self._header["bytes_written"][0])
+        start = written % capacity
+        first = min(len(packed), capacity - start)
+        self._bits[start : start + first] = packed[:first]
+        self._bits[: len(packed) - first] = packed[first:]
+        self._header["bytes_written"] = written + len(packed)
+
+    def save_detector(self, state: Dict[str, Any]) -> None:
+        self._header["detector_state"] = str(state["state"]).encode()
+        self._header["sustain_counter"] = state["sustain_counter"]
+        self._header["cusum_up"] = state["cusum_up"]
+        self._header["cusum_down"] = state["cusum_down"]
+        self._header["pipeline_ms"] = _now_ms()
+
+    def load_pipeline(self) -> Tuple[np.ndarray, Dict[str, Any]] | None:
+        """Persisted bits (oldest first) and detector state, or None if missing or stale."""
+        if not self._fresh("pipeline_ms"):
+            return None
+        packed = _ordered(self._bits, int(self._header["bytes_written"][0]))
+        detector = {
+            "state": self._header["detector_state"][0].decode(),
+            "sustain_counter": int(self._header["sustain_counter"][0]),
+            "cusum_up": float(self._header["cusum_up"][0]),
+            "cusum_down": float(self._header["cusum_down"][0]),
+        }
+        return np.unpackbits(packed), detector
+
+    def append_record(self, record: Record) -> None:
+        written = int(self._header["history_written"][0])
+        self._history[written % len(self._history)] = record
+        self._header["history_written"] = written + 1
+        self._header["metrics_ms"] = _now_ms()
+
+    def load_history(self) -> List[Record]:
+        """Persisted sparkline records (oldest first); empty if stale."""
+        if not self._fresh("metrics_ms"):
+            return []
+        history = _ordered(self._history, int(self._header["history_written"][0]))
+        return [self._unpack(row) for row in history]
+
+    @staticmethod
+    def _unpack(row: np.void) -> Record:
+        return int(row["t"]), float(row["gdi"]), row["state"].decode(), row["reason"].decode()
+
+    def close(self) -> None:
+        self._map.flush()
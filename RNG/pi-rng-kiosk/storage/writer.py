@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import logging
+import threading
+from queue import Empty, SimpleQueue
+from typing import Callable, List, Optional, Tuple
+
+from analysis.model import AnalysisSnapshot, EventCapture
+from diagnostics.stats import PipelineStats
+from storage.metrics import MetricsStore
+
+LOGGER = logging.getLogger("pi-rng-kiosk")
+
+Item = Tuple[AnalysisSnapshot, Optional[EventCapture]]
+
+
+class StorageWriter:
+    """Logs every tick to a ``MetricsStore`` on its own thread, off the UI thread.
+
+    ``put`` never blocks and never drops: the queue is unbounded, so a UI that stalls
+    costs the CSV log and the state ring nothing, and a slow disk only grows the backlog
+    (``storage_queue_depth`` in the diagnostics). Each wake-up hands everything queued to
+    ``add_many`` as one batch and then calls ``notify``. ``stop`` writes what is left.
+    """
+
+    def __init__(
+        self,
+        metrics: MetricsStore,
+        stats: Optional[PipelineStats] = None,
+        notify: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.metrics = metrics
+        self.stats = stats
+        self.notify = notify
+        self.written = 0
+        self._queue: SimpleQueue[Optional[Item]] = SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="storage-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def put(self, item: Item) -> None:
+        self._queue.put(item)
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self) -> None:
+        while True:
+            batch: List[Optional[Item]] = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except Empty:
+                    break
+            items = [item for item in batch if item is not None]
+            if items:
+                self._write(items)
+            if len(items) < len(batch):
+                return
+
+    def _write(self, items: List[Item]) -> None:
+        try:
+            self.metrics.add_many(items)
+        except Exception:
+            LOGGER.exception("Failed to log %d ticks", len(items))
+            if self.stats is not None:
+                self.stats.incr("storage_errors")
+            return
+        self.written += len(items)
+        if self.stats is not None:
+            self.stats.set_gauge("storage_queue_depth", self.qsize())
+        if self.notify is not None:
+            self.notify()
@@ -3,11 +3,38 @@ from __future__ import annotations
 from pathlib import Path
 
 import numpy as np
+import pytest
+from scipy import stats
 
-from analysis.combine import build_combined_stats
+from analysis.bytes import RollingByteCounts, count_bytes
+from analysis.calibration import (
+    BiasModel,
+    ThresholdSet,
+    combine_ticks,
+    run_calibration,
+    tick_statistics,
+)
+from analysis.combine import build_combined_stats, combine_device_stats
+from analysis.context import TickContext
 from analysis.detector import Detector, DetectorConfig
-from analysis.tests import run_all_tests
-
+from analysis.fast import PageCusum
+from analysis.model import DetectorState
+from analysis.shadow import ShadowDetectorBank, shadow_configs
+from analysis.tests import (
+    BYTE_TEST_NAMES,
+    TEST_NAMES,
+    TESTS,
+    _scan_null,
+    berlekamp_massey_lengths,
+    maurer_universal_test,
+    prepare_scan,
+    run_all_tests,
+    scan_lengths,
+    scan_p_value,
+    scan_peaks,
+    scan_test,
+)
+from analysis.windows import RollingBitWindows
 
 FIXTURE_DIR = Path(__file__).parent / "fixtures"
 
@@ -15,26 +42,351 @@ FIXTURE_DIR = Path(__file__).parent / "fixtures"
 def test_monobit_flags_biased_stream():
     bits = np.load(FIXTURE_DIR / "biased_bits.npy")
     window = len(bits)
-    summaries = run_all_tests({window: bits})
-    monobit = next(result for result in summaries[window].tests if result.name == "monobit")
-    assert monobit.p_value < 0.05
+    table = run_all_tests({window: bits})
+    assert table.p[0, table.names.index("monobit")] < 0.05
 
 
 def test_combiner_acknowledges_unbiased_stream():
     bits = np.load(FIXTURE_DIR / "unbiased_bits.npy")
     window = len(bits)
-    summaries = run_all_tests({window: bits})
-    combined = build_combined_stats(summaries)
+    combined = build_combined_stats(run_all_tests({window: bits}))
     assert abs(combined.gdi) < 3
 
 
 def test_detector_state_machine():
-    detector = Detector(DetectorConfig(gdi_threshold=3.0, sustained_threshold=2.0, sustained_ticks=2))
-    state, reason = detector.evaluate(0.5, {})
+    detector = Detector(
+        DetectorConfig(gdi_threshold=3.0, sustained_threshold=2.0, sustained_ticks=2)
+    )
+    quiet = np.array([[0.5, np.nan], [0.2, 0.9]])
+    state, reason = detector.evaluate(0.5, quiet)
     assert state.value == "calm"
-    state, reason = detector.evaluate(3.5, {})
+    state, reason = detector.evaluate(3.5, quiet)
     assert state.value == "event"
-    state, reason = detector.evaluate(1.0, {})
+    state, reason = detector.evaluate(1.0, quiet)
     assert state.value == "recover"
-    state, reason = detector.evaluate(0.1, {})
+    state, reason = detector.evaluate(0.1, quiet)
     assert state.value == "calm"
+    state, reason = detector.evaluate(0.1, np.array([[0.001, np.nan], [0.004, 0.9]]))
+    assert (state.value, reason) == ("event", "fdr_cluster")
+
+
+def test_fast_tier_raises_provisional_event_within_one_chunk():
+    detector = Detector(DetectorConfig(fast_z=6.0, fast_span_bits=32768))
+    generator = np.random.default_rng(9)
+    for _ in range(20):
+        assert detector.evaluate_chunk(generator.integers(0, 2, 4096, dtype=np.uint8)) is None
+
+    # p(1) = 0.6 puts a single 4096-bit chunk about 12.8 sigma off balance.
+    strong = (generator.random(4096) < 0.6).astype(np.uint8)
+    state, reason = detector.evaluate_chunk(strong)
+    assert (state.value, reason) == ("event", "fast_chunk")
+    assert detector.evaluate_chunk(strong) is None
+    assert detector.evaluate(0.0, np.ones(4))[0].value == "recover"
+    assert detector.evaluate(0.0, np.ones(4))[0].value == "calm"
+
+    # p(1) = 0.53 stays under the cutoff per chunk (~3.8 sigma) but not over the 32 K span.
+    detector = Detector(DetectorConfig(fast_z=6.0, fast_span_bits=32768))
+    alerts = [
+        detector.evaluate_chunk((generator.random(4096) < 0.53).astype(np.uint8))
+        for _ in range(8)
+    ]
+    assert [alert[1] for alert in alerts if alert] == ["fast_span"]
+
+
+def test_page_cusum_matches_per_bit_recursion_across_chunks():
+    generator = np.random.default_rng(4)
+    bits = generator.integers(0, 2, 20_000, dtype=np.uint8)
+    cusum = PageCusum(0.01, 1e12)
+    cusum.threshold = 1.0
+    fired = [
+        cusum.update(bits[start : start + 1000]) is not None
+        for start in range(0, 20_000, 1000)
+    ]
+
+    up = down = 0.0
+    expected = []
+    for start in range(0, 20_000, 1000):
+        alarmed = False
+        for bit in bits[start : start + 1000]:
+            up = max(0.0, up + (np.log(1.02) if bit else np.log(0.98)))
+            down = max(0.0, down + (np.log(0.98) if bit else np.log(1.02)))
+            if up >= 1.0:
+                up, alarmed = 0.0, True
+            if down >= 1.0:
+                down, alarmed = 0.0, True
+        expected.append(alarmed)
+    assert fired == expected and any(fired)
+    assert np.isclose(cusum.up, up) and np.isclose(cusum.down, down)
+
+
+def test_detector_cusum_alarms_on_small_persistent_bias():
+    detector = Detector(DetectorConfig(fast_z=0))
+    generator = np.random.default_rng(2)
+    for _ in range(50):
+        assert detector.evaluate_chunk(generator.integers(0, 2, 4096, dtype=np.uint8)) is None
+    alert, chunks = None, 0
+    while not alert and chunks < 99:
+        alert = detector.evaluate_chunk((generator.random(4096) < 0.51).astype(np.uint8))
+        chunks += 1
+    assert alert[1] == "page_cusum_up"
+    assert chunks * 4096 < 250_000
+
+
+def test_rolling_windows_resize_from_retained_history():
+    stream = np.random.default_rng(6).integers(0, 2, 50_000, dtype=np.uint8)
+    windows = RollingBitWindows([100, 1000], capacity=8000)
+    for start in range(0, len(stream), 777):
+        windows.add_bits(stream[start : start + 777])
+    arrays = windows.as_arrays()
+    np.testing.assert_array_equal(arrays[1000], stream[-1000:])
+    np.testing.assert_array_equal(arrays[100], stream[-100:])
+
+    windows.resize([500, 8000])
+    assert windows.has_enough_data()
+    arrays = windows.as_arrays()
+    assert sorted(arrays) == [500, 8000]
+    np.testing.assert_array_equal(arrays[8000], stream[-8000:])
+    with pytest.raises(ValueError):
+        windows.resize([16000])
+
+
+def test_combine_device_stats_prefixes_tests_and_stouffers_gdi():
+    unbiased = np.load(FIXTURE_DIR / "unbiased_bits.npy")
+    biased = np.load(FIXTURE_DIR / "biased_bits.npy")
+    per_device = {
+        "usb0": build_combined_stats(run_all_tests({len(unbiased): unbiased})),
+        "usb1": build_combined_stats(run_all_tests({len(biased): biased})),
+    }
+    combined = combine_device_stats(per_device)
+    expected = (per_device["usb0"].gdi + per_device["usb1"].gdi) / np.sqrt(2)
+    assert combined.gdi == pytest.approx(expected)
+    keys = combined.table.keys()
+    assert any(key.startswith("usb0:monobit@") for key in keys)
+    assert any(key.startswith("usb1:monobit@") for key in keys)
+    assert np.isfinite(combined.table.q[combined.table.valid]).all()
+
+
+def test_vectorized_tick_statistics_match_live_tests():
+    bits = np.random.default_rng(4).integers(0, 2, size=392_000, dtype=np.uint8)
+    # Large enough for every test, with overlapping windows.
+    windows = [256, 1024, 4096, 100_000, 388_000]
+    ends = np.arange(388_000, 392_001, 1000)
+    keys, z_scores, p_values = tick_statistics(bits, ends, windows, scan_min_bits=512, byte_lag=3)
+    assert {f"{name}@388000" for name in TEST_NAMES + BYTE_TEST_NAMES} <= set(keys)
+    gdi, q_values = combine_ticks(z_scores, p_values)
+    for row, end in enumerate(ends):
+        tables = run_all_tests(
+            {w: bits[end - w : end] for w in windows},
+            byte_counts={
+                w: count_bytes(np.packbits(bits[end - w : end], bitorder="little"), 3)
+                for w in windows
+            },
+            scan_min_bits=512,
+        )
+        combined = build_combined_stats(tables)
+        table = combined.table
+        assert table.keys() == keys
+        np.testing.assert_allclose(z_scores[row], table.z[table.valid], atol=1e-9)
+        np.testing.assert_allclose(p_values[row], table.p[table.valid], atol=1e-9)
+        np.testing.assert_allclose(q_values[row], table.q[table.valid])
+        assert gdi[row] == pytest.approx(combined.gdi)
+
+
+def test_calibration_reports_false_alarms_and_detection_delay():
+    thresholds = [ThresholdSet(gdi_z=3.0, sustained_z=2.5, sustained_ticks=5, fdr_q=0.01)]
+    model = BiasModel.parse("p1:0.1")
+    rows = run_calibration(
+        [256, 1024],
+        thresholds,
+        [model],
+        hours=0.05,
+        interval_s=0.5,
+        bits_per_tick=512,
+        trials=4,
+        max_delay_s=5,
+        seed=3,
+    )
+    row = rows[0]
+    assert row.hours == pytest.approx(0.05)
+    assert row.false_alarms >= 0
+    assert row.detection_rate(model.label) == 1.0
+    assert row.delay_percentile(model.label, 0.5) <= 2.0
+
+
+def _scalar_linear_complexity(sequence):
+    n = len(sequence)
+    connection, previous = [1] + [0] * n, [1] + [0] * n
+    length, last = 0, -1
+    for index in range(n):
+        discrepancy = sequence[index]
+        for j in range(1, length + 1):
+            discrepancy ^= connection[j] & sequence[index - j]
+        if discrepancy:
+            saved = connection[:]
+            for j in range(n - index + last):
+                connection[j + index - last] ^= previous[j]
+            if 2 * length <= index:
+                length, last, previous = index + 1 - length, index, saved
+    return length
+
+
+def test_shared_tick_context_matches_each_window_on_its_own():
+    bits = np.random.default_rng(6).integers(0, 2, size=12_000, dtype=np.uint8)
+    shared = TickContext(bits)
+    for window in (300, 1024, 12_000):
+        alone = TickContext(bits[-window:])
+        for func in TESTS:
+            assert func(shared, window) == func(alone, window), func.__name__
+        # Cyclic counts include the patterns that wrap from the window's end to its start.
+        tail = bits[-window:]
+        padded = np.concatenate([tail, tail[:2]])
+        expected = np.bincount(4 * padded[:-2] + 2 * padded[1:-1] + padded[2:], minlength=8)
+        assert shared.pattern_counts(window, 3, cyclic=True).tolist() == expected.tolist()
+        assert shared.walk_of(window).tolist() == np.cumsum(2 * tail.astype(int) - 1).tolist()
+
+    # A window that is not a suffix of the longest gets a context of its own.
+    table = run_all_tests({1024: bits[:1024], 12_000: bits})
+    alone = run_all_tests({1024: bits[:1024]})
+    np.testing.assert_array_equal(table.z[0], alone.z[0])
+
+
+def test_packed_berlekamp_massey_matches_scalar_reference():
+    blocks = np.random.default_rng(0).integers(0, 2, size=(12, 500), dtype=np.uint8)
+    blocks[0] = 0
+    blocks[1] = np.tile([1, 0, 1], 167)[:500]
+    expected = [_scalar_linear_complexity(row.tolist()) for row in blocks]
+    assert berlekamp_massey_lengths(blocks).tolist() == expected
+
+
+def test_nist_tests_run_on_large_window_and_flag_bias():
+    rng = np.random.default_rng(8)
+    fair = rng.integers(0, 2, size=100_000, dtype=np.uint8)
+    table = run_all_tests({100_000: fair})
+    names = {table.names[column] for column in table.cells()[1]}
+    assert {"block_freq", "longest_run", "template", "lin_complexity"} <= names
+    # Maurer's test starts where NIST's table does.
+    assert "universal" not in names
+    assert maurer_universal_test(TickContext(rng.integers(0, 2, 387_840, dtype=np.uint8)), 387_840)
+
+    biased = run_all_tests({100_000: (rng.random(100_000) < 0.53).astype(np.uint8)})
+    p_values = dict(zip(biased.names, biased.p[0], strict=True))
+    assert p_values["block_freq"] < 1e-6
+    assert p_values["longest_run"] < 1e-6
+
+
+def test_rolling_byte_counts_match_a_recount_and_flag_repeated_bytes():
+    rng = np.random.default_rng(9)
+    counts = RollingByteCounts([1024, 80_000], capacity=160_000, lag=4)
+    stream = []
+    # Odd-sized chunks leave partial bytes behind; some are larger than a whole window.
+    for size in (5, 3, 4000, 90_000, 12_345, 7, 200_000, 1_000):
+        bits = rng.integers(0, 2, size=size, dtype=np.uint8)
+        stream.append(bits)
+        counts.add_bits(bits)
+        data = np.packbits(np.concatenate(stream), bitorder="little")
+        if len(np.concatenate(stream)) % 8:
+            data = data[:-1]
+        for window, current in counts.snapshot().items():
+            expected = count_bytes(data[-(window // 8) :], 4)
+            assert current.histogram.tolist() == expected.histogram.tolist()
+            assert current.products == expected.products
+    counts.resize([2048, 160_000])
+    expected = count_bytes(data[-20_000:], 4)
+    assert counts.snapshot()[160_000].products == expected.products
+
+    # One byte in twenty repeats the one before: invisible to pair and run counts of bits,
+    # strongly correlated as bytes.
+    data = rng.integers(0, 256, size=12_500, dtype=np.uint8)
+    repeat = np.flatnonzero(rng.random(len(data) - 1) < 0.05) + 1
+    data[repeat] = data[repeat - 1]
+    bits = np.unpackbits(data, bitorder="little")
+    counts = RollingByteCounts([100_000], lag=4)
+    counts.add_bits(bits)
+    table = run_all_tests({100_000: bits}, byte_counts=counts.snapshot())
+    p_values = dict(zip(table.names, table.p[0], strict=True))
+    assert p_values["byte_serial"] < 1e-6
+    assert p_values["byte_lag"] > 1e-3
+    # Without byte counts the byte columns stay empty.
+    plain = run_all_tests({100_000: bits})
+    assert not plain.valid[0, [plain.names.index(name) for name in BYTE_TEST_NAMES]].any()
+
+
+def test_scan_finds_a_burst_between_window_sizes():
+    assert scan_lengths(10_000, 1024) == [1024, 2048, 4096, 8192, 10_000]
+    rng = np.random.default_rng(10)
+    fair = rng.integers(0, 2, size=100_000, dtype=np.uint8)
+    z_score, p_value = scan_test(TickContext(fair), 100_000)
+    assert 1e-3 < p_value < 1 - 1e-6
+    assert scan_test(TickContext(fair), 1024) is None
+
+    # 3,000 bits at P(1) = 0.56, well inside the 100 K window and too short for 10 K.
+    bursty = fair.copy()
+    bursty[60_000:63_000] = rng.random(3_000) < 0.56
+    table = run_all_tests({10_000: bursty[-10_000:], 100_000: bursty})
+    p_values = dict(zip(table.names, table.p[1], strict=True))
+    assert p_values["scan"] < 1e-6
+    assert p_values["monobit"] > 0.01
+    # A larger minimum length skips the short stretches, where the burst stands out most.
+    coarse = run_all_tests({100_000: bursty}, scan_min_bits=16_384)
+    assert coarse.p[0, coarse.names.index("scan")] > p_values["scan"]
+
+
+def test_scan_null_p_values_are_uniform():
+    # Fair windows on a grid that the calibration simulates scaled down.
+    window, lengths = 16_384, scan_lengths(16_384, 1024)
+    rng = np.random.default_rng(11)
+    steps = 2 * rng.integers(0, 2, size=(400, window), dtype=np.int8) - 1
+    walks = np.zeros((400, window + 1), dtype=np.int32)
+    np.cumsum(steps, axis=1, out=walks[:, 1:])
+    p_values = scan_p_value(scan_peaks(walks, lengths), window, lengths)
+    # Peaks are discrete, so mid-rank p-values are uniform on average rather than exactly.
+    assert abs(np.mean(p_values) - 0.5) < 0.04
+    z_scores = stats.norm.isf(p_values)
+    assert abs(np.mean(z_scores)) < 0.15
+    assert 0.9 < np.std(z_scores) < 1.1
+    assert 8 <= np.sum(p_values < 0.05) <= 35
+
+
+def test_prepare_scan_leaves_ticks_only_cache_hits():
+    prepare_scan([1024, 12_288], min_bits=1024)
+    misses = _scan_null.cache_info().misses
+    fair = np.random.default_rng(12).integers(0, 2, 12_288, dtype=np.uint8)
+    assert scan_test(TickContext(fair), 12_288) is not None
+    assert _scan_null.cache_info().misses == misses
+
+
+def test_shadow_bank_matches_one_detector_per_config():
+    live = DetectorConfig(gdi_threshold=3.0, sustained_threshold=2.0, sustained_ticks=3)
+    configs = shadow_configs(
+        live,
+        [{"gdi_z": [2.5, 3.5], "fdr_q": [0.001, 0.05]}, {"sustained_z": 1.5, "sustained_ticks": 2}],
+    )
+    assert len(configs) == 5
+    assert configs[-1].gdi_threshold == 3.0 and configs[-1].sustained_ticks == 2
+    bank = ShadowDetectorBank([live] + configs)
+    detectors = [Detector(config) for config in [live] + configs]
+
+    rng = np.random.default_rng(11)
+    expected_events = []
+    for tick in range(400):
+        gdi = float(rng.normal(1.5, 1.2))
+        q_values = rng.uniform(0, 0.3, size=(3, 4)) ** 3
+        q_values[0, 1] = np.nan
+        onsets = bank.evaluate(gdi, q_values, timestamp_ms=tick)
+        for label, detector in zip(bank.labels, detectors, strict=True):
+            previous = detector.state
+            state, reason = detector.evaluate(gdi, q_values)
+            if state == DetectorState.EVENT and previous != DetectorState.EVENT:
+                expected_events.append((label, reason))
+        assert [row["state"] for row in bank.summary()] == [d.state.value for d in detectors]
+        assert onsets == expected_events[len(expected_events) - len(onsets) :]
+    counts = dict.fromkeys(bank.labels, 0)
+    for label, _ in expected_events:
+        counts[label] += 1
+    assert {row["label"]: row["events"] for row in bank.summary()} == counts
+
+    # New live thresholds restart only the live row.
+    bank.set_live(DetectorConfig(gdi_threshold=9.0))
+    rows = bank.summary()
+    assert rows[0]["events"] == 0 and rows[0]["gdi_z"] == 9.0 and rows[0]["ticks"] == 0
+    assert rows[1]["ticks"] == 400
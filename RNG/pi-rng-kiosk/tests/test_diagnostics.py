@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import os
+import threading
+
+import numpy as np
+import yaml
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6 import QtGui  # noqa: E402
+
+from analysis.calibration import BiasModel  # noqa: E402
+from analysis.tests import run_all_tests  # noqa: E402
+from diagnostics.latency import benchmark_config, run_trial, summarize  # noqa: E402
+from diagnostics.profiler import TickProfiler  # noqa: E402
+from diagnostics.stats import LatencyHistogram, PipelineStats  # noqa: E402
+
+
+def test_latency_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for _ in range(99):
+        histogram.record(0.0001)
+    histogram.record(0.5)
+    summary = histogram.to_dict()
+    assert summary["count"] == 100
+    assert summary["p50_ms"] <= 0.2
+    assert summary["max_ms"] == 500.0
+    assert histogram.percentile(1.0) == 0.5
+
+
+def test_pipeline_stats_records_per_test_stages():
+    stats = PipelineStats()
+    bits = np.random.default_rng(7).integers(0, 2, 1024, dtype=np.uint8)
+    run_all_tests({1024: bits}, stats=stats)
+    stats.incr("ticks")
+    stats.set_gauge("bit_queue_depth", 12)
+    snapshot = stats.snapshot()
+    names = {stage["name"] for stage in snapshot["stages"]}
+    assert "test.monobit@1024" in names
+    assert "test.light_fft@1024" in names
+    assert snapshot["counters"]["ticks"] == 1
+    assert snapshot["gauges"]["bit_queue_depth"] == 12
+    assert "monobit@1024" in stats.format_summary()
+
+
+def test_tick_profiler_writes_stats_and_collapsed_stacks(tmp_path):
+    profiler = TickProfiler(tmp_path, sample_interval=0.0005)
+    assert profiler.request(2, trace_alloc=True)
+    assert not profiler.request(5)
+    bits = np.random.default_rng(3).integers(0, 2, 1024, dtype=np.uint8)
+
+    def drain():
+        with profiler.drain():
+            run_all_tests({1024: bits})
+
+    profiler.on_tick()
+    for _ in range(2):
+        drain_thread = threading.Thread(target=drain)
+        drain_thread.start()
+        drain_thread.join()
+        run_all_tests({1024: bits})
+        profiler.on_tick()
+    assert not profiler.active
+    output = profiler.last_output
+    assert output is not None and output.parent == tmp_path
+    assert "monobit_test" in (output / "analyzer.txt").read_text(encoding="utf-8")
+    assert "monobit_test" in (output / "qt_drain.txt").read_text(encoding="utf-8")
+    assert (output / "tracemalloc.txt").exists()
+    collapsed = (output / "collapsed.txt").read_text(encoding="utf-8").splitlines()
+    assert collapsed and all(line.startswith(("analyzer;", "qt_drain;")) for line in collapsed)
+
+
+def test_latency_trial_times_onset_to_detector_and_ui():
+    # The view model only needs a Qt event loop, but other UI tests need a GUI application.
+    QtGui.QGuiApplication.instance() or QtGui.QGuiApplication([])
+    config = yaml.safe_load(
+        """
+windows: {sizes: [1024, 4096], analysis_interval_ms: 100, chunk_bits: 1024, history_length: 50}
+source: {primary: /dev/null, fallback: /dev/urandom, read_bytes: 4096}
+alert: {gdi_z: 3.0, sustained_z: 2.5, sustained_ticks: 3, fdr_q: 0.01}
+"""
+    )
+    config = benchmark_config(config, bit_rate=65536)
+    trial = run_trial(
+        config, "small", BiasModel.parse("p1:0.2"), seed=4, onset_bits=16384, timeout_s=10
+    )
+    assert not trial.early
+    assert trial.detect_s is not None and trial.ui_s is not None
+    assert 0 <= trial.detect_s <= trial.ui_s < 10
+    (row,) = summarize([trial])
+    assert row["detected"] == 1.0 and row["ui_p50_s"] == trial.ui_s
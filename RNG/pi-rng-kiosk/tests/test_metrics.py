@@ -1,21 +1,26 @@
 from __future__ import annotations
 
-from pathlib import Path
+import time
 
-from analysis.model import AnalysisSnapshot, CombinedStats, DetectorState, TestResult, WindowSummary
+import numpy as np
+
+from analysis.detector import Detector, DetectorConfig
+from analysis.model import (
+    AnalysisSnapshot,
+    CombinedStats,
+    DetectorState,
+    EventCapture,
+    TickResultTable,
+)
+from storage.events import EventStore
 from storage.metrics import MetricsStore
+from storage.state import StateFile
 
 
 def _make_snapshot(state: DetectorState = DetectorState.CALM, ts: int = 1) -> AnalysisSnapshot:
-    test = TestResult(name="monobit", window=1024, p_value=0.01, z_score=2.0, direction="positive")
-    summary = WindowSummary(window=1024, tests=[test])
-    summary.q_values = {test.key: 0.01}
-    combined = CombinedStats(
-        gdi=2.0,
-        stouffer_z=2.0,
-        q_values={test.key: 0.01},
-        window_summaries=[summary],
-    )
+    table = TickResultTable.from_rows([("monobit", 1024, 2.0, 0.01)])
+    table.q[table.valid] = 0.01
+    combined = CombinedStats(gdi=2.0, stouffer_z=2.0, table=table)
     return AnalysisSnapshot(
         timestamp_ms=ts,
         combined=combined,
@@ -26,18 +31,24 @@ def _make_snapshot(state: DetectorState = DetectorState.CALM, ts: int = 1) -> An
 
 def test_metrics_store_writes_csv(tmp_path):
     csv_path = tmp_path / "logs/metrics.csv"
+    shadow_path = tmp_path / "logs/shadow_events.csv"
     snapshot_dir = tmp_path / "snapshots"
     store = MetricsStore(
         maxlen=10,
         snapshot_dir=snapshot_dir,
-        snapshot_bits=16,
         csv_path=csv_path,
+        shadow_csv_path=shadow_path,
     )
     snapshot = _make_snapshot(ts=1234)
-    store.add(snapshot, bits=[1] * 20)
+    snapshot.shadow_events = [("gdi=1.5 sus=2.5x5 q=0.01", "gdi_threshold")]
+    store.add(snapshot)
+    store.add(_make_snapshot(ts=1235))
     lines = csv_path.read_text(encoding="utf-8").strip().splitlines()
-    assert len(lines) == 2
-    assert "monobit" in lines[1]
+    assert len(lines) == 3
+    assert lines[1].split(",")[2:7] == ["1024", "monobit", "2.0", "0.01", "0.01"]
+    shadow = shadow_path.read_text(encoding="utf-8").strip().splitlines()
+    assert len(shadow) == 2
+    assert shadow[1].split(",")[2:] == ["gdi=1.5 sus=2.5x5 q=0.01", "gdi_threshold", "2.0", "calm"]
 
 
 def test_export_to_usb_copies_csv_and_snapshots(tmp_path):
@@ -46,11 +57,11 @@ def test_export_to_usb_copies_csv_and_snapshots(tmp_path):
     store = MetricsStore(
         maxlen=10,
         snapshot_dir=snapshot_dir,
-        snapshot_bits=16,
         csv_path=csv_path,
     )
     snapshot = _make_snapshot(state=DetectorState.EVENT, ts=2000)
-    store.add(snapshot, bits=[1] * 32)
+    capture = EventCapture(2000, "gdi", 16, np.ones(32, dtype=np.uint8))
+    store.add(snapshot, capture)
     usb_mount = tmp_path / "usb"
     usb_mount.mkdir()
     success, message = store.export_to_usb(usb_mount, snapshot_count=1)
@@ -61,4 +72,65 @@ def test_export_to_usb_copies_csv_and_snapshots(tmp_path):
     assert (export_dir / csv_path.name).exists()
     snap_dir = export_dir / "snapshots"
     assert snap_dir.exists()
-    assert list(snap_dir.glob("snapshot_*.npy"))
+    saved = list(snap_dir.glob("snapshot_*.npy"))
+    assert [path.name for path in saved] == ["snapshot_2000_pre16.npy"]
+    assert np.load(saved[0]).sum() == 32
+
+
+def test_state_file_round_trips_bits_detector_and_history(tmp_path):
+    path = tmp_path / "state.bin"
+    stream = np.random.default_rng(8).integers(0, 2, 5003, dtype=np.uint8)
+    state = StateFile(path, history_bits=2048, history_len=4, max_age_s=60)
+    for start in range(0, len(stream), 333):
+        state.append_bits(stream[start : start + 333])
+    detector = Detector(DetectorConfig())
+    detector.state = DetectorState.RECOVER
+    detector.evaluate_chunk(np.ones(4096, dtype=np.uint8))
+    state.save_detector(detector.export_state())
+    store = MetricsStore(maxlen=4, snapshot_dir=tmp_path / "snapshots", state=state)
+    for ts in range(1, 7):
+        store.add(_make_snapshot(DetectorState.EVENT if ts == 2 else DetectorState.CALM, ts))
+    state.close()
+
+    reopened = StateFile(path, history_bits=2048, history_len=4, max_age_s=60)
+    bits, saved = reopened.load_pipeline()
+    # The last three bits wait for a full byte; the packed ring keeps the 2048 before them.
+    np.testing.assert_array_equal(bits, stream[5000 - 2048 : 5000])
+    restored = Detector(DetectorConfig())
+    restored.restore_state(saved)
+    assert restored.export_state() == detector.export_state()
+
+    store = MetricsStore(maxlen=4, snapshot_dir=tmp_path / "snapshots", state=reopened)
+    assert [record.timestamp_ms for record in store.history] == [3, 4, 5, 6]
+
+    stale = StateFile(path, history_bits=2048, history_len=4, max_age_s=0)
+    time.sleep(0.01)
+    assert stale.load_pipeline() is None and stale.load_history() == []
+    # A different layout starts from an empty file.
+    assert StateFile(path, history_bits=4096, history_len=4, max_age_s=60).load_pipeline() is None
+
+
+def test_event_store_merges_event_ticks_and_pages_across_restarts(tmp_path):
+    path = tmp_path / "events.db"
+    events = EventStore(path)
+    store = MetricsStore(maxlen=4, snapshot_dir=tmp_path / "snapshots", events=events)
+    states = "CEEECCECEEC"
+    for ts, code in enumerate(states, start=1):
+        state = DetectorState.EVENT if code == "E" else DetectorState.CALM
+        snapshot = _make_snapshot(state, ts * 100)
+        snapshot.combined.gdi = float(ts)
+        store.add(snapshot)
+    events.close()
+
+    reopened = EventStore(path)
+    assert reopened.count() == 3
+    newest, middle, oldest = reopened.page()
+    assert (oldest.start_ms, oldest.end_ms, oldest.ticks, oldest.peak_gdi) == (200, 400, 3, 4.0)
+    assert (middle.start_ms, middle.ticks) == (700, 1)
+    assert (newest.start_ms, newest.end_ms, newest.peak_gdi) == (900, 1000, 10.0)
+    assert [event.start_ms for event in reopened.page(offset=1, limit=1)] == [700]
+    assert [event.peak_gdi for event in reopened.page(order="peak")] == [10.0, 7.0, 4.0]
+    assert reopened.count(min_peak=5.0) == 2 and reopened.count(reason="other") == 0
+    reopened.record(2000, 1.0, True, "fast_span")
+    assert reopened.page(limit=1)[0].id == newest.id + 1
+    reopened.close()
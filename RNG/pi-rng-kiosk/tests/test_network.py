@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+import socket
+import threading
+import time
+
+import numpy as np
+
+from analysis.detector import DetectorConfig
+from network.collector import Collector
+from network.entropy import Conditioner, EntropyOutput
+from network.protocol import decode_batch, encode_batch, encode_tick
+from network.publisher import TickPublisher
+from network.simulate import run_simulation, synthetic_snapshot
+
+
+def _start_collector(collector: Collector):
+    loop = asyncio.new_event_loop()
+    stop = asyncio.Event()
+    bound = threading.Event()
+    ports = []
+
+    def ready(port: int) -> None:
+        ports.append(port)
+        bound.set()
+
+    thread = threading.Thread(
+        target=loop.run_until_complete,
+        args=(collector.serve("127.0.0.1", 0, ready=ready, stop=stop),),
+        daemon=True,
+    )
+    thread.start()
+    assert bound.wait(5)
+
+    def shutdown() -> None:
+        loop.call_soon_threadsafe(stop.set)
+        thread.join(timeout=5)
+
+    return ports[0], shutdown
+
+
+def test_batch_round_trip_preserves_test_results():
+    snapshot = synthetic_snapshot(np.random.default_rng(1), timestamp_ms=1500)
+    node, ticks = decode_batch(encode_batch("kiosk-a", [encode_tick(snapshot)]))
+    assert node == "kiosk-a"
+    assert ticks[0].timestamp_ms == 1500
+    assert ticks[0].gdi == snapshot.combined.gdi
+    original, decoded = snapshot.combined.table, ticks[0].combined.table
+    assert decoded.keys() == original.keys()
+    assert decoded.z[decoded.valid].tolist() == original.z[original.valid].tolist()
+
+
+def test_collector_aligns_ticks_and_drops_late_ones():
+    collector = Collector(DetectorConfig(), bucket_ms=500, grace_ms=1000)
+    rng = np.random.default_rng(2)
+    for node, offset in (("a", 10), ("b", 480), ("c", 520)):
+        batch = encode_batch(node, [encode_tick(synthetic_snapshot(rng, 10_000 + offset))])
+        collector.ingest(decode_batch(batch)[1])
+    assert collector.process(now_ms=11_400) == []
+    first = collector.process(now_ms=11_600)
+    assert len(first) == 1
+    assert [device.name for device in first[0].devices] == ["a", "b"]
+    late = encode_batch("d", [encode_tick(synthetic_snapshot(rng, 10_100))])
+    collector.ingest(decode_batch(late)[1])
+    assert collector.aligner.late == 1
+    second = collector.process(now_ms=12_100)
+    assert [device.name for device in second[0].devices] == ["c"]
+
+
+def test_publisher_buffer_is_bounded():
+    publisher = TickPublisher("127.0.0.1", 9, node_id="n", max_buffer=3)
+    rng = np.random.default_rng(3)
+    for index in range(5):
+        publisher.publish(synthetic_snapshot(rng, index))
+    assert publisher.pending() == 3
+    assert publisher.dropped == 2
+
+
+def test_conditioners_do_not_depend_on_chunking():
+    bits = np.random.default_rng(4).integers(0, 2, 40_001, dtype=np.uint8)
+    assert Conditioner("none").feed(bits) == np.packbits(bits[:40_000]).tobytes()
+    for method in ("von_neumann", "sha256"):
+        whole = Conditioner(method).feed(bits)
+        chunked = Conditioner(method)
+        pieces = b"".join(chunked.feed(part) for part in np.array_split(bits, 7))
+        assert pieces == whole
+    assert len(Conditioner("sha256").feed(bits)) == 40_000 // 8 // 64 * 32
+    pairs = np.array([0, 1, 1, 0, 1, 1, 1, 0, 0, 0, 0, 1, 0, 1, 1, 0, 1, 0, 0, 1], np.uint8)
+    assert Conditioner("von_neumann").feed(pairs) == bytes([0b01100110])
+
+
+def test_entropy_output_serves_only_healthy_bits_once(tmp_path):
+    output = EntropyOutput(tmp_path / "entropy.sock", max_buffer_bits=64_000)
+    rng = np.random.default_rng(5)
+    healthy = rng.integers(0, 2, 32_000, dtype=np.uint8)
+    output.offer(healthy, True)
+    output.offer(np.ones(32_000, dtype=np.uint8), False)
+    output.offer(rng.integers(0, 2, 40_000, dtype=np.uint8), True)
+    assert (output.discarded_bits, output.dropped_bits) == (32_000, 40_000)
+    output.start()
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(str(tmp_path / "entropy.sock"))
+            client.settimeout(5)
+            received = b""
+            while len(received) < 4000:
+                received += client.recv(4000 - len(received))
+        assert received == np.packbits(healthy).tobytes()
+        assert output.pending_bits() == 0
+    finally:
+        output.stop()
+    assert not (tmp_path / "entropy.sock").exists()
+
+
+def test_many_simulated_nodes_reach_collector_on_localhost():
+    results = []
+    collector = Collector(
+        DetectorConfig(), bucket_ms=200, grace_ms=400, on_result=results.append
+    )
+    port, shutdown = _start_collector(collector)
+    try:
+        publishers = run_simulation(
+            "127.0.0.1", port, nodes=40, ticks=5, interval=0.2, batch_interval=0.05
+        )
+        assert sum(publisher.sent for publisher in publishers) == 200
+        deadline = time.monotonic() + 5
+        while collector.received < 200 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.8)
+    finally:
+        shutdown()
+    assert collector.received == 200
+    assert max(len(snapshot.devices) for snapshot in results) >= 30
+    # The first bucket may close before sim-000's first tick arrives.
+    names = {name for snapshot in results for name in snapshot.combined.table.names}
+    assert any(name.startswith("sim-000:") for name in names)
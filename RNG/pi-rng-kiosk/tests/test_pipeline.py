@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import copy
+import time
+from queue import Empty, Queue
+
+import numpy as np
+import pytest
+import yaml
+
+from analysis.model import AnalysisSnapshot, CombinedStats, DetectorState, TickResultTable
+from pipeline.capture import TriggerCapture
+from pipeline.mailbox import SnapshotMailbox
+from pipeline.multidevice import MultiDeviceRunner, device_configs
+from pipeline.processes import ProcessPipeline
+from pipeline.ring import SharedBitRing
+from pipeline.runner import PipelineRunner
+from storage.metrics import MetricsStore
+from storage.writer import StorageWriter
+
+ROOT_CONFIG = yaml.safe_load(
+    """
+windows:
+  sizes: [256, 1024]
+  analysis_interval_ms: 100
+  chunk_bits: 1024
+  history_length: 50
+source:
+  primary: /dev/hwrng
+  fallback: /dev/urandom
+  read_bytes: 4096
+  devices:
+    - {name: a}
+    - {name: b, primary: /dev/null}
+alert:
+  gdi_z: 3.0
+  sustained_z: 2.5
+  sustained_ticks: 5
+  fdr_q: 0.01
+storage:
+  capture:
+    pre_bits: 512
+    post_bits: 256
+diagnostics:
+  log_interval_s: 0
+"""
+)
+
+
+def test_device_configs_inherit_source_defaults():
+    devices = device_configs(ROOT_CONFIG)
+    assert [device["name"] for device in devices] == ["a", "b"]
+    assert devices[0]["primary"] == "/dev/hwrng"
+    assert devices[1]["primary"] == "/dev/null"
+    assert devices[1]["fallback"] == "/dev/urandom"
+
+
+def test_multi_device_runner_aggregates_device_snapshots(tmp_path):
+    queue: Queue = Queue()
+    runner = MultiDeviceRunner(
+        config=ROOT_CONFIG,
+        config_path=tmp_path / "config.yaml",
+        snapshot_queue=queue,
+        fake_seed=11,
+        inject_bias=0.0,
+    )
+    runner.start()
+    try:
+        deadline = time.monotonic() + 30
+        snapshot = None
+        names = set()
+        while time.monotonic() < deadline:
+            try:
+                snapshot, _ = queue.get(timeout=0.5)
+            except Empty:
+                continue
+            names.update(snapshot.combined.table.names)
+            if len(snapshot.devices) == 2 and any(name.startswith("a:") for name in names):
+                break
+        assert snapshot is not None and len(snapshot.devices) == 2
+        assert {device.name for device in snapshot.devices} == {"a", "b"}
+        assert any(name.startswith("a:") for name in names)
+        assert snapshot.bit_counts["0"] + snapshot.bit_counts["1"] == 512
+    finally:
+        runner.stop()
+
+
+def test_multi_device_aggregate_counts_each_device_snapshot_once(tmp_path):
+    runner = MultiDeviceRunner(
+        config=ROOT_CONFIG,
+        config_path=tmp_path / "config.yaml",
+        snapshot_queue=Queue(),
+        fake_seed=11,
+        inject_bias=0.0,
+    )
+
+    def device_snapshot(timestamp_ms: int, z_score: float) -> AnalysisSnapshot:
+        table = TickResultTable.from_rows([("monobit", 256, z_score, 0.5)])
+        combined = CombinedStats(z_score, z_score, table)
+        return AnalysisSnapshot(timestamp_ms, combined, DetectorState.CALM, "")
+
+    runner._receive("a", device_snapshot(1, 2.0), None, now=10.0)
+    runner._receive("b", device_snapshot(1, 1.0), None, now=10.0)
+    snapshot, _ = runner._aggregate(now=10.1, stale_after=0.5)
+    assert snapshot.combined.gdi == pytest.approx(3.0 / np.sqrt(2))
+    # b missed this round: it is still listed, but only a's new tick is combined.
+    runner._receive("a", device_snapshot(2, 2.0), None, now=10.2)
+    snapshot, _ = runner._aggregate(now=10.3, stale_after=0.5)
+    assert [device.name for device in snapshot.devices] == ["a", "b"]
+    assert snapshot.combined.table.names == ("a:monobit",)
+    assert snapshot.combined.gdi == pytest.approx(2.0)
+    assert runner._aggregate(now=10.4, stale_after=0.5) is None
+
+
+def test_stuck_source_fails_health_test_and_switches_to_fallback(tmp_path):
+    stuck = tmp_path / "hwrng"
+    stuck.write_bytes(bytes(1 << 16))
+    config = copy.deepcopy(ROOT_CONFIG)
+    config["source"].update(primary=str(stuck), devices=[])
+    queue: Queue = Queue()
+    runner = PipelineRunner(
+        config=config,
+        config_path=tmp_path / "config.yaml",
+        snapshot_queue=queue,
+        fake_seed=None,
+        inject_bias=0.0,
+    )
+    runner.start()
+    try:
+        snapshot, capture = queue.get(timeout=10)
+        # Nothing from the stuck device reaches the windows; the first tick is the alarm.
+        assert (snapshot.detector_state.value, snapshot.detector_reason) == ("event", "health_rct")
+        while capture is None:
+            _, capture = queue.get(timeout=10)
+        assert capture.reason == "health_rct"
+        assert len(capture.bits) == capture.pre_bits + 256
+        assert 0.3 < np.mean(capture.bits) < 0.7
+        counters = runner.diagnostics()["counters"]
+        assert counters["health_rct_failures"] == 1
+        assert counters["health_apt_failures"] == 1
+    finally:
+        runner.stop()
+
+
+def test_shared_bit_ring_windows_are_contiguous_across_wrap():
+    ring = SharedBitRing.create(64)
+    reader = SharedBitRing.attach(ring.name)
+    try:
+        stream = np.random.default_rng(3).integers(0, 2, size=200, dtype=np.uint8)
+        for start in range(0, 200, 23):
+            ring.write(stream[start : start + 23])
+        total = reader.total
+        assert total == 200
+        windows = reader.windows([16, 64, 128], total)
+        assert sorted(windows) == [16, 64]
+        np.testing.assert_array_equal(windows[64], stream[-64:])
+        np.testing.assert_array_equal(windows[16], stream[-16:])
+        assert reader.is_intact(total, 64)
+        ring.write(stream[:8])
+        assert reader.is_intact(total, 56)
+        assert not reader.is_intact(total, 64)
+        del windows
+    finally:
+        reader.close()
+        ring.close()
+
+
+def test_trigger_capture_spans_the_event_once():
+    stream = np.random.default_rng(4).integers(0, 2, size=5000, dtype=np.uint8)
+    capture = TriggerCapture(pre_bits=300, post_bits=200)
+
+    def snapshot(state: DetectorState) -> AnalysisSnapshot:
+        table = TickResultTable.empty([], [])
+        return AnalysisSnapshot(1234, CombinedStats(0.0, 0.0, table), state, "fast_span")
+
+    capture.observe(snapshot(DetectorState.CALM), 1000)
+    assert capture.collect(2000, lambda count: stream[2000 - count : 2000]) is None
+    capture.observe(snapshot(DetectorState.EVENT), 2000)
+    # Staying in event does not re-arm, and nothing is ready before the post-trigger span.
+    capture.observe(snapshot(DetectorState.EVENT), 2100)
+    assert capture.collect(2150, lambda count: stream[2150 - count : 2150]) is None
+    result = capture.collect(2300, lambda count: stream[2300 - count : 2300])
+    assert (result.trigger_ms, result.reason, result.pre_bits) == (1234, "fast_span", 300)
+    np.testing.assert_array_equal(result.bits, stream[1700:2200])
+    assert capture.collect(4000, lambda count: stream[4000 - count : 4000]) is None
+
+
+def test_mailbox_coalesces_for_the_ui_and_hands_every_tick_to_storage(tmp_path):
+    wakeups, stored = [], []
+    metrics = MetricsStore(maxlen=50, snapshot_dir=tmp_path, csv_path=tmp_path / "log.csv")
+    storage = StorageWriter(metrics, notify=lambda: stored.append(1))
+    mailbox = SnapshotMailbox(max_points=5, notify=lambda: wakeups.append(1), storage=storage)
+    states = [DetectorState.CALM] * 3 + [DetectorState.EVENT] * 3 + [DetectorState.CALM] * 400
+    table = TickResultTable.empty([], [])
+    for index, state in enumerate(states):
+        mailbox.put((AnalysisSnapshot(index, CombinedStats(0.0, 0.0, table), state, ""), None))
+    # A stalled consumer is woken once, and only the newest snapshot is drawn.
+    assert wakeups == [1]
+    points, latest = mailbox.take()
+    assert latest.timestamp_ms == len(states) - 1
+    assert (mailbox.coalesced, mailbox.dropped) == (len(states) - 1, len(states) - 5)
+    assert points == [(0.0, False)] * 5
+    assert mailbox.take() == ([], None)
+    mailbox.put((latest, None))
+    assert wakeups == [1, 1]
+
+    # Storage logs every tick, however long the UI stalled, on its own thread.
+    storage.start()
+    storage.stop()
+    assert storage.written == len(states) + 1 and stored
+    assert [record.timestamp_ms for record in metrics.history] == list(range(357, 406)) + [405]
+    assert len(metrics.csv_path.read_text(encoding="utf-8").splitlines()) == len(states) + 2
+    assert metrics.events.count() == 1
+
+
+def test_process_pipeline_delivers_snapshots_from_the_ring(tmp_path):
+    config = copy.deepcopy(ROOT_CONFIG)
+    config["source"]["devices"] = []
+    config["pipeline"] = {"mode": "process", "ring_bits": 4096}
+    queue: Queue = Queue()
+    pipeline = ProcessPipeline(
+        config=config,
+        config_path=tmp_path / "config.yaml",
+        snapshot_queue=queue,
+        fake_seed=5,
+        inject_bias=0.0,
+    )
+    pipeline.start()
+    try:
+        snapshot, capture = queue.get(timeout=30)
+        assert snapshot.combined.table.windows.tolist() == [256, 1024]
+        assert capture is None
+        counts = snapshot.bit_counts
+        assert counts["0"] + counts["1"] == 512
+        assert counts["00"] + counts["01"] + counts["10"] + counts["11"] == 511
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            names = {stage["name"] for stage in pipeline.diagnostics()["stages"]}
+            if "analysis/tick" in names and "reader/ring_write" in names:
+                break
+            time.sleep(0.5)
+        assert "analysis/tick" in names and "reader/ring_write" in names
+    finally:
+        pipeline.stop()
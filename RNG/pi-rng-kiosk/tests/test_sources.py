@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from rng_sources.bits import BiasInjector, unpack_bits
+from rng_sources.fake import FakeRNG
+from rng_sources.health import HealthMonitor
+from rng_sources.hwrng import HardwareRNG
+from rng_sources.reader import DeviceReader
+
+
+def test_unpack_bits_matches_reference_bit_order():
+    data = bytes(range(256))
+    reference = [(byte >> shift) & 1 for byte in data for shift in range(8)]
+    assert unpack_bits(data).tolist() == reference
+
+
+def test_bias_injector_keeps_phase_across_chunks():
+    stream = np.zeros(1000, dtype=np.uint8)
+    injector = BiasInjector(0.1)
+    chunks = [injector.apply(stream[start : start + 37]) for start in range(0, 1000, 37)]
+    flipped = np.flatnonzero(np.concatenate(chunks))
+    # Same positions as the per-bit loop: every bit whose 1-based index is a multiple of 10.
+    np.testing.assert_array_equal(flipped, np.arange(9, 1000, 10))
+    assert BiasInjector(0.0).apply(stream) is stream
+
+
+def test_bias_injector_starts_at_onset_with_each_model():
+    stream = np.random.default_rng(2).integers(0, 2, 400_000, dtype=np.uint8)
+    for kind in ("flip", "p1", "corr"):
+        injector = BiasInjector(0.05, kind=kind, onset=100_000, seed=1)
+        assert injector.onset_time is None
+        mutated = np.concatenate(
+            [injector.apply(stream[start : start + 30_000]) for start in range(0, 400_000, 30_000)]
+        )
+        assert injector.onset_time is not None
+        np.testing.assert_array_equal(mutated[:100_000], stream[:100_000])
+        after = mutated[100_000:]
+        if kind == "flip":
+            # Flipping fair bits leaves them fair: every 20th bit past the onset changes.
+            changed = np.flatnonzero(after != stream[100_000:]) + 100_001
+            assert (changed % 20 == 0).all() and len(changed) == 15_000
+        elif kind == "p1":
+            assert after.mean() == pytest.approx(0.55, abs=0.005)
+        else:
+            assert np.mean(after[1:] == after[:-1]) == pytest.approx(0.55, abs=0.005)
+            assert after.mean() == pytest.approx(0.5, abs=0.01)
+
+
+def test_fake_rng_is_deterministic_and_biased_as_requested():
+    first = FakeRNG(seed=7, chunk_bits=4096).next_chunk()
+    second = FakeRNG(seed=7, chunk_bits=4096).next_chunk()
+    np.testing.assert_array_equal(first, second)
+    assert first.dtype == np.uint8 and len(first) == 4096
+    assert 0.45 < first.mean() < 0.55
+
+    clean = FakeRNG(seed=7, chunk_bits=1000).next_chunk()
+    biased = FakeRNG(seed=7, chunk_bits=1000, bias=0.25).next_chunk()
+    np.testing.assert_array_equal(np.flatnonzero(clean != biased), np.arange(3, 1000, 4))
+
+
+def test_fake_rng_paces_to_target_bit_rate():
+    fake = FakeRNG(seed=1, chunk_bits=1000, bit_rate=20_000)
+
+    async def read(count: int) -> None:
+        for _ in range(count):
+            await fake.read_bits()
+
+    started = time.monotonic()
+    asyncio.run(read(6))
+    # The first chunk is immediate; the next five are spaced 50 ms apart.
+    assert 0.2 <= time.monotonic() - started < 1.0
+
+
+def test_health_monitor_passes_random_bits_and_catches_runs_across_chunks():
+    monitor = HealthMonitor()
+    assert (monitor.rct_cutoff, monitor.apt_cutoff) == (41, 625)
+    for _ in range(50):
+        assert monitor.check(FakeRNG(seed=3, chunk_bits=4096).next_chunk()) == []
+
+    # A 45-bit run split over two chunks trips the RCT on the second one.
+    head = np.array([1, 0] * 8 + [1] * 30, dtype=np.uint8)
+    assert monitor.check(head) == []
+    assert monitor.check(np.ones(15, dtype=np.uint8)) == ["rct"]
+
+
+def test_health_monitor_apt_flags_bias_without_long_runs():
+    monitor = HealthMonitor()
+    generator = np.random.default_rng(5)
+    # 70 % ones never produces a 41-bit run, but fills an APT window with 700+ ones.
+    biased = (generator.random(4096) < 0.7).astype(np.uint8)
+    biased[::1024] = 1
+    assert monitor.check(biased[:1500]) == ["apt"]
+    assert monitor.check(FakeRNG(seed=5, chunk_bits=4096).next_chunk()) == []
+
+
+def test_device_reader_streams_pooled_buffers_and_grows_reads(tmp_path):
+    data = np.random.default_rng(9).bytes(200_000)
+    path = tmp_path / "device"
+    path.write_bytes(data)
+    reader = DeviceReader(str(path), chunk_bytes=16, max_bytes=8192, buffers=2)
+
+    async def drain() -> bytes:
+        received = bytearray()
+        # Two buffers carry every read, so each one must come back through release().
+        with pytest.raises(RuntimeError, match="No data"):
+            while True:
+                chunk = await reader.read_chunk()
+                assert chunk.base is not None
+                received += chunk.tobytes()
+                reader.release(chunk)
+        return bytes(received)
+
+    assert asyncio.run(drain()) == data
+    # A file reads far faster than 16 bytes per 50 ms, so reads grow to the cap.
+    assert reader.read_size == 8192
+
+    async def missing() -> None:
+        await HardwareRNG(device=str(tmp_path / "absent")).read_chunk()
+
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(missing())
+
+
+class _PacedDevice:
+    """Yields zeros at ``rate`` bytes per second."""
+
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+
+    def readinto(self, view) -> int:
+        time.sleep(len(view) / self.rate)
+        view[:] = bytes(len(view))
+        return len(view)
+
+    def close(self) -> None:
+        pass
+
+
+class _PacedReader(DeviceReader):
+    def open(self):
+        return _PacedDevice(20_000)
+
+
+def test_device_reader_sizes_reads_to_rate_and_backlog():
+    reader = _PacedReader("paced", chunk_bytes=16, max_bytes=8192, buffers=4)
+
+    async def read(count: int, pause: float) -> None:
+        for _ in range(count):
+            chunk = await reader.read_chunk()
+            await asyncio.sleep(pause)
+            reader.release(chunk)
+
+    async def run() -> tuple:
+        # Kept up with, reads settle near 50 ms of data: 1000 bytes, rounded down to 512.
+        await read(8, 0.0)
+        settled = reader.read_size
+        # A consumer that leaves reads waiting gets larger ones.
+        await read(4, 0.2)
+        reader.close()
+        return settled, reader.read_size
+
+    settled, backlogged = asyncio.run(run())
+    assert settled == 512
+    assert backlogged > 512
\ No newline at end of file
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import os
+
+import numpy as np
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PySide6 import QtGui, QtQuick  # noqa: E402
+
+from ui.plot import _ATTRIBUTES, GdiPlot, GdiSeries  # noqa: E402
+
+_APP = QtGui.QGuiApplication.instance() or QtGui.QGuiApplication([])
+
+
+def test_gdi_series_ring_keeps_newest_points_and_vertices_follow():
+    series = GdiSeries(4)
+    series.reset((float(value), value == 2) for value in range(3))
+    gdi, events = series.tail(10)
+    assert gdi.tolist() == [0.0, 1.0, 2.0]
+    assert events.tolist() == [False, False, True]
+
+    # More points than the ring holds: only the newest survive, but all are counted.
+    series.extend((float(value), False) for value in range(3, 10))
+    assert series.written == 10
+    assert series.count == 4
+    assert series.tail(4)[0].tolist() == [6.0, 7.0, 8.0, 9.0]
+
+    plot = GdiPlot()
+    plot.calmColor = QtGui.QColor(0, 200, 200)
+    plot.eventColor = QtGui.QColor(250, 0, 0)
+    geometry = QtQuick.QSGGeometry(_ATTRIBUTES, 0)
+    plot._sync_vertices(series, geometry)
+    assert geometry.vertexCount() == 4
+    vertices = plot._vertices(geometry, 2 * series.capacity)
+
+    # Appends land after the synced points until the doubled buffer is full, then the
+    # newest points move to the front and the x coordinates restart at zero.
+    for value, is_event in ((10.0, True), (11.0, False), (12.0, False)):
+        series.extend([(value, is_event)])
+        plot._sync_vertices(series, geometry)
+    assert geometry.vertexCount() == 7
+    assert vertices["y"][3:7].tolist() == [9.0, 10.0, 11.0, 12.0]
+    assert vertices["r"][4] == 250 and vertices["g"][4] == 0
+    assert vertices["g"][5] == 200
+
+    series.extend([(13.0, False), (14.0, False)])
+    plot._sync_vertices(series, geometry)
+    assert geometry.vertexCount() == 4
+    assert vertices["x"][:4].tolist() == [0.0, 1.0, 2.0, 3.0]
+    assert vertices["y"][:4].tolist() == [11.0, 12.0, 13.0, 14.0]
+    assert np.array_equal(vertices["y"][:4], series.tail(4)[0])
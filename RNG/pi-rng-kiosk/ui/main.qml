@@ -1,6 +1,7 @@
 import QtQuick 6.5
 import QtQuick.Controls 6.5
 import QtQuick.Layouts 6.5
+import RngKiosk 1.0
 import QtMultimedia 6.5
 
 Window {
@@ -12,8 +13,8 @@ Window {
 
     property real gdiValue: 0
     property string detectorState: "calm"
-    property var sparklineData: []
     property var testsData: []
+    property var devicesData: []
     property var eventsData: []
     property var histogramData: [
         {"label": "0", "value": 0},
@@ -46,6 +47,8 @@ Window {
     property string settingsTicksText: settingsSource.alert.sustained_ticks
     property string settingsFdrText: settingsSource.alert.fdr_q
     property string settingsError: ""
+    property bool diagnosticsVisible: false
+    property var diagnosticsData: ({"stages": [], "gauges": {}, "rates": {}, "counters": {}})
 
     Themes {
         id: theme
@@ -65,17 +68,6 @@ Window {
         volume: 0.6
     }
 
-    Timer {
-        id: sparklineTimer
-        interval: 1000
-        running: true
-        repeat: true
-        onTriggered: {
-            sparklineCanvas.requestPaint()
-            if (timelineCanvas) timelineCanvas.requestPaint()
-        }
-    }
-
     Timer {
         id: exportMessageTimer
         interval: 5000
@@ -94,12 +86,8 @@ Window {
                 alertAudio.stop()
             }
         }
-        function onSparklineChanged(value) {
-            root.sparklineData = value
-            sparklineCanvas.requestPaint()
-            if (timelineCanvas) timelineCanvas.requestPaint()
-        }
         function onTestsChanged(value) { root.testsData = value }
+        function onDevicesChanged(value) { root.devicesData = value }
         function onEventsChanged(value) { root.eventsData = value }
         function onExportCompleted(success, message) {
             root.exportSuccess = success
@@ -108,6 +96,7 @@ Window {
         }
         function onHistogramChanged(value) { root.histogramData = value }
         function onSerialMatrixChanged(value) { root.serialMatrixData = value }
+        function onDiagnosticsChanged(value) { root.diagnosticsData = value }
         function onSettingsApplied(payload) {
             if (payload.windows && payload.windows.length) {
                 root.settingsWindowsText = payload.windows.join(", ")
@@ -362,6 +351,12 @@ Window {
         color: theme.calmText
         font.pixelSize: 22
         font.bold: true
+
+        MouseArea {
+            anchors.fill: parent
+            pressAndHoldInterval: 1500
+            onPressAndHold: root.toggleDiagnostics()
+        }
     }
 
     SequentialAnimation {
@@ -400,6 +395,33 @@ Window {
         return result
     }
 
+    function toggleDiagnostics() {
+        root.diagnosticsVisible = !root.diagnosticsVisible
+        viewModel.setDiagnosticsVisible(root.diagnosticsVisible)
+    }
+
+    function editShadowSettings(row) {
+        // Load a shadow config's thresholds into Settings, to Apply or Apply & Save from there.
+        root.settingsGdiText = String(row.gdi_z)
+        root.settingsSustainedText = String(row.sustained_z)
+        root.settingsTicksText = String(row.sustained_ticks)
+        root.settingsFdrText = String(row.fdr_q)
+        root.settingsError = ""
+        settingsDialog.open()
+    }
+
+    function diagnosticsSummary(data) {
+        var lines = []
+        var rates = data.rates || {}
+        for (var rate in rates) lines.push(rate + ": " + Math.round(rates[rate]) + "/s")
+        var gauges = data.gauges || {}
+        for (var gauge in gauges) lines.push(gauge + ": " + gauges[gauge])
+        var counters = data.counters || {}
+        for (var counter in counters) lines.push(counter + ": " + counters[counter])
+        if (data.uptime_s !== undefined) lines.push("uptime: " + Math.round(data.uptime_s) + "s")
+        return lines.join("\n")
+    }
+
     function submitSettings(persist, windowsText, gdiText, sustainedText, ticksText, fdrText, closeDialog) {
         var windows = parseWindowString(windowsText)
         if (windows.length === 0) {
@@ -490,53 +512,67 @@ Window {
                         color: Qt.rgba(1, 1, 1, 0.03)
                         radius: 12
 
-                        Canvas {
-                            id: sparklineCanvas
+                        GdiPlot {
+                            id: sparklinePlot
                             anchors.fill: parent
                             anchors.margins: 16
-                            onPaint: {
-                                var ctx = getContext("2d")
-                                ctx.reset()
-                                ctx.lineWidth = 2
-                                if (root.sparklineData.length > 1) {
-                                    var max = -999
-                                    var min = 999
-                                    for (var i = 0; i < root.sparklineData.length; i++) {
-                                        var val = root.sparklineData[i].gdi
-                                        max = Math.max(max, val)
-                                        min = Math.min(min, val)
-                                    }
-                                    var range = Math.max(1, max - min)
-                                    function coords(idx) {
-                                        var point = root.sparklineData[idx]
-                                        var normX = idx / (root.sparklineData.length - 1)
-                                        var normY = (point.gdi - min) / range
-                                        return {
-                                            x: normX * width,
-                                            y: height - normY * height,
-                                            state: point.state || "calm"
-                                        }
-                                    }
-                                    var firstPoint = coords(0)
-                                    var lastColor = firstPoint.state === "event" ? theme.eventAccent : theme.calmAccent
-                                    ctx.beginPath()
-                                    ctx.strokeStyle = lastColor
-                                    ctx.moveTo(firstPoint.x, firstPoint.y)
-                                    for (var j = 1; j < root.sparklineData.length; j++) {
-                                        var pointCoords = coords(j)
-                                        var color = pointCoords.state === "event" ? theme.eventAccent : theme.calmAccent
-                                        if (color !== lastColor) {
-                                            ctx.lineTo(pointCoords.x, pointCoords.y)
-                                            ctx.stroke()
-                                            ctx.beginPath()
-                                            ctx.strokeStyle = color
-                                            ctx.moveTo(pointCoords.x, pointCoords.y)
-                                            lastColor = color
-                                        } else {
-                                            ctx.lineTo(pointCoords.x, pointCoords.y)
-                                        }
-                                    }
-                                    ctx.stroke()
+                            clip: true
+                            series: viewModel ? viewModel.gdiSeries : null
+                            threshold: Number(root.settingsGdiText)
+                            watchThreshold: Number(root.settingsSustainedText)
+                            calmColor: theme.calmAccent
+                            eventColor: theme.eventAccent
+                        }
+                    }
+                }
+
+                Flow {
+                    Layout.fillWidth: true
+                    visible: root.devicesData.length > 0
+                    spacing: 16
+                    Rectangle {
+                        width: 180
+                        height: 72
+                        radius: 10
+                        color: root.detectorState === "event" ? theme.eventAccent : Qt.rgba(1, 1, 1, 0.08)
+                        border.color: Qt.rgba(1, 1, 1, 0.2)
+                        Column {
+                            anchors.fill: parent
+                            anchors.margins: 10
+                            spacing: 2
+                            Label {
+                                text: "All devices"
+                                color: theme.calmText
+                                font.pixelSize: 14
+                                font.bold: true
+                            }
+                            Label {
+                                text: "GDI " + root.gdiValue.toFixed(2) + " · " + root.detectorState
+                                color: theme.calmText
+                                font.pixelSize: 16
+                            }
+                        }
+                    }
+                    Repeater {
+                        model: root.devicesData
+                        delegate: Rectangle {
+                            width: 180
+                            height: 72
+                            radius: 10
+                            color: modelData.state === "event" ? theme.eventAccent : Qt.rgba(1, 1, 1, 0.04)
+                            Column {
+                                anchors.fill: parent
+                                anchors.margins: 10
+                                spacing: 2
+                                Label {
+                                    text: modelData.name
+                                    color: theme.calmText
+                                    font.pixelSize: 14
+                                }
+                                Label {
+                                    text: "GDI " + modelData.gdi.toFixed(2) + " · " + modelData.state
+                                    color: modelData.gdi >= 0 ? theme.positive : theme.negative
+                                    font.pixelSize: 16
                                 }
                             }
                         }
@@ -597,6 +633,14 @@ Window {
                     Layout.fillHeight: true
                     clip: true
                     model: root.eventsData
+                    // Pages of 50 arrive newest first; a short page means the end.
+                    onAtYEndChanged: {
+                        var count = root.eventsData.length
+                        if (atYEnd && count > 0 && count % 50 === 0) {
+                            var more = viewModel.loadEvents(count)
+                            if (more.length) root.eventsData = root.eventsData.concat(more)
+                        }
+                    }
                     delegate: Rectangle {
                         width: ListView.view.width
                         height: 64
@@ -612,10 +656,15 @@ Window {
                                 font.pixelSize: 18
                             }
                             Label {
-                                text: "GDI " + modelData.gdi.toFixed(2)
+                                text: "peak GDI " + modelData.gdi.toFixed(2)
                                 color: theme.calmAccent
                                 font.pixelSize: 18
                             }
+                            Label {
+                                text: ((modelData.end - modelData.t) / 1000).toFixed(1) + " s"
+                                color: theme.calmText
+                                font.pixelSize: 16
+                            }
                             Label {
                                 text: modelData.reason
                                 color: theme.warning
@@ -752,55 +801,16 @@ Window {
                     radius: 12
                     color: Qt.rgba(1, 1, 1, 0.04)
                     border.color: Qt.rgba(1, 1, 1, 0.08)
-                    Canvas {
-                        id: timelineCanvas
+                    GdiPlot {
+                        id: timelinePlot
                         anchors.fill: parent
                         anchors.margins: 16
-                        onPaint: {
-                            var ctx = getContext("2d")
-                            ctx.reset()
-                            ctx.lineWidth = 2
-                            if (root.sparklineData.length > 1) {
-                                var max = -999
-                                var min = 999
-                                for (var i = 0; i < root.sparklineData.length; i++) {
-                                    var val = root.sparklineData[i].gdi
-                                    max = Math.max(max, val)
-                                    min = Math.min(min, val)
-                                }
-                                var range = Math.max(1, max - min)
-                                function coords(idx) {
-                                    var point = root.sparklineData[idx]
-                                    var normX = idx / (root.sparklineData.length - 1)
-                                    var normY = (point.gdi - min) / range
-                                    return {
-                                        x: normX * width,
-                                        y: height - normY * height,
-                                        state: point.state || "calm"
-                                    }
-                                }
-                                var firstPoint = coords(0)
-                                var lastColor = firstPoint.state === "event" ? theme.eventAccent : theme.calmAccent
-                                ctx.beginPath()
-                                ctx.strokeStyle = lastColor
-                                ctx.moveTo(firstPoint.x, firstPoint.y)
-                                for (var j = 1; j < root.sparklineData.length; j++) {
-                                    var pointCoords = coords(j)
-                                    var color = pointCoords.state === "event" ? theme.eventAccent : theme.calmAccent
-                                    if (color !== lastColor) {
-                                        ctx.lineTo(pointCoords.x, pointCoords.y)
-                                        ctx.stroke()
-                                        ctx.beginPath()
-                                        ctx.strokeStyle = color
-                                        ctx.moveTo(pointCoords.x, pointCoords.y)
-                                        lastColor = color
-                                    } else {
-                                        ctx.lineTo(pointCoords.x, pointCoords.y)
-                                    }
-                                }
-                                ctx.stroke()
-                            }
-                        }
+                        clip: true
+                        series: viewModel ? viewModel.gdiSeries : null
+                        threshold: Number(root.settingsGdiText)
+                        watchThreshold: Number(root.settingsSustainedText)
+                        calmColor: theme.calmAccent
+                        eventColor: theme.eventAccent
                     }
                 }
                 RowLayout {
@@ -1005,4 +1015,134 @@ Window {
             }
         }
     }
+
+    Rectangle {
+        id: diagnosticsPanel
+        visible: root.diagnosticsVisible
+        z: 10
+        width: 620
+        anchors.top: viewTitle.bottom
+        anchors.right: parent.right
+        anchors.bottom: navigationControls.top
+        anchors.margins: 24
+        radius: 16
+        color: Qt.rgba(4/255, 11/255, 22/255, 0.94)
+        border.color: Qt.rgba(1, 1, 1, 0.1)
+        border.width: 1
+
+        ColumnLayout {
+            anchors.fill: parent
+            anchors.margins: 16
+            spacing: 12
+            RowLayout {
+                Layout.fillWidth: true
+                Label {
+                    text: "Diagnostics"
+                    color: theme.calmText
+                    font.pixelSize: 22
+                    font.bold: true
+                    Layout.fillWidth: true
+                }
+                Button {
+                    text: "Close"
+                    onClicked: root.toggleDiagnostics()
+                }
+            }
+            RowLayout {
+                Layout.fillWidth: true
+                spacing: 12
+                SpinBox {
+                    id: profileTicksBox
+                    from: 1
+                    to: 1000
+                    value: 20
+                    editable: true
+                }
+                CheckBox {
+                    id: profileAllocBox
+                    text: "tracemalloc"
+                }
+                Button {
+                    text: root.diagnosticsData.profile && root.diagnosticsData.profile.active ? "Profiling…" : "Profile ticks"
+                    enabled: !(root.diagnosticsData.profile && root.diagnosticsData.profile.active)
+                    onClicked: viewModel.startProfile(profileTicksBox.value, profileAllocBox.checked)
+                }
+            }
+            Text {
+                Layout.fillWidth: true
+                visible: root.diagnosticsData.profile !== undefined
+                text: {
+                    var profile = root.diagnosticsData.profile
+                    if (!profile) return ""
+                    if (profile.active) return "Profiling tick " + profile.ticks_done + " / " + profile.ticks
+                    return profile.last_output ? "Last profile: " + profile.last_output : "No profile captured yet"
+                }
+                color: theme.warning
+                font.pixelSize: 13
+                elide: Text.ElideMiddle
+            }
+            Text {
+                Layout.fillWidth: true
+                text: root.diagnosticsSummary(root.diagnosticsData)
+                color: theme.calmText
+                font.pixelSize: 14
+                wrapMode: Text.Wrap
+            }
+            Column {
+                Layout.fillWidth: true
+                spacing: 4
+                visible: (root.diagnosticsData.shadow || []).length > 0
+                Row {
+                    spacing: 12
+                    Repeater {
+                        model: ["shadow detector (tap to edit)", "events", "per h", "event %", "state"]
+                        delegate: Text {
+                            width: index === 0 ? 260 : 64
+                            text: modelData
+                            color: theme.warning
+                            font.pixelSize: 13
+                        }
+                    }
+                }
+                Repeater {
+                    model: root.diagnosticsData.shadow || []
+                    delegate: Row {
+                        spacing: 12
+                        Text { width: 260; text: modelData.label; color: theme.calmText; font.pixelSize: 13; elide: Text.ElideRight }
+                        Text { width: 64; text: modelData.events; color: theme.calmText; font.pixelSize: 13 }
+                        Text { width: 64; text: modelData.events_per_hour.toFixed(2); color: theme.calmAccent; font.pixelSize: 13 }
+                        Text { width: 64; text: (100 * modelData.event_share).toFixed(1); color: theme.calmText; font.pixelSize: 13 }
+                        Text { width: 64; text: modelData.state; color: theme.calmText; font.pixelSize: 13 }
+                        TapHandler { onTapped: root.editShadowSettings(modelData) }
+                    }
+                }
+            }
+            Row {
+                spacing: 12
+                Repeater {
+                    model: ["stage", "n", "mean ms", "p99 ms", "max ms"]
+                    delegate: Text {
+                        width: index === 0 ? 220 : 80
+                        text: modelData
+                        color: theme.warning
+                        font.pixelSize: 13
+                    }
+                }
+            }
+            ListView {
+                Layout.fillWidth: true
+                Layout.fillHeight: true
+                clip: true
+                model: root.diagnosticsData.stages
+                delegate: Row {
+                    spacing: 12
+                    Text { width: 220; text: modelData.name; color: theme.calmText; font.pixelSize: 13; elide: Text.ElideRight }
+                    Text { width: 80; text: modelData.count; color: theme.calmText; font.pixelSize: 13 }
+                    Text { width: 80; text: modelData.mean_ms.toFixed(3); color: theme.calmText; font.pixelSize: 13 }
+                    Text { width: 80; text: modelData.p99_ms.toFixed(3); color: theme.calmAccent; font.pixelSize: 13 }
+                    Text { width: 80; text: modelData.max_ms.toFixed(3); color: theme.calmText; font.pixelSize: 13 }
+                }
+            }
+        }
+    }
 }
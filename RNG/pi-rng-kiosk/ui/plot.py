@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Iterable, Optional, Tuple
+
+import numpy as np
+import shiboken6
+from PySide6 import QtCore, QtGui, QtQuick
+
+_VERTEX = np.dtype(
+    [("x", "<f4"), ("y", "<f4"), ("r", "u1"), ("g", "u1"), ("b", "u1"), ("a", "u1")]
+)
+# QSGGeometry keeps a pointer to its attribute set; the binding hands out a copy, so it
+# has to outlive every geometry built from it.
+_ATTRIBUTES = QtQuick.QSGGeometry.defaultAttributes_ColoredPoint2D()
+
+
+class GdiSeries(QtCore.QObject):
+    """The GDI history behind the plots: a ring of the newest ``capacity`` values.
+
+    ``written`` counts every point ever appended and ``generation`` changes on ``reset``,
+    so a plot can tell how many points are new since it last synced.
+    """
+
+    changed = QtCore.Signal()
+
+    def __init__(self, capacity: int, parent: Optional[QtCore.QObject] = None) -> None:
+        super().__init__(parent)
+        self.capacity = max(2, capacity)
+        self._gdi = np.zeros(self.capacity, dtype=np.float32)
+        self._event = np.zeros(self.capacity, dtype=bool)
+        self.written = 0
+        self.generation = 0
+
+    @property
+    def count(self) -> int:
+        return min(self.written, self.capacity)
+
+    def reset(self, points: Iterable[Tuple[float, bool]]) -> None:
+        self.written = 0
+        self.generation += 1
+        self.extend(points)
+
+    def extend(self, points: Iterable[Tuple[float, bool]]) -> None:
+        points = list(points)
+        # Points that would be overwritten within this call are counted but never stored.
+        self.written += max(0, len(points) - self.capacity)
+        for gdi, is_event in points[-self.capacity :]:
+            slot = self.written % self.capacity
+            self._gdi[slot] = gdi
+            self._event[slot] = is_event
+            self.written += 1
+        self.changed.emit()
+
+    def tail(self, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        """The newest ``count`` GDI values and event flags, oldest first."""
+        count = min(count, self.count)
+        slots = np.arange(self.written - count, self.written) % self.capacity
+        return self._gdi[slots], self._event[slots]
+
+
+def _style_property(
+    name: str, kind: type, notify: QtCore.Signal, rebuild: bool
+) -> QtCore.Property:
+    """A GdiPlot property that repaints on change; ``rebuild`` if it is baked into vertices."""
+    attribute = f"_{name}"
+
+    def getter(plot: "GdiPlot") -> Any:
+        return getattr(plot, attribute)
+
+    def setter(plot: "GdiPlot", value: Any) -> None:
+        if getattr(plot, attribute) == value:
+            return
+        setattr(plot, attribute, value)
+        plot._rebuild |= rebuild
+        plot.styleChanged.emit()
+        plot.update()
+
+    return QtCore.Property(kind, getter, setter, notify=notify)
+
+
+class GdiPlot(QtQuick.QQuickItem):
+    """Scene-graph line plot of a ``GdiSeries`` with native threshold bands.
+
+    Vertices hold (sample index, GDI) and one transform node maps them onto the item, so
+    autoscaling and scrolling only change a matrix. New points are written straight into
+    the vertex buffer, which holds twice the series capacity; once it is full the newest
+    points move to the front, one copy per point amortized. Points that have scrolled off
+    the left edge stay in the buffer until then, so set ``clip: true`` on the item. Bands
+    cover GDI from ``watchThreshold`` to ``threshold`` and from ``threshold`` up.
+    """
+
+    seriesChanged = QtCore.Signal()
+    styleChanged = QtCore.Signal()
+
+    def __init__(self, parent: Optional[QtQuick.QQuickItem] = None) -> None:
+        super().__init__(parent)
+        self.setFlag(QtQuick.QQuickItem.ItemHasContents, True)
+        self._series: Optional[GdiSeries] = None
+        self._threshold = 3.0
+        self._watch_threshold = 2.5
+        self._calm_color = QtGui.QColor("#4dd0e1")
+        self._event_color = QtGui.QColor("#ff5252")
+        self._line_width = 2.0
+        self._rebuild = True
+        self._synced = 0
+        self._generation = -1
+        self._end = 0
+        self._line: Optional[QtQuick.QSGGeometryNode] = None
+        self._transform: Optional[QtQuick.QSGTransformNode] = None
+        self._watch_band: Optional[QtQuick.QSGSimpleRectNode] = None
+        self._event_band: Optional[QtQuick.QSGSimpleRectNode] = None
+
+    def _get_series(self) -> Optional[GdiSeries]:
+        return self._series
+
+    def _set_series(self, series: Optional[GdiSeries]) -> None:
+        if series is self._series:
+            return
+        if self._series is not None:
+            self._series.changed.disconnect(self.update)
+        self._series = series
+        if series is not None:
+            series.changed.connect(self.update)
+        self._rebuild = True
+        self.seriesChanged.emit()
+        self.update()
+
+    series = QtCore.Property(QtCore.QObject, _get_series, _set_series, notify=seriesChanged)
+
+    threshold = _style_property("threshold", float, styleChanged, rebuild=False)
+    watchThreshold = _style_property("watch_threshold", float, styleChanged, rebuild=False)
+    calmColor = _style_property("calm_color", QtGui.QColor, styleChanged, rebuild=True)
+    eventColor = _style_property("event_color", QtGui.QColor, styleChanged, rebuild=True)
+    lineWidth = _style_property("line_width", float, styleChanged, rebuild=True)
+
+    def geometryChange(self, new: QtCore.QRectF, old: QtCore.QRectF) -> None:
+        super().geometryChange(new, old)
+        if new.size() != old.size():
+            self.update()
+
+    def updatePaintNode(
+        self, node: Optional[QtQuick.QSGNode], _data: QtQuick.QQuickItem.UpdatePaintNodeData
+    ) -> QtQuick.QSGNode:
+        if node is None:
+            node = self._build_nodes()
+            self._rebuild = True
+        series = self._series
+        geometry = self._line.geometry()
+        if series is None or series.count < 2:
+            geometry.setVertexCount(0)
+            self._line.markDirty(QtQuick.QSGNode.DirtyGeometry)
+            self._event_band.setRect(QtCore.QRectF())
+            self._watch_band.setRect(QtCore.QRectF())
+            return node
+        self._sync_vertices(series, geometry)
+        self._line.markDirty(QtQuick.QSGNode.DirtyGeometry)
+        gdi, _ = series.tail(series.count)
+        low = float(gdi.min())
+        span = max(1.0, float(gdi.max()) - low)
+        self._place(series.count, low, span)
+        return node
+
+    def _build_nodes(self) -> QtQuick.QSGNode:
+        root = QtQuick.QSGNode()
+        self._watch_band = QtQuick.QSGSimpleRectNode(QtCore.QRectF(), QtGui.QColor())
+        self._event_band = QtQuick.QSGSimpleRectNode(QtCore.QRectF(), QtGui.QColor())
+        root.appendChildNode(self._watch_band)
+        root.appendChildNode(self._event_band)
+        self._transform = QtQuick.QSGTransformNode()
+        root.appendChildNode(self._transform)
+        self._line = QtQuick.QSGGeometryNode()
+        geometry = QtQuick.QSGGeometry(_ATTRIBUTES, 0)
+        geometry.setDrawingMode(QtQuick.QSGGeometry.DrawLineStrip)
+        self._line.setGeometry(geometry)
+        self._line.setFlag(QtQuick.QSGNode.OwnsGeometry)
+        self._line.setMaterial(QtQuick.QSGVertexColorMaterial())
+        self._line.setFlag(QtQuick.QSGNode.OwnsMaterial)
+        self._transform.appendChildNode(self._line)
+        return root
+
+    def _sync_vertices(self, series: GdiSeries, geometry: QtQuick.QSGGeometry) -> None:
+        slots = 2 * series.capacity
+        new = series.written - self._synced
+        if self._rebuild or series.generation != self._generation or new > series.capacity:
+            geometry.allocate(slots)
+            geometry.setLineWidth(self._line_width)
+            self._end = 0
+            new = series.count
+            self._rebuild = False
+            self._generation = series.generation
+        vertices = self._vertices(geometry, slots)
+        if self._end + new > slots:
+            keep = series.count - new
+            vertices[:keep] = vertices[self._end - keep : self._end]
+            vertices["x"][:keep] = np.arange(keep)
+            self._end = keep
+        if new:
+            gdi, events = series.tail(new)
+            fresh = vertices[self._end : self._end + new]
+            fresh["x"] = np.arange(self._end, self._end + new)
+            fresh["y"] = gdi
+            for channel, calm, event in zip(
+                ("r", "g", "b", "a"), self._calm_color.getRgb(),
+                self._event_color.getRgb(),
+                strict=True,
+            ):
+                fresh[channel] = np.where(events, event, calm)
+            self._end += new
+        self._synced = series.written
+        geometry.setVertexCount(self._end)
+        geometry.markVertexDataDirty()
+
+    @staticmethod
+    def _vertices(geometry: QtQuick.QSGGeometry, slots: int) -> np.ndarray:
+        # A writable view onto the geometry's own vertex memory.
+        size = slots * _VERTEX.itemsize
+        pointer = shiboken6.VoidPtr(int(geometry.vertexData()), size, True)
+        return np.frombuffer(pointer, dtype=_VERTEX)
+
+    def _place(self, count: int, low: float, span: float) -> None:
+        width, height = self.width(), self.height()
+        x_scale = width / (count - 1)
+        y_scale = height / span
+        matrix = QtGui.QMatrix4x4()
+        matrix.translate(-(self._end - count) * x_scale, height + low * y_scale)
+        matrix.scale(x_scale, -y_scale)
+        self._transform.setMatrix(matrix)
+        self._transform.markDirty(QtQuick.QSGNode.DirtyMatrix)
+
+        def to_y(gdi: float) -> float:
+            # A threshold still being typed in the settings may not be a number yet.
+            if not math.isfinite(gdi):
+                return 0.0
+            return min(height, max(0.0, height - (gdi - low) * y_scale))
+
+        event_y = to_y(self._threshold)
+        watch_y = to_y(self._watch_threshold)
+        self._event_band.setRect(QtCore.QRectF(0, 0, width, event_y))
+        self._event_band.setColor(self._band_color(0.16))
+        self._watch_band.setRect(QtCore.QRectF(0, event_y, width, max(0.0, watch_y - event_y)))
+        self._watch_band.setColor(self._band_color(0.07))
+
+    def _band_color(self, alpha: float) -> QtGui.QColor:
+        color = QtGui.QColor(self._event_color)
+        color.setAlphaF(alpha)
+        return color